@@ -0,0 +1,46 @@
+"""PDF 转 TXT 转换核心库（不依赖 GUI）
+
+各名称在第一次访问时才导入所在的子模块，只用到常量或个别子模块时不必加载整个转换引擎。
+"""
+import importlib
+
+# 名称 -> 所在子模块
+_EXPORTS = {
+    "ConversionEngine": ".engine",
+    "ConversionError": ".converter",
+    "JobJournal": ".journal",
+    "PageCache": ".cache",
+    "collect_pdf_paths": ".converter",
+    "convert_files": ".converter",
+    "convert_pdf": ".converter",
+    "convert_page_range": ".engine",
+    "count_pages": ".engine",
+    "BACKEND_AUTO": ".backends",
+    "BACKEND_PDFIUM": ".backends",
+    "BACKEND_PDFPLUMBER": ".backends",
+    "OCR_AUTO": ".ocr",
+    "OCR_FORCE": ".ocr",
+    "OCR_OFF": ".ocr",
+    "FORMAT_INDEXED": ".output",
+    "FORMAT_JSONL": ".output",
+    "FORMAT_TXT": ".output",
+    "read_page": ".output",
+    "read_page_offsets": ".output",
+    "SharedPdf": ".sources",
+    "share_pdf": ".sources",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,8 @@
+"""python -m pdf_converter"""
+import sys
+
+from .cli import main
+
+# 进程池子进程会重新导入主模块，必须放在判断内
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,299 @@
+"""文本提取后端
+
+pdfplumber 版面还原最好但速度最慢；pdfium（pypdfium2）直接调用 PDFium 提取文本，
+速度快一个数量级，适合只需要全文检索、不关心分栏版面的场景。
+auto 按文档选择：抽样几页检查版面，有分栏的文档用 pdfplumber，其余用 pdfium；
+没有安装 pypdfium2 时总是 pdfplumber。
+"""
+import importlib.util
+
+from .sources import SharedPdf
+
+BACKEND_PDFPLUMBER = 'pdfplumber'
+BACKEND_PDFIUM = 'pdfium'
+BACKEND_AUTO = 'auto'
+BACKENDS = (BACKEND_PDFPLUMBER, BACKEND_PDFIUM, BACKEND_AUTO)
+
+# auto 检查版面时抽样的页数
+LAYOUT_SAMPLE_PAGES = 3
+
+# 左右两半页各至少有这么多行文字、且合计占全部文字行的这个比例以上时视为分栏
+COLUMN_MIN_LINES = 3
+COLUMN_LINE_SHARE = 0.6
+
+
+class PdfplumberDocument:
+    """pdfplumber 后端，pdf_path 为文件路径或 SharedPdf"""
+    name = BACKEND_PDFPLUMBER
+
+    def __init__(self, pdf_path):
+        import pdfplumber
+        from pdfminer.pdfpage import PDFPage
+
+        if isinstance(pdf_path, SharedPdf):
+            pdf_path = pdf_path.open()
+        self.pdf = pdfplumber.open(pdf_path)
+        try:
+            # 只保留页面对象列表，需要哪页再构造哪页，不使用会缓存所有页面的 pdf.pages
+            self.page_objs = list(PDFPage.create_pages(self.pdf.doc))
+        except Exception:
+            self.close()
+            raise
+
+    def __len__(self):
+        return len(self.page_objs)
+
+    def _page(self, index):
+        from pdfplumber.page import Page
+
+        return Page(self.pdf, self.page_objs[index], page_number=index + 1)
+
+    def extract_text(self, index):
+        page = self._page(index)
+        try:
+            return page.extract_text()
+        finally:
+            page.close()
+
+    def analyze(self, index):
+        """提取文本并统计页面构成，返回 (文本, 统计)，供OCR分流使用"""
+        page = self._page(index)
+        try:
+            text = page.extract_text()
+            x0, top, x1, bottom = page.bbox
+            image_area = 0.0
+            for image in page.images:
+                width = min(image["x1"], x1) - max(image["x0"], x0)
+                height = min(image["bottom"], bottom) - max(image["top"], top)
+                if width > 0 and height > 0:
+                    image_area += width * height
+            chars = page.chars
+            sizes = sorted(char["size"] for char in chars)
+            return text, {
+                "width": float(page.width),
+                "height": float(page.height),
+                "area": float(page.width * page.height),
+                "image_area": float(image_area),
+                "fonts": len({char["fontname"] for char in chars}),
+                "text_height": float(sizes[len(sizes) // 2]) if sizes else None,
+            }
+        finally:
+            page.close()
+
+    def page_size(self, index):
+        """页面宽高（点）"""
+        page = self._page(index)
+        try:
+            return float(page.width), float(page.height)
+        finally:
+            page.close()
+
+    def render(self, index, resolution, grayscale=False):
+        """渲染页面，返回 PIL 图片"""
+        page = self._page(index)
+        try:
+            image = page.to_image(resolution=resolution).original
+            return image.convert('L') if grayscale else image
+        finally:
+            page.close()
+
+    def close(self):
+        # pdfplumber 的 PDF.close() 会先构造全部页面对象，这里直接关闭文件
+        self.pdf.flush_cache()
+        self.pdf.stream.close()
+
+
+class PdfiumDocument:
+    """pypdfium2 后端，pdf_path 为文件路径或 SharedPdf"""
+    name = BACKEND_PDFIUM
+
+    def __init__(self, pdf_path):
+        import pypdfium2
+
+        self.reader = None
+        if isinstance(pdf_path, SharedPdf):
+            # 直接在共享内存的映射上加载，不复制
+            self.reader = pdf_path.open()
+            try:
+                self.pdf = pypdfium2.PdfDocument(self.reader.array())
+            except Exception:
+                self.reader.close()
+                raise
+        else:
+            self.pdf = pypdfium2.PdfDocument(pdf_path)
+
+    def __len__(self):
+        return len(self.pdf)
+
+    def extract_text(self, index):
+        page = self.pdf[index]
+        textpage = page.get_textpage()
+        try:
+            return textpage.get_text_bounded().replace('\r\n', '\n')
+        finally:
+            textpage.close()
+            page.close()
+
+    def analyze(self, index):
+        """提取文本并统计页面构成，返回 (文本, 统计)"""
+        import pypdfium2.raw as pdfium_c
+
+        page = self.pdf[index]
+        textpage = page.get_textpage()
+        try:
+            text = textpage.get_text_bounded().replace('\r\n', '\n')
+            width, height = page.get_size()
+            image_area = 0.0
+            fonts = 0
+            objects = page.get_objects(
+                filter=(pdfium_c.FPDF_PAGEOBJ_IMAGE, pdfium_c.FPDF_PAGEOBJ_TEXT), max_depth=2
+            )
+            for obj in objects:
+                if obj.type == pdfium_c.FPDF_PAGEOBJ_TEXT:
+                    # 只需要知道有没有文字对象，不逐个读取字体
+                    fonts = 1
+                    continue
+                # pypdfium2 5 起 get_pos 更名为 get_bounds
+                left, bottom, right, top = (getattr(obj, 'get_bounds', None) or obj.get_pos)()
+                left, right = max(left, 0), min(right, width)
+                bottom, top = max(bottom, 0), min(top, height)
+                if right > left and top > bottom:
+                    image_area += (right - left) * (top - bottom)
+            return text, {
+                "width": width,
+                "height": height,
+                "area": width * height,
+                "image_area": image_area,
+                "fonts": fonts,
+                "text_height": self._text_height(textpage) if fonts else None,
+            }
+        finally:
+            textpage.close()
+            page.close()
+
+    @staticmethod
+    def _text_height(textpage, samples=100):
+        """抽样统计字号的中位数"""
+        import pypdfium2.raw as pdfium_c
+
+        count = textpage.count_chars()
+        step = max(1, count // samples)
+        sizes = sorted(
+            size for size in (pdfium_c.FPDFText_GetFontSize(textpage.raw, i) for i in range(0, count, step))
+            if size > 0
+        )
+        return sizes[len(sizes) // 2] if sizes else None
+
+    def page_size(self, index):
+        page = self.pdf[index]
+        try:
+            return page.get_size()
+        finally:
+            page.close()
+
+    def has_columns(self, index):
+        """页面是否分栏：大部分文字行完全落在左半页或右半页内，且两侧都有"""
+        page = self.pdf[index]
+        textpage = page.get_textpage()
+        try:
+            middle = page.get_size()[0] / 2
+            count = textpage.count_rects()
+            left = right = 0
+            for i in range(count):
+                x0, _, x1, _ = textpage.get_rect(i)
+                if x1 <= middle:
+                    left += 1
+                elif x0 >= middle:
+                    right += 1
+            return (min(left, right) >= COLUMN_MIN_LINES
+                    and left + right >= count * COLUMN_LINE_SHARE)
+        finally:
+            textpage.close()
+            page.close()
+
+    def render(self, index, resolution, grayscale=False):
+        page = self.pdf[index]
+        try:
+            # 直接渲染为灰度图，省去彩色位图和转换
+            return page.render(scale=resolution / 72, grayscale=grayscale).to_pil()
+        finally:
+            page.close()
+
+    def close(self):
+        self.pdf.close()
+        if self.reader is not None:
+            # 关闭后的 PdfDocument 仍引用着输入缓冲区，先丢弃才能解除共享内存的映射
+            self.pdf = None
+            self.reader.close()
+
+
+_DOCUMENT_CLASSES = {
+    BACKEND_PDFPLUMBER: PdfplumberDocument,
+    BACKEND_PDFIUM: PdfiumDocument,
+}
+
+
+def choose_backend(pdf_path):
+    """auto 的选择：抽样检查版面，有分栏的页面时用 pdfplumber，否则用 pdfium"""
+    try:
+        document = PdfiumDocument(pdf_path)
+    except Exception:
+        # 打不开的文件由后续的转换步骤报告错误
+        return BACKEND_PDFIUM
+    try:
+        pages = len(document)
+        samples = sorted({i * pages // LAYOUT_SAMPLE_PAGES for i in range(min(pages, LAYOUT_SAMPLE_PAGES))})
+        if any(document.has_columns(index) for index in samples):
+            return BACKEND_PDFPLUMBER
+        return BACKEND_PDFIUM
+    finally:
+        document.close()
+
+
+def resolve_backend(name, pdf_path=None):
+    """把 auto 解析为实际使用的后端
+
+    给出 pdf_path 时按该文档的版面选择（见 choose_backend），否则在安装了 pypdfium2 时为 pdfium。
+    """
+    if name in (None, BACKEND_AUTO):
+        if importlib.util.find_spec('pypdfium2') is None:
+            return BACKEND_PDFPLUMBER
+        if pdf_path is None:
+            return BACKEND_PDFIUM
+        return choose_backend(pdf_path)
+    if name not in _DOCUMENT_CLASSES:
+        raise ValueError(f"未知的提取后端: {name}")
+    return name
+
+
+def read_page_count(pdf_path):
+    """从页面树根节点的 /Count 读取页数，只解析交叉引用表，不遍历页面，适合登记大量文件
+
+    安装了 pypdfium2 时由 PDFium 读取，否则用 pdfminer 解析；/Count 无效时退回逐页计数。
+    """
+    if importlib.util.find_spec('pypdfium2') is not None:
+        import pypdfium2
+
+        document = pypdfium2.PdfDocument(pdf_path)
+        try:
+            return len(document)
+        finally:
+            document.close()
+
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdfpage import PDFPage
+    from pdfminer.pdfparser import PDFParser
+    from pdfminer.pdftypes import resolve1
+
+    with open(pdf_path, 'rb') as f:
+        document = PDFDocument(PDFParser(f))
+        pages = resolve1(document.catalog.get('Pages'))
+        count = resolve1(pages.get('Count')) if isinstance(pages, dict) else None
+        if isinstance(count, int) and count >= 0:
+            return count
+        return sum(1 for _ in PDFPage.create_pages(document))
+
+
+def open_with_backend(pdf_path, name):
+    """用指定后端打开PDF"""
+    return _DOCUMENT_CLASSES[resolve_backend(name)](pdf_path)
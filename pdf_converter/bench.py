@@ -0,0 +1,376 @@
+"""性能基准测试
+
+生成可复现的合成PDF语料（纯文本、扫描图片、图文混排、中文、超长文档），
+分别测量单页提取/OCR延迟和进程池整体吞吐，输出 JSON，并可与保存的基线比较。
+"""
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from .backends import BACKEND_PDFIUM, BACKEND_PDFPLUMBER
+from .engine import ConversionEngine, convert_page_range, count_pages, release_document
+from .memory import current_rss
+from .ocr import OCR_AUTO, OCR_OFF, locate_tesseract
+
+# 语料中每类文档的页数，scale 参数按比例缩放
+CORPUS_PAGES = {
+    "text": 50,
+    "scanned": 10,
+    "mixed": 20,
+    "cjk": 20,
+    "long": 1000,
+}
+
+# 与基线相比变差超过该比例视为性能回退
+DEFAULT_THRESHOLD = 0.10
+
+# 指标及其方向：True 表示越大越好
+METRICS = {
+    "pages_per_sec": True,
+    "engine_pages_per_sec": True,
+    "latency_p50_ms": False,
+    "latency_p90_ms": False,
+    "latency_p99_ms": False,
+    "peak_rss_mb": False,
+}
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4，单位为点
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua enim ad minim veniam quis nostrud "
+    "exercitation ullamco laboris nisi aliquip ex ea commodo consequat"
+).split()
+CJK_CHARS = (
+    "的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过"
+    "子说产种面而方后多定行学法所民得经十三之进着等部度家电力里如水化高自二理起小物现实加量都两体"
+    "制机当使点从业本去把性好应开它合还因由其些然前外天政四日那社义事平形相全表间样与关各重新线内"
+)
+
+
+def _escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+class _PdfWriter:
+    """只包含基准测试所需功能的最小PDF写入器"""
+
+    def __init__(self):
+        self.objects: List[Optional[bytes]] = [None, None]  # 1: Catalog, 2: Pages
+        self.pages: List[int] = []
+        self.fonts: Dict[str, int] = {}
+
+    def add(self, body: bytes) -> int:
+        self.objects.append(body)
+        return len(self.objects)
+
+    def add_stream(self, data: bytes, extra: bytes = b'') -> int:
+        data = zlib.compress(data)
+        header = b'<< ' + extra + b' /Filter /FlateDecode /Length %d >>' % len(data)
+        return self.add(header + b'\nstream\n' + data + b'\nendstream')
+
+    def font(self, name):
+        if name not in self.fonts:
+            if name == 'latin':
+                self.fonts[name] = self.add(
+                    b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica '
+                    b'/Encoding /WinAnsiEncoding >>'
+                )
+            else:
+                # Adobe 标准中文字体，无需嵌入字体文件
+                descriptor = self.add(
+                    b'<< /Type /FontDescriptor /FontName /STSong-Light /Flags 6 '
+                    b'/FontBBox [-25 -254 1000 880] /ItalicAngle 0 /Ascent 880 '
+                    b'/Descent -120 /CapHeight 880 /StemV 93 >>'
+                )
+                cid_font = self.add(
+                    b'<< /Type /Font /Subtype /CIDFontType0 /BaseFont /STSong-Light '
+                    b'/CIDSystemInfo << /Registry (Adobe) /Ordering (GB1) /Supplement 2 >> '
+                    b'/FontDescriptor %d 0 R /DW 1000 >>' % descriptor
+                )
+                self.fonts[name] = self.add(
+                    b'<< /Type /Font /Subtype /Type0 /BaseFont /STSong-Light '
+                    b'/Encoding /UniGB-UCS2-H /DescendantFonts [%d 0 R] >>' % cid_font
+                )
+        return self.fonts[name]
+
+    def add_page(self, content: bytes, resources: bytes):
+        contents = self.add_stream(content)
+        self.pages.append(self.add(
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] '
+            b'/Resources %s /Contents %d 0 R >>' % (PAGE_WIDTH, PAGE_HEIGHT, resources, contents)
+        ))
+
+    def text_page(self, lines):
+        font = self.font('latin')
+        body = b''.join(b'(%s) Tj T* ' % _escape(line).encode('latin-1') for line in lines)
+        content = b'BT /F1 11 Tf 14 TL 50 800 Td ' + body + b'ET'
+        self.add_page(content, b'<< /Font << /F1 %d 0 R >> >>' % font)
+
+    def cjk_page(self, lines):
+        font = self.font('cjk')
+        body = b''.join(b'<%s> Tj T* ' % line.encode('utf-16-be').hex().encode() for line in lines)
+        content = b'BT /F2 12 Tf 18 TL 50 800 Td ' + body + b'ET'
+        self.add_page(content, b'<< /Font << /F2 %d 0 R >> >>' % font)
+
+    def image_page(self, image):
+        """整页灰度图片，没有文本层，模拟扫描件"""
+        image = image.convert('L')
+        xobject = self.add_stream(
+            image.tobytes(),
+            b'/Type /XObject /Subtype /Image /Width %d /Height %d '
+            b'/ColorSpace /DeviceGray /BitsPerComponent 8' % image.size
+        )
+        content = b'q %d 0 0 %d 0 0 cm /Im1 Do Q' % (PAGE_WIDTH, PAGE_HEIGHT)
+        self.add_page(content, b'<< /XObject << /Im1 %d 0 R >> >>' % xobject)
+
+    def save(self, path):
+        kids = b' '.join(b'%d 0 R' % page for page in self.pages)
+        self.objects[0] = b'<< /Type /Catalog /Pages 2 0 R >>'
+        self.objects[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(self.pages))
+        with open(path, 'wb') as f:
+            f.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+            offsets = []
+            for number, body in enumerate(self.objects, 1):
+                offsets.append(f.tell())
+                f.write(b'%d 0 obj\n' % number + body + b'\nendobj\n')
+            xref = f.tell()
+            f.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(self.objects) + 1))
+            for offset in offsets:
+                f.write(b'%010d 00000 n \n' % offset)
+            f.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+                    % (len(self.objects) + 1, xref))
+
+
+def _latin_lines(rng, count=50):
+    return [' '.join(rng.choice(WORDS) for _ in range(rng.randint(8, 12))) for _ in range(count)]
+
+
+def _cjk_lines(rng, count=40):
+    return [''.join(rng.choice(CJK_CHARS) for _ in range(rng.randint(24, 30))) for _ in range(count)]
+
+
+def _scan_image(rng):
+    """把随机文本画成150dpi的页面图片"""
+    from PIL import Image, ImageDraw, ImageFont
+
+    image = Image.new('L', (1240, 1754), 255)
+    draw = ImageDraw.Draw(image)
+    try:
+        font = ImageFont.load_default(size=28)
+    except TypeError:
+        font = ImageFont.load_default()
+    for i, line in enumerate(_latin_lines(rng, 40)):
+        draw.text((100, 100 + i * 38), line, fill=0, font=font)
+    return image
+
+
+def generate_corpus(directory, scale=1.0, seed=0):
+    """生成基准测试语料，返回 {名称: 路径}；相同参数生成的文件内容完全相同"""
+    os.makedirs(directory, exist_ok=True)
+    corpus = {}
+    for name, pages in CORPUS_PAGES.items():
+        pages = max(1, int(pages * scale))
+        path = os.path.join(directory, f"{name}.pdf")
+        rng = random.Random(f"{seed}-{name}")
+        writer = _PdfWriter()
+        for index in range(pages):
+            if name == 'scanned' or (name == 'mixed' and index % 2):
+                writer.image_page(_scan_image(rng))
+            elif name == 'cjk':
+                writer.cjk_page(_cjk_lines(rng))
+            else:
+                writer.text_page(_latin_lines(rng))
+        writer.save(path)
+        corpus[name] = path
+    return corpus
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def _peak_rss():
+    """本进程的峰值常驻内存（字节）"""
+    try:
+        import resource
+    except ImportError:
+        return current_rss()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 下单位为 KB，macOS 下为字节
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _cpu_time():
+    """本进程及已回收子进程的CPU时间，无法获取时返回None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+
+def measure_pages(pdf_path, backend, ocr_mode):
+    """在独立进程中把整个文档作为一个页段转换，返回每页耗时（秒）、总耗时和峰值内存
+
+    与引擎的工作进程走同一条路径（convert_page_range），每页耗时取自页面详情。
+    """
+    pages = count_pages(pdf_path, backend)
+    start = time.perf_counter()
+    _, details = convert_page_range(pdf_path, 0, pages, ocr_mode, None, backend=backend, details=True)
+    elapsed = time.perf_counter() - start
+    release_document()
+    return [page["seconds"] for page in details], elapsed, _peak_rss()
+
+
+def run_case(pdf_path, backend, ocr_mode, workers):
+    """测量一个 (文档, 后端, OCR模式) 组合"""
+    # 每个用例在新进程中测量，峰值内存互不影响
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        latencies, elapsed, peak_rss = executor.submit(measure_pages, pdf_path, backend, ocr_mode).result()
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        file_data = {"path": pdf_path, "output_path": os.path.join(output_dir, "out.txt")}
+        cpu_before = _cpu_time()
+        start = time.perf_counter()
+        engine = ConversionEngine(workers)
+        engine.convert([file_data], ocr_mode, backend=backend)
+        wall = time.perf_counter() - start
+        cpu_after = _cpu_time()
+
+    pages = len(latencies)
+    result = {
+        "pages": pages,
+        # OCR页面的渲染与识别重叠进行，吞吐按整个页段的耗时计算
+        "pages_per_sec": pages / elapsed if elapsed else None,
+        "latency_p50_ms": _percentile(latencies, 0.50) * 1000,
+        "latency_p90_ms": _percentile(latencies, 0.90) * 1000,
+        "latency_p99_ms": _percentile(latencies, 0.99) * 1000,
+        "peak_rss_mb": peak_rss / 1024 / 1024,
+        "workers": workers,
+        "engine_seconds": wall,
+        "engine_pages_per_sec": pages / wall if wall else None,
+        "cpu_utilization": None,
+        # 引擎运行时各阶段的累计耗时（秒），用于定位回退发生在哪一步
+        "stage_seconds": {
+            stage: histogram["sum"]
+            for stage, histogram in engine.metrics.snapshot()["histograms"].items()
+        },
+    }
+    if "error" in file_data:
+        result["error"] = file_data["error"]
+    if cpu_before is not None and wall:
+        result["cpu_utilization"] = (cpu_after - cpu_before) / (wall * workers)
+    return result
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """与基线比较，返回 {用例: {指标: {...}}} 和是否存在回退"""
+    comparison = {}
+    regressed = False
+    for case, metrics in results["cases"].items():
+        base = baseline.get("cases", {}).get(case)
+        if not base or "skipped" in metrics:
+            continue
+        case_comparison = {}
+        for metric, higher_is_better in METRICS.items():
+            current, previous = metrics.get(metric), base.get(metric)
+            if not current or not previous:
+                continue
+            change = (current - previous) / previous
+            worse = -change if higher_is_better else change
+            case_comparison[metric] = {
+                "baseline": previous,
+                "current": current,
+                "change": change,
+                "regression": worse > threshold,
+            }
+            regressed = regressed or worse > threshold
+        comparison[case] = case_comparison
+    return comparison, regressed
+
+
+def _package_version(name):
+    try:
+        from importlib.metadata import version
+        return version(name)
+    except Exception:
+        return None
+
+
+def run_benchmark(corpus_dir=None, scale=1.0, workers=None, backends=None, seed=0,
+                  progress=None):
+    """生成语料并运行全部用例，返回结果字典"""
+    workers = workers or os.cpu_count() or 1
+    backends = backends or [BACKEND_PDFPLUMBER, BACKEND_PDFIUM]
+    ocr_modes = [OCR_OFF, OCR_AUTO]
+    has_tesseract = locate_tesseract() is not None
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        corpus = generate_corpus(corpus_dir or temp_dir, scale, seed)
+        cases = {}
+        for name, path in corpus.items():
+            for backend in backends:
+                for ocr_mode in ocr_modes:
+                    case = f"{name}/{backend}/ocr={ocr_mode}"
+                    if ocr_mode != OCR_OFF and not has_tesseract:
+                        cases[case] = {"skipped": "tesseract not found"}
+                        continue
+                    if progress:
+                        progress(case)
+                    cases[case] = run_case(path, backend, ocr_mode, workers)
+
+    return {
+        "meta": {
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "workers": workers,
+            "scale": scale,
+            "seed": seed,
+            "versions": {name: _package_version(name)
+                         for name in ("pdfplumber", "pdfminer.six", "pypdfium2", "Pillow")},
+        },
+        "cases": cases,
+    }
+
+
+def run_bench_command(args):
+    """bench 子命令"""
+    results = run_benchmark(
+        corpus_dir=args.corpus_dir,
+        scale=args.scale,
+        workers=args.workers,
+        backends=args.backends,
+        progress=lambda case: print(f"测量 {case}", file=sys.stderr)
+    )
+    regressed = False
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        results["comparison"], regressed = compare(results, baseline, args.threshold)
+        results["regression"] = regressed
+
+    output = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+    return 1 if regressed else 0
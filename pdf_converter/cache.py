@@ -0,0 +1,134 @@
+"""按内容哈希缓存每页的转换结果
+
+缓存键为 (PDF内容哈希, 页码, 提取参数)，同一份PDF换了文件名或重新上传也能命中。
+数据保存在 SQLite 中，总大小超过上限时按最近使用时间淘汰。
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Tuple
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.pdf_converter_cache')
+DEFAULT_CACHE_SIZE = 1024 * 1024 * 1024  # 1 GB
+
+# 超过上限后淘汰到上限的这个比例，避免每次写入都触发淘汰
+EVICT_RATIO = 0.9
+
+
+def content_hasher():
+    """内容哈希所用的算法，文件和内存中的PDF内容相同时哈希一致"""
+    return hashlib.blake2b(digest_size=20)
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """计算文件内容哈希"""
+    digest = content_hasher()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PageCache:
+    """基于 SQLite 的页面文本缓存，可在多个线程间共享"""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_size: int = DEFAULT_CACHE_SIZE):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, 'pages.sqlite3')
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                doc_hash TEXT NOT NULL,
+                settings TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (doc_hash, settings, page)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS pages_last_used ON pages (last_used)")
+        self.conn.commit()
+        self.total_size = self._query_total_size()
+
+    def _query_total_size(self):
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def get_pages(self, doc_hash: str, settings: str) -> Dict[int, str]:
+        """读取某个文档在指定参数下已缓存的所有页面"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT page, text FROM pages WHERE doc_hash = ? AND settings = ?",
+                (doc_hash, settings)
+            ).fetchall()
+            if rows:
+                self.conn.execute(
+                    "UPDATE pages SET last_used = ? WHERE doc_hash = ? AND settings = ?",
+                    (time.time(), doc_hash, settings)
+                )
+                self.conn.commit()
+        return dict(rows)
+
+    def put_pages(self, doc_hash: str, settings: str, pages: Iterable[Tuple[int, str]]):
+        """写入若干页的文本"""
+        now = time.time()
+        rows = [(doc_hash, settings, page, text, len(text.encode('utf-8')), now)
+                for page, text in pages]
+        with self.lock:
+            # 覆盖已有的页面时减去旧记录的大小
+            replaced = self._pages_size(doc_hash, settings, [row[2] for row in rows])
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            self.conn.commit()
+            self.total_size += sum(row[4] for row in rows) - replaced
+            if self.total_size > self.max_size:
+                self._evict()
+
+    def _pages_size(self, doc_hash, settings, pages, batch=500):
+        """已缓存的指定页面的总大小"""
+        total = 0
+        for i in range(0, len(pages), batch):
+            chunk = pages[i:i + batch]
+            total += self.conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM pages WHERE doc_hash = ? AND settings = ? "
+                f"AND page IN ({', '.join('?' * len(chunk))})",
+                (doc_hash, settings, *chunk)
+            ).fetchone()[0]
+        return total
+
+    def _evict(self):
+        """按最近使用时间淘汰，直到总大小低于上限"""
+        # 其他进程也可能写入同一个缓存，淘汰前重新统计
+        self.total_size = self._query_total_size()
+        target = self.max_size * EVICT_RATIO
+        while self.total_size > target:
+            rows = self.conn.execute(
+                "SELECT rowid, size FROM pages ORDER BY last_used LIMIT 500"
+            ).fetchall()
+            if not rows:
+                break
+            removed = []
+            for rowid, size in rows:
+                removed.append((rowid,))
+                self.total_size -= size
+                if self.total_size <= target:
+                    break
+            self.conn.executemany("DELETE FROM pages WHERE rowid = ?", removed)
+        self.conn.commit()
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM pages")
+            self.conn.commit()
+            self.total_size = 0
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
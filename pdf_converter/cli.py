@@ -0,0 +1,416 @@
+"""命令行入口：python -m pdf_converter
+
+只在真正开始转换时才导入 pdfplumber 等重量级模块，保证命令行启动迅速。
+"""
+import argparse
+import logging
+import os
+import sys
+from pathlib import Path
+
+from .backends import BACKEND_PDFIUM, BACKEND_PDFPLUMBER, BACKENDS
+from .bench import DEFAULT_THRESHOLD, run_bench_command
+from .cache import DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE, PageCache
+from .converter import collect_pdf_paths, convert_files
+from .distributed import (
+    DEFAULT_LEASE, DEFAULT_MAX_ATTEMPTS, DEFAULT_MAX_QUEUED, Coordinator, open_queue, run_workers,
+)
+from .engine import DEFAULT_MEMORY_LIMIT, DEFAULT_PAGES_PER_TASK
+from .journal import DEFAULT_JOURNAL_PATH, JobJournal
+from .metrics import Metrics, serve_metrics
+from .ocr import (
+    DEFAULT_THREAD_LIMIT, LANG_AUTO, MAX_RESOLUTION, MIN_RESOLUTION, OCR_LANG, OCR_MODES, OCR_OFF,
+    PREPROCESS_PROFILES, PROFILE_STANDARD, OcrConfig,
+)
+from .output import FORMAT_TXT, OUTPUT_FORMATS, output_suffix
+from .server import DEFAULT_HOST, DEFAULT_PORT, ConversionService, run_server
+from .watch import DEFAULT_POLL_INTERVAL, DEFAULT_QUEUE_PATH, DEFAULT_SETTLE, WatchDaemon
+
+
+def add_ocr_options(parser):
+    """识别参数，convert / watch / serve / coordinate 共用"""
+    group = parser.add_argument_group('OCR参数')
+    group.add_argument('--lang', default=OCR_LANG,
+                       help=f'tesseract 识别语言，如 eng 或 chi_sim+eng，默认 {OCR_LANG}；'
+                            f'{LANG_AUTO} 按文档的书写系统只加载需要的语言，检测不出时使用 {OCR_LANG}')
+    group.add_argument('--psm', type=int, default=None,
+                       help='tesseract 页面分割模式（--psm），默认使用 tesseract 的默认值')
+    group.add_argument('--oem', type=int, default=None,
+                       help='tesseract 识别引擎模式（--oem）')
+    group.add_argument('--ocr-min-dpi', type=int, default=MIN_RESOLUTION,
+                       help='识别用渲染分辨率的下限')
+    group.add_argument('--ocr-max-dpi', type=int, default=MAX_RESOLUTION,
+                       help='识别用渲染分辨率的上限，低置信度重试也不超过它')
+    group.add_argument('--preprocess', choices=tuple(PREPROCESS_PROFILES), default=PROFILE_STANDARD,
+                       help='识别前的预处理：standard 调整对比度和亮度，binarize 再二值化，scan 再纠偏（需要 NumPy）')
+    group.add_argument('--ocr-threads', type=int, default=DEFAULT_THREAD_LIMIT,
+                       help='每个 tesseract 的 OpenMP 线程数（OMP_THREAD_LIMIT），进程池已按核数并行，默认 1；0 表示不限制')
+
+
+def ocr_config_from_args(args):
+    return OcrConfig(args.lang, args.psm, args.oem, args.ocr_min_dpi, args.ocr_max_dpi,
+                     args.preprocess, args.ocr_threads or None)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m pdf_converter',
+        description='将PDF文件批量转换为TXT（无需图形界面）'
+    )
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    convert_parser = subparsers.add_parser('convert', help='转换PDF文件')
+    convert_parser.add_argument('inputs', nargs='+',
+                                help='PDF文件、目录或通配符（如 "docs/*.pdf"）')
+    convert_parser.add_argument('-r', '--recursive', action='store_true',
+                                help='递归处理子目录，通配符支持 **')
+    convert_parser.add_argument('-o', '--output-dir',
+                                help='输出目录，默认输出到PDF同目录')
+    convert_parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS, default=FORMAT_TXT,
+                                help='输出格式：txt 纯文本，jsonl 每页一行 JSON（含提取方式、置信度和耗时），'
+                                     'indexed 纯文本加 .idx 每页字节偏移索引')
+    convert_parser.add_argument('--archive',
+                                help='把整批结果写入这一个 zip 文件（不使用输出目录和任务日志）')
+    convert_parser.add_argument('-j', '--workers', type=int, default=None,
+                                help='并行进程数，默认等于CPU核数')
+    convert_parser.add_argument('--pages-per-task', type=int, default=DEFAULT_PAGES_PER_TASK,
+                                help='每个任务转换的页数')
+    convert_parser.add_argument('--memory-limit', type=int, default=DEFAULT_MEMORY_LIMIT // 1024 // 1024,
+                                help='每个工作进程的内存上限（MB），超过后释放已解析的文档，0 表示不限制')
+    convert_parser.add_argument('--ocr', choices=OCR_MODES, default=OCR_OFF,
+                                help='OCR模式：off 不识别，auto 仅识别无文本页面，force 识别所有页面')
+    convert_parser.add_argument('--backend', choices=BACKENDS, default=BACKEND_PDFPLUMBER,
+                                help='文本提取后端：pdfplumber 版面最好，pdfium 速度最快，auto 有 pdfium 时使用 pdfium')
+    convert_parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                                help='页面缓存目录，内容相同的PDF不会重复转换')
+    convert_parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE // 1024 // 1024,
+                                help='页面缓存大小上限（MB），超过后淘汰最久未使用的页面')
+    convert_parser.add_argument('--no-cache', action='store_true',
+                                help='不使用页面缓存')
+    convert_parser.add_argument('--journal', default=DEFAULT_JOURNAL_PATH,
+                                help='任务日志文件，中断后重新运行会跳过已完成的文件并从中断处续传')
+    convert_parser.add_argument('--no-journal', action='store_true',
+                                help='不记录任务日志，每次都从头转换')
+    convert_parser.add_argument('--metrics-file',
+                                help='把各阶段耗时统计写入 JSON 文件，每完成一个文件更新一次')
+    convert_parser.add_argument('--metrics-port', type=int,
+                                help='在本机该端口提供 Prometheus 抓取接口 /metrics')
+    convert_parser.add_argument('--stats', action='store_true',
+                                help='结束时输出各阶段耗时摘要')
+    convert_parser.add_argument('-q', '--quiet', action='store_true',
+                                help='只输出错误信息')
+    add_ocr_options(convert_parser)
+    convert_parser.set_defaults(func=run_convert)
+
+    watch_parser = subparsers.add_parser('watch', help='监视文件夹，持续转换新出现的PDF')
+    watch_parser.add_argument('directories', nargs='+', help='要监视的目录')
+    watch_parser.add_argument('-r', '--recursive', action='store_true',
+                              help='同时监视子目录')
+    watch_parser.add_argument('-o', '--output-dir',
+                              help='输出目录（保留子目录层级），默认输出到PDF同目录')
+    watch_parser.add_argument('-j', '--workers', type=int, default=None,
+                              help='并行进程数，默认等于CPU核数，其中一个专门处理小文件')
+    watch_parser.add_argument('--memory-limit', type=int, default=DEFAULT_MEMORY_LIMIT // 1024 // 1024,
+                              help='每个工作进程的内存上限（MB），0 表示不限制')
+    watch_parser.add_argument('--ocr', choices=OCR_MODES, default=OCR_OFF,
+                              help='OCR模式：off 不识别，auto 仅识别无文本页面，force 识别所有页面')
+    watch_parser.add_argument('--backend', choices=BACKENDS, default=BACKEND_PDFPLUMBER,
+                              help='文本提取后端')
+    watch_parser.add_argument('--settle', type=float, default=DEFAULT_SETTLE,
+                              help='文件大小保持不变多少秒后才开始转换')
+    watch_parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL,
+                              help='未安装 watchdog 时扫描目录的间隔（秒）')
+    watch_parser.add_argument('--queue', default=DEFAULT_QUEUE_PATH,
+                              help='任务队列文件，重启后继续处理未完成的任务')
+    watch_parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                              help='页面缓存目录')
+    watch_parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE // 1024 // 1024,
+                              help='页面缓存大小上限（MB）')
+    watch_parser.add_argument('--no-cache', action='store_true',
+                              help='不使用页面缓存')
+    watch_parser.add_argument('--journal', default=DEFAULT_JOURNAL_PATH,
+                              help='任务日志文件，用于从中断处续传')
+    watch_parser.add_argument('-q', '--quiet', action='store_true',
+                              help='只输出错误信息')
+    add_ocr_options(watch_parser)
+    watch_parser.set_defaults(func=run_watch)
+
+    serve_parser = subparsers.add_parser('serve', help='启动本机 HTTP 转换服务')
+    serve_parser.add_argument('--host', default=DEFAULT_HOST,
+                              help='监听地址，默认只接受本机连接')
+    serve_parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                              help='监听端口')
+    serve_parser.add_argument('--allow-dir', action='append', default=[], metavar='DIR',
+                              help='允许客户端用 path 参数指定的目录（含子目录），可重复；默认不允许，只能上传')
+    serve_parser.add_argument('-j', '--workers', type=int, default=None,
+                              help='所有请求共用的进程数，默认等于CPU核数')
+    serve_parser.add_argument('--pages-per-task', type=int, default=DEFAULT_PAGES_PER_TASK,
+                              help='每个任务转换的页数')
+    serve_parser.add_argument('--memory-limit', type=int, default=DEFAULT_MEMORY_LIMIT // 1024 // 1024,
+                              help='每个工作进程的内存上限（MB），0 表示不限制')
+    serve_parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                              help='页面缓存目录')
+    serve_parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE // 1024 // 1024,
+                              help='页面缓存大小上限（MB）')
+    serve_parser.add_argument('--no-cache', action='store_true',
+                              help='不使用页面缓存')
+    serve_parser.add_argument('-q', '--quiet', action='store_true',
+                              help='只输出错误信息')
+    add_ocr_options(serve_parser)
+    serve_parser.set_defaults(func=run_serve)
+
+    coordinate_parser = subparsers.add_parser('coordinate', help='把转换任务分发到共享队列，由各节点的工作进程完成')
+    coordinate_parser.add_argument('inputs', nargs='+',
+                                   help='PDF文件、目录或通配符，所有工作节点需要能以相同路径访问')
+    coordinate_parser.add_argument('--queue', required=True,
+                                   help='共享队列：SQLite 文件路径（放在共享目录中）或 redis://host:port/0')
+    coordinate_parser.add_argument('-r', '--recursive', action='store_true',
+                                   help='递归处理子目录')
+    coordinate_parser.add_argument('-o', '--output-dir',
+                                   help='输出目录，默认输出到PDF同目录')
+    coordinate_parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS, default=FORMAT_TXT,
+                                   help='输出格式')
+    coordinate_parser.add_argument('--pages-per-task', type=int, default=DEFAULT_PAGES_PER_TASK,
+                                   help='每个任务转换的页数')
+    coordinate_parser.add_argument('--max-queued', type=int, default=DEFAULT_MAX_QUEUED,
+                                   help='同时放在队列中的任务数，限制等待拼接的页面占用的内存')
+    coordinate_parser.add_argument('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS,
+                                   help='单个任务最多尝试的次数（出错或租约过期都计一次）')
+    coordinate_parser.add_argument('--ocr', choices=OCR_MODES, default=OCR_OFF,
+                                   help='OCR模式：off 不识别，auto 仅识别无文本页面，force 识别所有页面')
+    coordinate_parser.add_argument('--backend', choices=BACKENDS, default=BACKEND_PDFPLUMBER,
+                                   help='文本提取后端')
+    coordinate_parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                                   help='页面缓存目录（仅协调者使用）')
+    coordinate_parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE // 1024 // 1024,
+                                   help='页面缓存大小上限（MB）')
+    coordinate_parser.add_argument('--no-cache', action='store_true',
+                                   help='不使用页面缓存')
+    coordinate_parser.add_argument('--stats', action='store_true',
+                                   help='结束时输出各阶段耗时摘要（包含各工作进程的统计）')
+    coordinate_parser.add_argument('-q', '--quiet', action='store_true',
+                                   help='只输出错误信息')
+    add_ocr_options(coordinate_parser)
+    coordinate_parser.set_defaults(func=run_coordinate)
+
+    worker_parser = subparsers.add_parser('worker', help='从共享队列租用任务并转换')
+    worker_parser.add_argument('--queue', required=True,
+                               help='共享队列：SQLite 文件路径或 redis://host:port/0')
+    worker_parser.add_argument('-j', '--workers', type=int, default=None,
+                               help='本机工作进程数，默认等于CPU核数')
+    worker_parser.add_argument('--lease', type=float, default=DEFAULT_LEASE,
+                               help='任务租约时长（秒），工作进程失联超过该时间后任务重新排队')
+    worker_parser.add_argument('--memory-limit', type=int, default=DEFAULT_MEMORY_LIMIT // 1024 // 1024,
+                               help='每个工作进程的内存上限（MB），0 表示不限制')
+    worker_parser.add_argument('--exit-when-idle', type=float, default=None,
+                               help='队列空闲这么多秒后退出，默认一直运行')
+    worker_parser.add_argument('-q', '--quiet', action='store_true',
+                               help='只输出错误信息')
+    worker_parser.set_defaults(func=run_worker)
+
+    bench_parser = subparsers.add_parser('bench', help='运行性能基准测试，输出 JSON')
+    bench_parser.add_argument('-o', '--output', help='结果输出文件，默认输出到标准输出')
+    bench_parser.add_argument('--baseline', help='用于比较的基线结果文件，存在性能回退时返回码为1')
+    bench_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                              help='判定回退的比例，默认 0.10')
+    bench_parser.add_argument('--scale', type=float, default=1.0,
+                              help='语料页数缩放比例，如 0.1 用于快速检查')
+    bench_parser.add_argument('--corpus-dir', help='保存生成的语料，默认使用临时目录')
+    bench_parser.add_argument('-j', '--workers', type=int, default=None,
+                              help='进程池整体吞吐测试的进程数，默认等于CPU核数')
+    bench_parser.add_argument('--backends', nargs='+', choices=(BACKEND_PDFPLUMBER, BACKEND_PDFIUM), default=None,
+                              help='要测试的提取后端，默认全部')
+    bench_parser.set_defaults(func=run_bench_command)
+    return parser
+
+
+def run_convert(args):
+    paths = collect_pdf_paths(args.inputs, args.recursive)
+    if not paths:
+        print('没有找到需要转换的PDF文件', file=sys.stderr)
+        return 1
+
+    metrics = Metrics()
+
+    def report(file_data, success):
+        if success and not args.quiet:
+            if file_data.get("archive_member"):
+                print(f"已完成: {file_data['path']} -> {args.archive}:{file_data['archive_member']}")
+            elif file_data.get("skipped"):
+                print(f"已跳过（此前已完成）: {file_data['path']} -> {file_data['output_path']}")
+            elif file_data.get("resumed_from"):
+                print(f"已完成（从第 {file_data['resumed_from'] + 1} 页续传）: "
+                      f"{file_data['path']} -> {file_data['output_path']}")
+            else:
+                print(f"已完成: {file_data['path']} -> {file_data['output_path']}")
+        elif not success:
+            print(f"失败: {file_data['path']}: {file_data.get('error', '')}", file=sys.stderr)
+        if args.metrics_file:
+            metrics.write_json(args.metrics_file)
+
+    server = serve_metrics(metrics, args.metrics_port) if args.metrics_port else None
+    cache = None
+    if not args.no_cache:
+        cache = PageCache(args.cache_dir, args.cache_size * 1024 * 1024)
+    journal = None if args.no_journal else JobJournal(args.journal)
+    try:
+        results = convert_files(
+            paths,
+            output_dir=args.output_dir,
+            ocr_mode=args.ocr,
+            max_workers=args.workers,
+            on_file_done=report,
+            cache=cache,
+            memory_limit=args.memory_limit * 1024 * 1024 or None,
+            pages_per_task=args.pages_per_task,
+            backend=args.backend,
+            metrics=metrics,
+            journal=journal,
+            output_format=args.format,
+            archive=args.archive,
+            ocr_config=ocr_config_from_args(args)
+        )
+    finally:
+        if cache is not None:
+            cache.close()
+        if journal is not None:
+            journal.close()
+        if server is not None:
+            server.shutdown()
+        if args.metrics_file:
+            metrics.write_json(args.metrics_file)
+    if args.stats:
+        print(metrics.summary(), file=sys.stderr)
+    failed = [f for f in results if not f["success"]]
+    if not args.quiet:
+        print(f"共 {len(results)} 个文件，成功 {len(results) - len(failed)} 个，失败 {len(failed)} 个")
+    return 1 if failed else 0
+
+
+def run_watch(args):
+    def report(file_data, success):
+        if success and not args.quiet:
+            print(f"已完成: {file_data['path']} -> {file_data['output_path']}", flush=True)
+        elif not success:
+            print(f"失败: {file_data['path']}: {file_data.get('error', '')}", file=sys.stderr, flush=True)
+
+    cache = None
+    if not args.no_cache:
+        cache = PageCache(args.cache_dir, args.cache_size * 1024 * 1024)
+    journal = JobJournal(args.journal)
+    daemon = WatchDaemon(
+        args.directories,
+        output_dir=args.output_dir,
+        recursive=args.recursive,
+        max_workers=args.workers,
+        ocr_mode=args.ocr,
+        backend=args.backend,
+        queue_path=args.queue,
+        settle=args.settle,
+        poll_interval=args.poll_interval,
+        cache=cache,
+        journal=journal,
+        memory_limit=args.memory_limit * 1024 * 1024 or None,
+        on_file_done=report,
+        ocr_config=ocr_config_from_args(args)
+    )
+    if not args.quiet:
+        print(f"正在监视: {', '.join(daemon.watcher.directories)}（按 Ctrl+C 退出）", flush=True)
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if cache is not None:
+            cache.close()
+        journal.close()
+    return 0
+
+
+def run_serve(args):
+    import asyncio
+
+    cache = None
+    if not args.no_cache:
+        cache = PageCache(args.cache_dir, args.cache_size * 1024 * 1024)
+    service = ConversionService(
+        max_workers=args.workers,
+        cache=cache,
+        memory_limit=args.memory_limit * 1024 * 1024 or None,
+        pages_per_task=args.pages_per_task,
+        ocr_config=ocr_config_from_args(args),
+        allowed_dirs=args.allow_dir
+    )
+
+    def started():
+        if not args.quiet:
+            print(f"服务已启动: http://{args.host}:{args.port}（按 Ctrl+C 退出）", flush=True)
+
+    try:
+        asyncio.run(run_server(service, args.host, args.port, started))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if cache is not None:
+            cache.close()
+    return 0
+
+
+def run_coordinate(args):
+    paths = collect_pdf_paths(args.inputs, args.recursive)
+    if not paths:
+        print('没有找到需要转换的PDF文件', file=sys.stderr)
+        return 1
+
+    def report(file_data, success):
+        if success and not args.quiet:
+            print(f"已完成: {file_data['path']} -> {file_data['output_path']}", flush=True)
+        elif not success:
+            print(f"失败: {file_data['path']}: {file_data.get('error', '')}", file=sys.stderr, flush=True)
+
+    files = []
+    for path, relative in paths:
+        file_data = {"path": path, "name": os.path.basename(path)}
+        if args.output_dir:
+            file_data["output_path"] = str(Path(args.output_dir, relative).with_suffix(output_suffix(args.format)))
+        files.append(file_data)
+
+    metrics = Metrics()
+    cache = None
+    if not args.no_cache:
+        cache = PageCache(args.cache_dir, args.cache_size * 1024 * 1024)
+    queue = open_queue(args.queue)
+    coordinator = Coordinator(queue, args.pages_per_task, cache=cache, metrics=metrics,
+                              max_queued=args.max_queued, max_attempts=args.max_attempts,
+                              ocr_config=ocr_config_from_args(args))
+    if not args.quiet:
+        print(f"已提交到队列 {args.queue}，等待工作进程（python -m pdf_converter worker --queue ...）", flush=True)
+    try:
+        coordinator.convert(files, args.ocr, on_file_done=report, backend=args.backend,
+                            output_format=args.format)
+    finally:
+        queue.close()
+        if cache is not None:
+            cache.close()
+    if args.stats:
+        print(metrics.summary(), file=sys.stderr)
+    failed = [f for f in files if "error" in f or "total_pages" not in f]
+    if not args.quiet:
+        print(f"共 {len(files)} 个文件，成功 {len(files) - len(failed)} 个，失败 {len(failed)} 个")
+    return 1 if failed else 0
+
+
+def run_worker(args):
+    if not args.quiet:
+        print(f"工作进程已启动，队列 {args.queue}（按 Ctrl+C 退出）", flush=True)
+    run_workers(args.queue, args.workers, args.lease, args.memory_limit * 1024 * 1024 or None,
+                args.exit_when_idle)
+    return 0
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.ERROR if getattr(args, 'quiet', False) else logging.WARNING)
+    return args.func(args)
@@ -0,0 +1,189 @@
+"""不依赖 GUI 的转换接口"""
+import glob
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .backends import BACKEND_PDFPLUMBER, read_page_count
+from .engine import DEFAULT_MEMORY_LIMIT, DEFAULT_PAGES_PER_TASK, ConversionEngine
+from .ocr import OCR_OFF
+from .output import FORMAT_TXT, BatchArchive, output_suffix
+from .sources import MEMORY_LABEL, SharedPdf, is_path
+
+
+# 文件数达到该值时才在进程池中读取页数，少量文件直接读取更快
+PARALLEL_COUNT_THRESHOLD = 64
+PAGE_COUNT_WORKERS = 4
+PAGE_COUNT_CHUNK_SIZE = 32
+
+
+class ConversionError(Exception):
+    """PDF转换失败"""
+
+
+def path_key(path):
+    """用于判断重复文件的路径键"""
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _page_count_or_error(path):
+    try:
+        return read_page_count(path), None
+    except Exception as e:
+        return None, str(e)
+
+
+def read_page_counts(paths: List[str], max_workers: Optional[int] = None):
+    """读取一批PDF的页数，按输入顺序逐个返回 (路径, 页数, 错误信息)
+
+    只读取页面树根节点记录的页数，不解析页面；文件较多时在进程池中并行读取。
+    """
+    if len(paths) < PARALLEL_COUNT_THRESHOLD:
+        for path in paths:
+            yield (path,) + _page_count_or_error(path)
+        return
+    executor = ProcessPoolExecutor(max_workers=max_workers or min(PAGE_COUNT_WORKERS, os.cpu_count() or 1))
+    try:
+        results = executor.map(_page_count_or_error, paths, chunksize=PAGE_COUNT_CHUNK_SIZE)
+        for path, result in zip(paths, results):
+            yield (path,) + result
+    finally:
+        # 调用方提前停止迭代时取消尚未开始的文件，也不等待正在读取的文件
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def collect_pdf_paths(inputs: Iterable[str], recursive: bool = False) -> List[Tuple[str, str]]:
+    """展开文件、目录和通配符，返回 (PDF路径, 相对输出路径) 列表
+
+    目录中的文件保留相对于该目录的层级，便于在输出目录中还原结构；
+    单个文件和通配符匹配结果只保留文件名。重复路径只保留第一次出现。
+    """
+    results = []
+    seen = set()
+
+    def add(path, relative):
+        key = path_key(path)
+        if key not in seen:
+            seen.add(key)
+            results.append((path, relative))
+
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(glob.escape(item), '**' if recursive else '', '*')
+            for path in sorted(glob.glob(pattern, recursive=recursive)):
+                if path.lower().endswith('.pdf') and os.path.isfile(path):
+                    add(path, os.path.relpath(path, item))
+        elif glob.has_magic(item):
+            for path in sorted(glob.glob(item, recursive=recursive)):
+                if path.lower().endswith('.pdf') and os.path.isfile(path):
+                    add(path, os.path.basename(path))
+        else:
+            add(item, os.path.basename(item))
+    return results
+
+
+def convert_files(paths: Iterable, output_dir: Optional[str] = None,
+                  ocr_mode: str = OCR_OFF, max_workers: Optional[int] = None,
+                  on_page: Optional[Callable] = None,
+                  on_file_done: Optional[Callable] = None,
+                  logger=None, cache=None,
+                  memory_limit: Optional[int] = DEFAULT_MEMORY_LIMIT,
+                  pages_per_task: int = DEFAULT_PAGES_PER_TASK,
+                  backend: str = BACKEND_PDFPLUMBER, metrics=None,
+                  journal=None, output_format: str = FORMAT_TXT,
+                  archive: Optional[str] = None, ocr_config=None) -> List[Dict]:
+    """批量转换PDF文件，返回每个文件的 file_data 字典
+
+    paths 可以是路径，也可以是 collect_pdf_paths 返回的 (路径, 相对输出路径)；
+    内存中的PDF（bytes、文件对象或 mmap）以 (内容, 相对输出路径) 给出，需要 output_dir 或 archive。
+    未指定 output_dir 时输出到PDF同目录。cache 为 PageCache 时复用已转换的页面。
+    memory_limit 为每个工作进程的常驻内存上限（字节）。backend 为提取后端
+    （pdfplumber / pdfium / auto）。metrics 为 Metrics 时累计各阶段耗时。
+    journal 为 JobJournal 时跳过已完成的文件，并从中断处续传。
+    output_format 为输出格式（txt / jsonl / indexed）。ocr_config 为 OcrConfig 时使用其中的OCR参数。
+    archive 为 zip 文件路径时，整批结果按相对输出路径写入这一个压缩包（archive_member
+    为包内路径），此时不使用 output_dir 和任务日志。
+    结果中 success 表示是否成功，失败时 error 为错误信息。
+    """
+    staging = None
+    if archive:
+        # 中间文件放在压缩包同目录，加入压缩包后随即删除
+        staging = tempfile.mkdtemp(prefix='.pdf_converter_', dir=os.path.dirname(os.path.abspath(archive)))
+        output_dir = staging
+        journal = None
+    files = []
+    for item in paths:
+        path, relative = item if isinstance(item, tuple) else (item, os.path.basename(item))
+        if is_path(path):
+            file_data = {"path": str(path), "name": os.path.basename(path)}
+        else:
+            file_data = {"name": os.path.basename(relative)}
+            file_data["source" if isinstance(path, SharedPdf) else "data"] = path
+        if output_dir:
+            file_data["output_path"] = str(Path(output_dir, relative).with_suffix(output_suffix(output_format)))
+        files.append(file_data)
+
+    writer = None
+
+    def handle_file_done(file_data, success):
+        if success and writer is not None:
+            member = os.path.relpath(file_data["output_path"], staging).replace(os.sep, '/')
+            try:
+                writer.add(file_data["output_path"], file_data["format"], member)
+                file_data["archive_member"] = member
+            except OSError as e:
+                file_data["error"] = f"写入压缩包失败: {str(e)}"
+                success = False
+        file_data["success"] = success
+        if on_file_done:
+            on_file_done(file_data, success)
+
+    engine = ConversionEngine(max_workers, pages_per_task, logger=logger, cache=cache,
+                              memory_limit=memory_limit, metrics=metrics, journal=journal,
+                              ocr_config=ocr_config)
+    try:
+        if archive:
+            writer = BatchArchive(archive)
+        engine.convert(files, ocr_mode, on_page=on_page, on_file_done=handle_file_done,
+                       backend=backend, output_format=output_format)
+    except BaseException:
+        if writer is not None:
+            writer.discard()
+        raise
+    else:
+        if writer is not None:
+            writer.close()
+    finally:
+        if staging is not None:
+            shutil.rmtree(staging, ignore_errors=True)
+    for file_data in files:
+        file_data.setdefault("success", False)
+    return files
+
+
+def convert_pdf(pdf_path, output_path: Optional[str] = None,
+                ocr_mode: str = OCR_OFF, max_workers: Optional[int] = None,
+                cache=None, backend: str = BACKEND_PDFPLUMBER, journal=None,
+                output_format: str = FORMAT_TXT, ocr_config=None, name: Optional[str] = None) -> str:
+    """转换单个PDF文件，返回输出文件路径，失败时抛出 ConversionError
+
+    pdf_path 也可以是内存中的PDF：bytes、bytearray、memoryview、mmap、二进制文件对象
+    或 SharedPdf，此时必须指定 output_path，name 为日志中显示的名称。
+    内容只复制一次到共享内存，各工作进程直接映射，不写临时文件。
+    """
+    if is_path(pdf_path):
+        file_data = {"path": str(pdf_path), "name": os.path.basename(pdf_path)}
+    else:
+        label = name or MEMORY_LABEL
+        file_data = {"path": label, "name": label}
+        file_data["source" if isinstance(pdf_path, SharedPdf) else "data"] = pdf_path
+    if output_path:
+        file_data["output_path"] = str(output_path)
+    engine = ConversionEngine(max_workers, cache=cache, journal=journal, ocr_config=ocr_config)
+    engine.convert([file_data], ocr_mode, backend=backend, output_format=output_format)
+    if "error" in file_data or not (file_data.get("skipped") or "total_pages" in file_data):
+        raise ConversionError(file_data.get("error", f"转换失败: {file_data['path']}"))
+    return file_data["output_path"]
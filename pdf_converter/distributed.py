@@ -0,0 +1,601 @@
+"""多节点分布式转换
+
+协调者把一批PDF拆成页段任务放进共享队列，各节点上的工作进程租用任务、转换后把结果写回队列，
+协调者再按页码顺序拼接输出。PDF路径以绝对路径入队，所有节点需要通过共享文件系统看到相同的路径。
+
+队列有两种实现，接口相同：
+- SqliteTaskQueue：单个 SQLite 文件，可放在共享目录中，不需要额外服务；
+- RedisTaskQueue：需要安装 redis 包，适合节点较多、共享文件系统锁不可靠的场合。
+
+工作进程租用任务后定期续租（心跳），进程或节点失联时租约到期，任务重新排队；
+单个任务最多尝试 max_attempts 次，仍然失败时整个文件记为失败。
+协调者只让有限数量的任务在队列中等待，乱序完成的页段占用的内存与文档页数无关。
+"""
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .backends import BACKEND_PDFPLUMBER, resolve_backend
+from .engine import (
+    DEFAULT_MEMORY_LIMIT, DEFAULT_PAGES_PER_TASK, _FileState, cacheable_pages, convert_page_range,
+    extraction_settings, inspect_pdf, plan_ranges,
+)
+from .metrics import Metrics, run_with_metrics
+from .ocr import DEFAULT_OCR_CONFIG, OCR_OFF, OcrConfig
+from .output import FORMAT_TXT, OUTPUT_FORMATS, output_suffix
+from .sources import MEMORY_LABEL
+
+DEFAULT_LEASE = 60.0
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_POLL_INTERVAL = 0.5
+
+# 协调者同时放在队列中的任务数
+DEFAULT_MAX_QUEUED = 256
+
+TASK_PENDING = 'pending'
+TASK_LEASED = 'leased'
+TASK_DONE = 'done'
+TASK_FAILED = 'failed'
+
+# 从待处理列表取出任务并登记租约，在 Redis 中原子执行，取出后、登记前工作节点失联也不会丢失任务；
+# 记录已被删除（所在批次已取消）的任务直接丢弃，继续取下一个
+_REDIS_LEASE_SCRIPT = """
+while true do
+    local task_id = redis.call('RPOP', KEYS[1])
+    if not task_id then
+        return nil
+    end
+    local key = ARGV[1] .. ':task:' .. task_id
+    local payload = redis.call('HGET', key, 'payload')
+    if payload then
+        redis.call('HINCRBY', key, 'attempts', 1)
+        redis.call('HSET', key, 'worker', ARGV[2])
+        redis.call('ZADD', KEYS[2], ARGV[3], task_id)
+        return {task_id, payload}
+    end
+end
+"""
+
+
+def new_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+class SqliteTaskQueue:
+    """基于 SQLite 文件的任务队列，可被多个进程、多个节点共享
+
+    网络文件系统上无法使用 WAL 所需的共享内存，因此使用默认的回滚日志；
+    租用任务在写事务（BEGIN IMMEDIATE）中完成，同一任务不会被两个进程同时租到。
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                batch TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                worker TEXT,
+                lease_until REAL,
+                result TEXT,
+                error TEXT
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, id)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS tasks_batch ON tasks (batch, status)")
+
+    def _write(self, func):
+        """在写事务中执行 func(conn)"""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(self.conn)
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            return result
+
+    def put(self, batch: str, payload: Dict, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> int:
+        return self._write(lambda conn: conn.execute(
+            "INSERT INTO tasks (batch, payload, status, max_attempts) VALUES (?, ?, ?, ?)",
+            (batch, json.dumps(payload), TASK_PENDING, max_attempts)
+        ).lastrowid)
+
+    def lease(self, worker: str, lease_seconds: float = DEFAULT_LEASE):
+        """租用最早入队的任务，返回 (任务编号, 任务内容)；没有任务时返回 None"""
+        def lease(conn):
+            now = time.time()
+            # 租约到期的任务视为失败一次
+            conn.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts >= max_attempts THEN ? ELSE ? END, "
+                "error = '租约过期', worker = NULL WHERE status = ? AND lease_until < ?",
+                (TASK_FAILED, TASK_PENDING, TASK_LEASED, now)
+            )
+            row = conn.execute(
+                "SELECT id, payload FROM tasks WHERE status = ? ORDER BY id LIMIT 1", (TASK_PENDING,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE tasks SET status = ?, worker = ?, lease_until = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                (TASK_LEASED, worker, now + lease_seconds, row[0])
+            )
+            return row[0], json.loads(row[1])
+        return self._write(lease)
+
+    def heartbeat(self, task_id: int, worker: str, lease_seconds: float = DEFAULT_LEASE) -> bool:
+        """续租，租约已被收回时返回 False"""
+        return self._write(lambda conn: conn.execute(
+            "UPDATE tasks SET lease_until = ? WHERE id = ? AND worker = ? AND status = ?",
+            (time.time() + lease_seconds, task_id, worker, TASK_LEASED)
+        ).rowcount == 1)
+
+    def complete(self, task_id: int, worker: str, result: Dict) -> bool:
+        return self._write(lambda conn: conn.execute(
+            "UPDATE tasks SET status = ?, result = ?, worker = NULL WHERE id = ? AND worker = ? AND status = ?",
+            (TASK_DONE, json.dumps(result, ensure_ascii=False), task_id, worker, TASK_LEASED)
+        ).rowcount == 1)
+
+    def fail(self, task_id: int, worker: str, error: str) -> bool:
+        """任务出错，未达到最大尝试次数时重新排队"""
+        return self._write(lambda conn: conn.execute(
+            "UPDATE tasks SET status = CASE WHEN attempts >= max_attempts THEN ? ELSE ? END, "
+            "error = ?, worker = NULL WHERE id = ? AND worker = ? AND status = ?",
+            (TASK_FAILED, TASK_PENDING, error, task_id, worker, TASK_LEASED)
+        ).rowcount == 1)
+
+    def release(self, task_id: int, worker: str):
+        """工作进程退出时归还任务，不计入尝试次数"""
+        self._write(lambda conn: conn.execute(
+            "UPDATE tasks SET status = ?, attempts = attempts - 1, worker = NULL "
+            "WHERE id = ? AND worker = ? AND status = ?",
+            (TASK_PENDING, task_id, worker, TASK_LEASED)
+        ))
+
+    def finished(self, batch: str) -> List[tuple]:
+        """取出已结束的任务 [(任务编号, 状态, 结果, 错误信息)] 并从队列中删除"""
+        def take(conn):
+            rows = conn.execute(
+                "SELECT id, status, result, error FROM tasks WHERE batch = ? AND status IN (?, ?)",
+                (batch, TASK_DONE, TASK_FAILED)
+            ).fetchall()
+            conn.executemany("DELETE FROM tasks WHERE id = ?", [(row[0],) for row in rows])
+            return rows
+        return [
+            (task_id, status, json.loads(result) if result else None, error)
+            for task_id, status, result, error in self._write(take)
+        ]
+
+    def cancel(self, batch: str):
+        """删除整批任务"""
+        self._write(lambda conn: conn.execute("DELETE FROM tasks WHERE batch = ?", (batch,)))
+
+    def discard(self, task_ids: List[int]):
+        """删除指定的任务，租用中的任务之后无法续租或提交"""
+        self._write(lambda conn: conn.executemany(
+            "DELETE FROM tasks WHERE id = ?", [(task_id,) for task_id in task_ids]
+        ))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class RedisTaskQueue:
+    """基于 Redis 的任务队列，接口与 SqliteTaskQueue 相同
+
+    待处理任务为列表，租用中的任务放在按到期时间排序的有序集合中，两者之间的移动由 Lua 脚本原子完成；
+    只有成功把任务移出有序集合的一方才能改变它的状态，心跳与回收之间不会重复处理。
+    每批任务的编号另存一个集合，取消时不需要扫描全部任务。
+    """
+
+    def __init__(self, url: str, prefix: str = 'pdf_converter', client=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.redis = client
+        self.prefix = prefix
+        self._lease_script = self.redis.register_script(_REDIS_LEASE_SCRIPT)
+
+    def _key(self, *parts):
+        return ':'.join((self.prefix,) + tuple(str(part) for part in parts))
+
+    def put(self, batch, payload, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        task_id = self.redis.incr(self._key('next_id'))
+        pipe = self.redis.pipeline()
+        pipe.hset(self._key('task', task_id), mapping={
+            "batch": batch, "payload": json.dumps(payload), "attempts": 0, "max_attempts": max_attempts,
+        })
+        pipe.sadd(self._key('batch', batch), task_id)
+        pipe.lpush(self._key('pending'), task_id)
+        pipe.execute()
+        return task_id
+
+    def _retry(self, task_id, error):
+        """租用中的任务出错：重新排队或记为失败"""
+        key = self._key('task', task_id)
+        attempts, max_attempts, batch = self.redis.hmget(key, "attempts", "max_attempts", "batch")
+        if batch is None:
+            return
+        if int(attempts) >= int(max_attempts):
+            self._finish(task_id, batch.decode(), TASK_FAILED, None, error)
+        else:
+            pipe = self.redis.pipeline()
+            pipe.hset(key, "worker", "")
+            pipe.rpush(self._key('pending'), task_id)
+            pipe.execute()
+
+    def _finish(self, task_id, batch, status, result, error):
+        record = json.dumps({"id": int(task_id), "status": status, "result": result, "error": error},
+                            ensure_ascii=False)
+        pipe = self.redis.pipeline()
+        pipe.rpush(self._key('finished', batch), record)
+        pipe.delete(self._key('task', task_id))
+        pipe.srem(self._key('batch', batch), task_id)
+        pipe.execute()
+
+    def lease(self, worker, lease_seconds=DEFAULT_LEASE):
+        now = time.time()
+        for task_id in self.redis.zrangebyscore(self._key('leased'), '-inf', now):
+            if self.redis.zrem(self._key('leased'), task_id):
+                self._retry(int(task_id), '租约过期')
+        leased = self._lease_script(keys=[self._key('pending'), self._key('leased')],
+                                    args=[self.prefix, worker, repr(now + lease_seconds)])
+        if leased is None:
+            return None
+        task_id, payload = leased
+        return int(task_id), json.loads(payload)
+
+    def _owned(self, task_id, worker):
+        owner = self.redis.hget(self._key('task', task_id), "worker")
+        return owner is not None and owner.decode() == worker
+
+    def heartbeat(self, task_id, worker, lease_seconds=DEFAULT_LEASE):
+        if not self._owned(task_id, worker):
+            return False
+        # XX：只更新仍在有序集合中的任务，已被回收的不会重新加入
+        return self.redis.zadd(self._key('leased'), {task_id: time.time() + lease_seconds},
+                               xx=True, ch=True) == 1
+
+    def complete(self, task_id, worker, result):
+        if not self._owned(task_id, worker) or not self.redis.zrem(self._key('leased'), task_id):
+            return False
+        batch = self.redis.hget(self._key('task', task_id), "batch")
+        if batch is None:
+            return False
+        self._finish(task_id, batch.decode(), TASK_DONE, result, None)
+        return True
+
+    def fail(self, task_id, worker, error):
+        if not self._owned(task_id, worker) or not self.redis.zrem(self._key('leased'), task_id):
+            return False
+        self._retry(task_id, error)
+        return True
+
+    def release(self, task_id, worker):
+        if self._owned(task_id, worker) and self.redis.zrem(self._key('leased'), task_id):
+            key = self._key('task', task_id)
+            pipe = self.redis.pipeline()
+            pipe.hincrby(key, "attempts", -1)
+            pipe.hset(key, "worker", "")
+            pipe.rpush(self._key('pending'), task_id)
+            pipe.execute()
+
+    def finished(self, batch):
+        key = self._key('finished', batch)
+        pipe = self.redis.pipeline()
+        pipe.lrange(key, 0, -1)
+        pipe.delete(key)
+        records = [json.loads(item) for item in pipe.execute()[0]]
+        return [(r["id"], r["status"], r["result"], r["error"]) for r in records]
+
+    def cancel(self, batch):
+        # 仍在排队的任务在被租用时发现记录已删除而丢弃
+        batch_key = self._key('batch', batch)
+        task_ids = self.redis.smembers(batch_key)
+        pipe = self.redis.pipeline()
+        for task_id in task_ids:
+            pipe.delete(self._key('task', task_id.decode()))
+            pipe.zrem(self._key('leased'), task_id)
+        pipe.delete(batch_key, self._key('finished', batch))
+        pipe.execute()
+
+    def discard(self, task_ids):
+        pipe = self.redis.pipeline()
+        for task_id in task_ids:
+            pipe.hget(self._key('task', task_id), "batch")
+        batches = pipe.execute()
+        pipe = self.redis.pipeline()
+        for task_id, batch in zip(task_ids, batches):
+            if batch is None:
+                continue
+            pipe.delete(self._key('task', task_id))
+            pipe.zrem(self._key('leased'), task_id)
+            pipe.srem(self._key('batch', batch.decode()), task_id)
+        pipe.execute()
+
+    def close(self):
+        self.redis.close()
+
+
+def open_queue(spec: str):
+    """按队列地址打开队列：redis:// 或 rediss:// 开头时使用 Redis，否则为 SQLite 文件路径"""
+    if spec.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisTaskQueue(spec)
+    return SqliteTaskQueue(spec)
+
+
+class Coordinator:
+    """把一批文件拆成页段任务放进队列，收集结果并按页码顺序写出"""
+
+    def __init__(self, queue, pages_per_task: int = DEFAULT_PAGES_PER_TASK, logger=None,
+                 cache=None, metrics: Optional[Metrics] = None,
+                 max_queued: int = DEFAULT_MAX_QUEUED,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 ocr_config: Optional[OcrConfig] = None):
+        self.queue = queue
+        self.pages_per_task = max(1, pages_per_task)
+        self.ocr_config = ocr_config or DEFAULT_OCR_CONFIG
+        self.logger = logger or logging.getLogger('PDFConverter')
+        self.cache = cache
+        self.metrics = metrics or Metrics()
+        self.max_queued = max(1, max_queued)
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def convert(self, files: List[Dict], ocr_mode: str = OCR_OFF,
+                on_page: Optional[Callable] = None,
+                on_file_done: Optional[Callable] = None,
+                backend: str = BACKEND_PDFPLUMBER,
+                output_format: str = FORMAT_TXT):
+        """经由队列转换一批文件，参数和 file_data 的约定与 ConversionEngine.convert 相同
+
+        协调者所在进程只读取页数、写出结果，页面转换全部由工作进程完成。
+        """
+        batch = uuid.uuid4().hex
+        states = []
+        queued = {}
+
+        def finish(state, success):
+            try:
+                state.close(success)
+            except OSError as e:
+                self.logger.error(f"写入输出失败: {state.file_data['output_path']}: {str(e)}")
+                state.file_data["error"] = str(e)
+                success = False
+            self.metrics.increment("files_converted" if success else "files_failed")
+            if on_file_done:
+                on_file_done(state.file_data, success)
+
+        def fail(file_data, error):
+            self.logger.error(f"转换失败: {file_data['path']}: {error}")
+            file_data["error"] = error
+            self.metrics.increment("files_failed")
+            if on_file_done:
+                on_file_done(file_data, False)
+
+        def plan_tasks():
+            for file_data in files:
+                if not self.running:
+                    return
+                if "data" in file_data or "source" in file_data:
+                    # 工作进程可能在其他机器上，只能按路径读取
+                    file_data.setdefault("path", file_data.get("name") or MEMORY_LABEL)
+                    fail(file_data, "经由队列转换只支持文件路径，不支持内存中的PDF")
+                    continue
+                file_data["path"] = os.path.abspath(file_data["path"])
+                try:
+                    file_data["backend"] = resolve_backend(file_data.get("backend") or backend, file_data["path"])
+                    file_data["format"] = file_data.get("format") or output_format
+                    if file_data["format"] not in OUTPUT_FORMATS:
+                        raise ValueError(f"未知的输出格式: {file_data['format']}")
+                    total_pages, doc_hash = inspect_pdf(file_data["path"], self.cache is not None,
+                                                        file_data["backend"])
+                except Exception as e:
+                    fail(file_data, str(e))
+                    continue
+                if not file_data.get("output_path"):
+                    file_data["output_path"] = str(
+                        Path(file_data["path"]).with_suffix(output_suffix(file_data["format"]))
+                    )
+                file_data["total_pages"] = total_pages
+                file_data["hash"] = doc_hash
+                state = _FileState(file_data, total_pages, doc_hash, self.metrics)
+                state.settings = extraction_settings(ocr_mode, file_data["backend"], self.ocr_config)
+                states.append(state)
+                cached = self.cache.get_pages(doc_hash, state.settings) if self.cache is not None else {}
+                if cached:
+                    self.metrics.increment("cache_hit_pages", len(cached))
+                ranges = list(plan_ranges(total_pages, cached, self.pages_per_task))
+                for start, end, texts in ranges:
+                    if texts is not None:
+                        state.pending[start] = (texts, None)
+                state.write_ready(on_page)
+                if state.done:
+                    finish(state, True)
+                    continue
+                for start, end, texts in ranges:
+                    # 文件已因其他页段失败而结束时，余下的页段不再入队
+                    if texts is None and not state.finished:
+                        yield state, {
+                            "path": file_data["path"], "start": start, "end": end, "ocr_mode": ocr_mode,
+                            "backend": file_data["backend"],
+                            # 有缓存时同样需要详情，OCR失败的页面不写入缓存
+                            "details": state.writer.needs_details or self.cache is not None,
+                            "ocr_config": self.ocr_config.to_dict(),
+                        }
+
+        def handle(task_id, status, result, error):
+            state, start = queued.pop(task_id)
+            if state.finished:
+                return
+            if status != TASK_DONE:
+                state.file_data["error"] = error or '转换失败'
+                self.logger.error(f"转换失败: {state.file_data['path']}: {state.file_data['error']}")
+                finish(state, False)
+                # 同一文件余下的页段不再需要，从队列中删除，工作进程不再为它转换
+                remaining = [other for other, (owner, _) in queued.items() if owner is state]
+                for other in remaining:
+                    del queued[other]
+                if remaining:
+                    self.queue.discard(remaining)
+                return
+            self.metrics.merge(result["stats"])
+            if self.cache is not None and state.doc_hash:
+                try:
+                    self.cache.put_pages(state.doc_hash, state.settings,
+                                         cacheable_pages(start, result["texts"], result.get("details")))
+                except Exception as e:
+                    self.logger.warning(f"写入缓存失败: {str(e)}")
+            state.pending[start] = (result["texts"], result.get("details"))
+            state.write_ready(on_page)
+            if state.done:
+                finish(state, True)
+
+        try:
+            tasks = plan_tasks()
+            exhausted = False
+            while self.running:
+                while not exhausted and len(queued) < self.max_queued:
+                    task = next(tasks, None)
+                    if task is None:
+                        exhausted = True
+                        break
+                    state, payload = task
+                    task_id = self.queue.put(batch, payload, self.max_attempts)
+                    queued[task_id] = (state, payload["start"])
+                if not queued:
+                    break
+                finished = self.queue.finished(batch)
+                for task_id, status, result, error in finished:
+                    if task_id in queued:
+                        handle(task_id, status, result, error)
+                if not finished:
+                    time.sleep(self.poll_interval)
+        finally:
+            if queued:
+                self.queue.cancel(batch)
+            for state in states:
+                if not state.finished:
+                    finish(state, False)
+
+
+class QueueWorker:
+    """从队列租用页段任务并转换，转换期间在后台线程中续租"""
+
+    def __init__(self, queue, worker_id: Optional[str] = None, lease_seconds: float = DEFAULT_LEASE,
+                 memory_limit: Optional[int] = DEFAULT_MEMORY_LIMIT, logger=None,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL):
+        self.queue = queue
+        self.worker_id = worker_id or new_worker_id()
+        self.lease_seconds = lease_seconds
+        self.memory_limit = memory_limit
+        self.logger = logger or logging.getLogger('PDFConverter')
+        self.poll_interval = poll_interval
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def _heartbeat(self, task_id, done):
+        while not done.wait(self.lease_seconds / 3):
+            try:
+                if not self.queue.heartbeat(task_id, self.worker_id, self.lease_seconds):
+                    self.logger.warning(f"任务 {task_id} 的租约已被收回")
+                    return
+            except Exception as e:
+                self.logger.warning(f"续租失败: {str(e)}")
+
+    def run_task(self, task_id, payload):
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(task_id, done), daemon=True)
+        heartbeat.start()
+        try:
+            result, stats = run_with_metrics(
+                convert_page_range, payload["path"], payload["start"], payload["end"],
+                payload["ocr_mode"], None, self.memory_limit, payload["backend"], payload["details"],
+                payload.get("ocr_config")
+            )
+        except Exception as e:
+            self.logger.error(f"任务 {task_id} 失败: {payload['path']} "
+                              f"第 {payload['start'] + 1}-{payload['end']} 页: {str(e)}")
+            self.queue.fail(task_id, self.worker_id, str(e))
+            return
+        except BaseException:
+            # 被中断时归还任务，由其他工作进程接手
+            self.queue.release(task_id, self.worker_id)
+            raise
+        finally:
+            done.set()
+            heartbeat.join()
+        texts, details = result if payload["details"] else (result, None)
+        if not self.queue.complete(task_id, self.worker_id,
+                                   {"texts": texts, "details": details, "stats": stats}):
+            self.logger.warning(f"任务 {task_id} 已被其他工作进程接手，结果丢弃")
+
+    def run(self, exit_when_idle: Optional[float] = None):
+        """循环处理任务；exit_when_idle 为秒数时，队列空闲这么久后退出"""
+        idle_since = time.monotonic()
+        while self.running:
+            task = self.queue.lease(self.worker_id, self.lease_seconds)
+            if task is None:
+                if exit_when_idle is not None and time.monotonic() - idle_since >= exit_when_idle:
+                    return
+                time.sleep(self.poll_interval)
+                continue
+            self.run_task(*task)
+            idle_since = time.monotonic()
+
+
+def _worker_main(spec, lease_seconds, memory_limit, exit_when_idle):
+    queue = open_queue(spec)
+    worker = QueueWorker(queue, lease_seconds=lease_seconds, memory_limit=memory_limit)
+    try:
+        worker.run(exit_when_idle)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        queue.close()
+
+
+def run_workers(spec: str, processes: Optional[int] = None, lease_seconds: float = DEFAULT_LEASE,
+                memory_limit: Optional[int] = DEFAULT_MEMORY_LIMIT,
+                exit_when_idle: Optional[float] = None):
+    """在本机启动若干个工作进程，各自独立地从队列租用任务，全部退出后返回"""
+    workers = [
+        multiprocessing.Process(target=_worker_main,
+                                args=(spec, lease_seconds, memory_limit, exit_when_idle))
+        for _ in range(processes or os.cpu_count() or 1)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        # 工作进程同样收到了中断信号，归还手中的任务后退出
+        for worker in workers:
+            worker.join()
@@ -0,0 +1,712 @@
+"""页级并行转换引擎
+
+把每个PDF按页段切分成任务，分发到进程池中并行提取文本，
+再由主进程按页码顺序拼接写入输出文件。
+"""
+import gc
+import os
+import logging
+import signal
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .backends import BACKEND_PDFPLUMBER, open_with_backend, resolve_backend
+from .cache import hash_file
+from .journal import STATUS_DONE, STATUS_RUNNING, file_fingerprint
+from .memory import current_rss
+from .metrics import Metrics, process_metrics, run_with_metrics
+from .output import FORMAT_TXT, OUTPUT_FORMATS, create_writer, journal_settings, output_paths, output_suffix
+from .sources import MEMORY_LABEL, SharedPdf, share_pdf
+from .ocr import (
+    DEFAULT_OCR_CONFIG, MIN_CONFIDENCE, OCR_AUTO, OCR_FORCE, OCR_OFF, OcrConfig,
+    choose_resolution, prepare_image, recognize, require_ocr, resolve_lang, retry_resolution,
+)
+from .triage import (
+    PAGE_OCR, PAGE_SKIP, SCAN_IMAGE_COVERAGE, TRIAGE_VERSION, classify_page, image_coverage,
+)
+
+# 每个任务包含的页数，过小会反复打开PDF，过大则负载不均
+DEFAULT_PAGES_PER_TASK = 8
+
+# 每个工作进程最多排队的任务数，限制乱序到达、等待写出的页段数量
+TASKS_PER_WORKER = 2
+
+# 每个工作进程中排队等待识别的页面图片数，渲染与识别重叠进行，同时限制内存占用
+OCR_PIPELINE_DEPTH = 2
+
+# 设置了任务日志时，记录写出进度的最短间隔（秒）
+CHECKPOINT_INTERVAL = 1.0
+
+# 每个工作进程默认的常驻内存上限
+DEFAULT_MEMORY_LIMIT = 1024 * 1024 * 1024  # 1 GB
+
+# 关闭文档后常驻内存仍超过上限时，要再增长上限的这个比例才再次关闭
+MEMORY_RELEASE_GROWTH = 0.25
+
+
+def count_pages(pdf_path, backend=BACKEND_PDFPLUMBER):
+    """读取PDF页数，pdf_path 为文件路径或 SharedPdf"""
+    return len(open_document(pdf_path, backend))
+
+
+# 工作进程内保留最近打开的文档，同一文档的后续页段不必重新打开、重新遍历页面树；
+# 超过内存上限时释放，丢弃解析器累积的对象缓存
+_document = None
+
+
+def document_key(pdf_path):
+    """在本进程内标识同一份输入：文件按路径，共享内存按名字"""
+    if isinstance(pdf_path, SharedPdf):
+        return pdf_path.name
+    return os.path.abspath(pdf_path)
+
+
+def open_document(pdf_path, backend=BACKEND_PDFPLUMBER):
+    """用指定后端打开PDF，同一文件在本进程内复用"""
+    global _document
+    if isinstance(pdf_path, SharedPdf):
+        key = (pdf_path.name, pdf_path.size, resolve_backend(backend))
+    else:
+        key = (os.path.abspath(pdf_path), os.path.getmtime(pdf_path), resolve_backend(backend))
+    if _document is not None and _document[0] == key:
+        return _document[1]
+    release_document()
+    with process_metrics.timer("open"):
+        document = open_with_backend(pdf_path, backend)
+    _document = (key, document)
+    return document
+
+
+def release_document():
+    """关闭本进程保留的文档"""
+    global _document
+    if _document is not None:
+        _document[1].close()
+        _document = None
+        gc.collect()
+
+
+def ignore_interrupt():
+    """常驻工作进程忽略 Ctrl+C，由主进程统一取消任务，避免中断信号打断正在写出的结果"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def inspect_pdf(pdf_path, with_hash=False, backend=BACKEND_PDFPLUMBER):
+    """读取PDF页数，需要时同时计算内容哈希"""
+    doc_hash = None
+    if isinstance(pdf_path, SharedPdf):
+        # 放入共享内存时已经算好
+        doc_hash = pdf_path.digest if with_hash else None
+    elif with_hash:
+        with process_metrics.timer("hash"):
+            doc_hash = hash_file(pdf_path)
+    return count_pages(pdf_path, backend), doc_hash
+
+
+def extraction_settings(ocr_mode, backend=BACKEND_PDFPLUMBER, ocr_config=DEFAULT_OCR_CONFIG):
+    """影响提取结果的参数，作为缓存键的一部分"""
+    settings = f"backend={resolve_backend(backend)};ocr={ocr_mode}"
+    if ocr_mode == OCR_OFF:
+        return settings
+    if ocr_mode == OCR_AUTO:
+        settings += f";triage={TRIAGE_VERSION}"
+    return f"{settings};{(ocr_config or DEFAULT_OCR_CONFIG).settings()}"
+
+
+def triage_page(document, index, ocr_mode):
+    """按OCR模式决定单页的处理方式，返回 (已提取的文本, 是否需要OCR, 页面统计)
+
+    auto 模式先根据页面构成分流，只有需要OCR的页面才渲染；
+    force 模式不预先提取文本，文本为 None。
+    """
+    if ocr_mode == OCR_FORCE:
+        return None, True, None
+    if ocr_mode != OCR_AUTO:
+        return extract_text(document, index), False, None
+    with process_metrics.timer("extract"):
+        text, stats = document.analyze(index)
+    decision = classify_page(text, stats)
+    process_metrics.increment(f"triage_{decision}")
+    if decision == PAGE_SKIP:
+        return '', False, stats
+    return text, decision == PAGE_OCR, stats
+
+
+def extract_text(document, index):
+    with process_metrics.timer("extract"):
+        return document.extract_text(index)
+
+
+def render_page(document, index, resolution):
+    with process_metrics.timer("render"):
+        return document.render(index, resolution, grayscale=True)
+
+
+def page_resolution(document, index, stats=None, ocr_config=DEFAULT_OCR_CONFIG):
+    """按页面尺寸和字号选择识别用的渲染分辨率"""
+    if stats is None:
+        width, height = document.page_size(index)
+        return choose_resolution(width, height, config=ocr_config)
+    # 扫描页上零星文字的字号与图片中的文字无关
+    text_height = stats.get("text_height") if image_coverage(stats) < SCAN_IMAGE_COVERAGE else None
+    return choose_resolution(stats["width"], stats["height"], text_height, ocr_config)
+
+
+def retry_dpi(text, confidence, dpi, ocr_config=DEFAULT_OCR_CONFIG):
+    """置信度过低且还能提高分辨率时返回重试用的分辨率，否则返回 None"""
+    resolution = retry_resolution(dpi, ocr_config)
+    if text and confidence is not None and confidence < MIN_CONFIDENCE and resolution > dpi:
+        process_metrics.increment("ocr_retries")
+        return resolution
+    return None
+
+
+class _OcrPipeline:
+    """工作进程内的识别流水线
+
+    解析、渲染和预处理在调用线程中进行（PDFium 不支持多线程访问同一文档），
+    tesseract 识别交给后台线程，识别时不占用 GIL。第 N 页识别的同时渲染第 N+1 页，
+    父进程同时在写出之前的页段；排队等待识别的图片不超过 depth 张，限制内存占用。
+    """
+
+    def __init__(self, pdf_path, backend, temp_dir=None, depth=OCR_PIPELINE_DEPTH,
+                 config=DEFAULT_OCR_CONFIG):
+        self.pdf_path = pdf_path
+        self.backend = backend
+        self.temp_dir = temp_dir
+        self.config = config
+        self.depth = max(1, depth)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.inflight = deque()
+        self.texts = {}
+        # 页码 -> 提取方式、置信度和耗时
+        self.details = {}
+
+    def submit(self, index, dpi, fallback, started=None):
+        """渲染页面并排队识别；fallback 为识别失败时使用的文本，None 表示届时再提取
+
+        started 为该页开始处理的 perf_counter 时间，用于记录单页耗时。
+        """
+        self._start(index, dpi, fallback, None, started or time.perf_counter())
+        while len(self.inflight) > self.depth:
+            self._collect()
+
+    def _start(self, index, dpi, fallback, previous, started, lang=None):
+        document = open_document(self.pdf_path, self.backend)
+        image = prepare_image(render_page(document, index, dpi), self.config)
+        if lang is None:
+            # 语言为 auto 时逐页确定，文档语言已确定后不再检测；重试沿用第一次的语言
+            lang = resolve_lang(image, dpi, self.config, self.temp_dir, document_key(self.pdf_path))
+        future = self.executor.submit(recognize, image, dpi, self.temp_dir, self.config, lang)
+        self.inflight.append((index, dpi, fallback, previous, started, lang, future))
+
+    def _collect(self):
+        index, dpi, fallback, previous, started, lang, future = self.inflight.popleft()
+        text, confidence = future.result()
+        if previous is not None:
+            # 重试结果不如第一次时保留第一次的结果
+            if not text or (confidence or 0) <= previous[1]:
+                text, confidence = previous
+        else:
+            retry = retry_dpi(text, confidence, dpi, self.config)
+            if retry:
+                self._start(index, retry, fallback, (text, confidence), started, lang)
+                return
+        method = "ocr"
+        if not text:
+            method, confidence = "text", None
+            text = fallback
+            if text is None:
+                text = extract_text(open_document(self.pdf_path, self.backend), index)
+        self.texts[index] = text
+        self.details[index] = page_details(method, started, confidence,
+                                           lang if method == "ocr" else None, method != "ocr")
+
+    def finish(self):
+        """等待所有识别完成，返回 {页码: 文本}"""
+        while self.inflight:
+            self._collect()
+        return self.texts
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+def page_details(method, started, confidence=None, lang=None, ocr_failed=False):
+    """单页的提取方式、OCR置信度和耗时（秒），识别的页面另有所用语言
+
+    需要识别但OCR出错或没有结果的页面 ocr_failed 为 True，这些页面不写入缓存。
+    """
+    details = {
+        "method": method,
+        "confidence": None if confidence is None else round(confidence, 1),
+        "seconds": round(time.perf_counter() - started, 4),
+    }
+    if lang is not None:
+        details["lang"] = lang
+    if ocr_failed:
+        details["ocr_failed"] = True
+    return details
+
+
+def cacheable_pages(start, texts, details=None):
+    """可以写入页面缓存的 (页码, 文本)；OCR失败的页面跳过，下次重新识别"""
+    for offset, text in enumerate(texts):
+        if details is None or not details[offset].get("ocr_failed"):
+            yield start + offset, text
+
+
+def convert_page_range(pdf_path, start, end, ocr_mode, temp_dir, memory_limit=None,
+                       backend=BACKEND_PDFPLUMBER, details=False, ocr_config=None):
+    """在子进程中转换 [start, end) 页段，返回按页排列的文本列表
+
+    pdf_path 为文件路径或 SharedPdf，后者在各工作进程中映射同一块共享内存。
+
+    只为该页段创建页面对象，每页处理完立即释放。设置了 memory_limit（字节）时，
+    常驻内存超过上限就关闭文档，后续页面重新打开，内存占用与文档页数无关。
+    关闭后仍超过上限时说明内存不是文档占用的，之后只在继续增长时才再次关闭，不会每页都重新打开文档。
+    需要OCR时，页面的渲染与识别经由 _OcrPipeline 重叠进行。
+    details 为 True 时返回 (文本列表, 每页详情列表)，详情见 page_details。
+    ocr_config 为 OcrConfig 或其 to_dict() 的结果，None 时使用默认参数。
+    """
+    if isinstance(ocr_config, dict):
+        ocr_config = OcrConfig.from_dict(ocr_config)
+    ocr_config = ocr_config or DEFAULT_OCR_CONFIG
+    pipeline = None
+    if ocr_mode != OCR_OFF:
+        require_ocr()
+        ocr_config.apply()
+        pipeline = _OcrPipeline(pdf_path, backend, temp_dir, config=ocr_config)
+    texts = {}
+    page_info = {}
+    release_above = memory_limit
+    try:
+        for index in range(start, end):
+            started = time.perf_counter()
+            with process_metrics.timer("page"):
+                document = open_document(pdf_path, backend)
+                text, needs_ocr, stats = triage_page(document, index, ocr_mode)
+                if needs_ocr:
+                    pipeline.submit(index, page_resolution(document, index, stats, ocr_config), text, started)
+                else:
+                    texts[index] = text
+                    page_info[index] = page_details("text", started)
+            process_metrics.increment("pages_extracted")
+            if memory_limit and current_rss() > release_above:
+                release_document()
+                release_above = max(memory_limit, current_rss() + int(memory_limit * MEMORY_RELEASE_GROWTH))
+        if pipeline is not None:
+            texts.update(pipeline.finish())
+            page_info.update(pipeline.details)
+    finally:
+        if pipeline is not None:
+            pipeline.close()
+    results = [texts[index] or '' for index in range(start, end)]
+    if details:
+        return results, [page_info[index] for index in range(start, end)]
+    return results
+
+
+def plan_ranges(total_pages, cached, pages_per_task, start=0):
+    """把 start 之后的页码划分为已缓存的页段和需要转换的页段，返回 (start, end, 缓存文本或None)"""
+    while start < total_pages:
+        hit = start in cached
+        limit = total_pages if hit else min(start + pages_per_task, total_pages)
+        end = start + 1
+        while end < limit and (end in cached) == hit:
+            end += 1
+        yield start, end, [cached[i] for i in range(start, end)] if hit else None
+        start = end
+
+
+class _FileState:
+    """单个文件的拼接状态
+
+    输出经由 output 模块的写入器先写入 .part 临时文件，成功后改名为目标文件。设置了任务日志时，
+    每隔 CHECKPOINT_INTERVAL 秒把已写出的页数和字节数落盘记录，中断后可以续传。
+    """
+
+    def __init__(self, file_data: Dict, total_pages: int, doc_hash: Optional[str] = None,
+                 metrics: Optional[Metrics] = None, journal=None):
+        self.file_data = file_data
+        self.total_pages = total_pages
+        self.doc_hash = doc_hash
+        self.settings = None
+        self.fingerprint = None
+        self.next_page = 0
+        # 页段起始页 -> (文本列表, 每页详情列表或 None)
+        self.pending: Dict[int, tuple] = {}
+        self.writer = create_writer(file_data.get("format", FORMAT_TXT), file_data["output_path"])
+        self.finished = False
+        self.metrics = metrics or Metrics()
+        self.journal = journal
+        self.last_checkpoint = time.monotonic()
+
+    @property
+    def journal_settings(self):
+        return journal_settings(self.settings, self.file_data.get("format", FORMAT_TXT))
+
+    def resume(self, next_page, offset):
+        """从日志记录的位置继续写；临时文件不完整时返回 False"""
+        if not self.writer.resume(next_page, offset):
+            return False
+        self.next_page = next_page
+        return True
+
+    def write_ready(self, on_page):
+        """按页码顺序写出已经到达的页段"""
+        while self.next_page in self.pending:
+            start = self.next_page
+            texts, details = self.pending.pop(start)
+            with self.metrics.timer("write"):
+                if not self.writer.opened:
+                    self.writer.open()
+                for offset, text in enumerate(texts):
+                    self.writer.write(start + offset, text, details[offset] if details else None)
+            for _ in texts:
+                self.next_page += 1
+                if on_page:
+                    on_page(self.file_data, self.next_page, self.total_pages)
+        if time.monotonic() - self.last_checkpoint >= CHECKPOINT_INTERVAL:
+            self.checkpoint()
+
+    def checkpoint(self, status=STATUS_RUNNING):
+        self.last_checkpoint = time.monotonic()
+        if self.journal is None or not self.writer.opened:
+            return
+        offset = self.writer.sync()
+        self.journal.checkpoint(
+            self.file_data["path"], self.file_data["output_path"], self.fingerprint,
+            self.journal_settings, self.total_pages, self.next_page, offset, status
+        )
+
+    @property
+    def done(self):
+        return self.next_page >= self.total_pages
+
+    def close(self, success=False):
+        """结束写入：成功时临时文件改名为目标文件；失败时保留临时文件供续传，未使用日志则删除"""
+        if self.finished:
+            return
+        self.finished = True
+        if success and not self.writer.opened:
+            # 没有页面的PDF同样生成（空的）输出
+            self.writer.open()
+        if not self.writer.opened:
+            return
+        if success:
+            self.checkpoint(STATUS_DONE)
+            self.writer.sync()
+        else:
+            self.checkpoint()
+        self.writer.close()
+        if success:
+            self.writer.commit()
+        elif self.journal is None:
+            self.writer.discard()
+
+
+class ConversionEngine:
+    """进程池转换引擎，负责任务拆分、调度和按序拼接"""
+
+    def __init__(self, max_workers: Optional[int] = None,
+                 pages_per_task: int = DEFAULT_PAGES_PER_TASK, logger=None,
+                 cache=None, memory_limit: Optional[int] = DEFAULT_MEMORY_LIMIT,
+                 metrics: Optional[Metrics] = None, journal=None,
+                 ocr_config: Optional[OcrConfig] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.pages_per_task = max(1, pages_per_task)
+        # 每个工作进程的常驻内存上限（字节）
+        self.memory_limit = memory_limit
+        self.logger = logger or logging.getLogger('PDFConverter')
+        self.cache = cache
+        # 各阶段耗时和计数，工作进程的统计随任务结果一起合并进来
+        self.metrics = metrics or Metrics()
+        # 任务日志（JobJournal），用于跳过已完成的文件、从中断处续传
+        self.journal = journal
+        # 识别语言、分辨率、预处理等OCR参数
+        self.ocr_config = ocr_config or DEFAULT_OCR_CONFIG
+        # start() 之后多次 convert 共用的进程池
+        self.executor = None
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def start(self):
+        """预先启动进程池，之后的多次 convert 共用，不必每批都重新创建工作进程"""
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=ignore_interrupt)
+
+    def shutdown(self):
+        """关闭 start() 启动的进程池"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=self.running, cancel_futures=True)
+            self.executor = None
+
+    def _completed(self, file_data, fingerprint, settings):
+        """日志中记录为已完成且输出未被改动时返回 True"""
+        entry = self.journal.lookup(file_data["path"], file_data["output_path"], fingerprint,
+                                    journal_settings(settings, file_data["format"]))
+        if entry is None or entry[0] != STATUS_DONE:
+            return False
+        try:
+            return os.path.getsize(file_data["output_path"]) == entry[2] and all(
+                os.path.exists(path) for path in output_paths(file_data["output_path"], file_data["format"])
+            )
+        except OSError:
+            return False
+
+    def _wants_details(self, state):
+        """写入器需要每页详情，或者需要据此跳过OCR失败的页面再写缓存"""
+        return state.writer.needs_details or self.cache is not None
+
+    def _store(self, state, start, texts, details=None):
+        if self.cache is None or not state.doc_hash:
+            return
+        try:
+            self.cache.put_pages(state.doc_hash, state.settings, cacheable_pages(start, texts, details))
+        except Exception as e:
+            self.logger.warning(f"写入缓存失败: {str(e)}")
+
+    def convert(self, files: List[Dict], ocr_mode: str = OCR_OFF,
+                temp_dir: Optional[str] = None,
+                on_page: Optional[Callable] = None,
+                on_file_done: Optional[Callable] = None,
+                backend: str = BACKEND_PDFPLUMBER,
+                output_format: str = FORMAT_TXT):
+        """并行转换一批文件
+
+        files 中每一项为 file_data 字典（至少包含 path），未指定 output_path 时
+        输出到PDF同目录的同名文件（扩展名由输出格式决定），失败原因写入 error。
+        内存中的PDF以 data（bytes、文件对象或 mmap）或 source（SharedPdf）代替 path，
+        必须指定 output_path；data 在转换期间复制一次到共享内存，各工作进程共用，
+        这类输入不记录任务日志。
+        output_format 为输出格式（见 output 模块），file_data 中的 format 可以为单个文件另行指定。
+        temp_dir 仅在 tesseract 无法从标准输入读取图片时使用。
+        on_page(file_data, page_idx, total_pages) 在每页按序写入后调用，
+        on_file_done(file_data, success) 对每个文件调用一次，取消时未完成的文件 success 为 False，error 为“已取消”。
+        backend 为提取后端，file_data 中的 backend 可以为单个文件另行指定。
+        设置了缓存时，内容相同且参数相同的页面直接从缓存读取。
+        设置了任务日志时，已完成且输出未变的文件直接跳过（file_data 中 skipped 为 True），
+        中断过的文件从上次写出的位置继续（resumed_from 为续传的起始页）。
+        任务按需提交，在途任务数与进程数成正比，内存占用与页数无关。
+        """
+        use_cache = self.cache is not None
+
+        # 由 data 创建、转换结束后释放的共享内存，id(file_data) -> SharedPdf
+        shared = {}
+
+        def release(file_data):
+            source = shared.pop(id(file_data), None)
+            if source is not None:
+                source.close()
+
+        # 已经调用过 on_file_done 的文件，id(file_data)
+        reported = set()
+
+        def file_done(file_data, success):
+            reported.add(id(file_data))
+            if on_file_done:
+                on_file_done(file_data, success)
+
+        def finish(state, success):
+            try:
+                state.close(success)
+            except OSError as e:
+                self.logger.error(f"写入输出失败: {state.file_data['output_path']}: {str(e)}")
+                state.file_data["error"] = str(e)
+                success = False
+            release(state.file_data)
+            self.metrics.increment("files_converted" if success else "files_failed")
+            file_done(state.file_data, success)
+
+        executor = self.executor or ProcessPoolExecutor(max_workers=self.max_workers, initializer=ignore_interrupt)
+        max_inflight = self.max_workers * TASKS_PER_WORKER
+        futures = {}
+        states = []
+        broken = False
+
+        def plan_tasks():
+            """按文件顺序生成需要提交的页段任务"""
+            # 页数统计和哈希计算同样放进进程池，只提前检查有限数量的文件
+            remaining = iter(files)
+            inspecting = deque()
+
+            def inspect_ahead():
+                while len(inspecting) < max_inflight:
+                    file_data = next(remaining, None)
+                    if file_data is None:
+                        break
+                    in_memory = "data" in file_data or "source" in file_data
+                    if in_memory:
+                        file_data.setdefault("path", file_data.get("name") or MEMORY_LABEL)
+                    try:
+                        file_data["format"] = file_data.get("format") or output_format
+                        if file_data["format"] not in OUTPUT_FORMATS:
+                            raise ValueError(f"未知的输出格式: {file_data['format']}")
+                        if in_memory and not file_data.get("output_path"):
+                            raise ValueError("内存中的PDF需要指定 output_path")
+                        if "source" not in file_data and in_memory:
+                            file_data["source"] = share_pdf(file_data["data"], file_data["path"])
+                            if file_data["source"] is not file_data["data"]:
+                                shared[id(file_data)] = file_data["source"]
+                        file_data["backend"] = resolve_backend(file_data.get("backend") or backend,
+                                                               file_data.get("source") or file_data["path"])
+                    except (ValueError, TypeError, OSError) as e:
+                        self.logger.error(f"转换失败: {file_data['path']}: {str(e)}")
+                        file_data["error"] = str(e)
+                        self.metrics.increment("files_failed")
+                        file_done(file_data, False)
+                        continue
+                    if not file_data.get("output_path"):
+                        file_data["output_path"] = str(
+                            Path(file_data["path"]).with_suffix(output_suffix(file_data["format"]))
+                        )
+                    file_data["settings"] = extraction_settings(ocr_mode, file_data["backend"], self.ocr_config)
+                    if self.journal is not None and not in_memory:
+                        try:
+                            file_data["fingerprint"] = file_fingerprint(file_data["path"])
+                        except OSError:
+                            file_data["fingerprint"] = None
+                        if file_data["fingerprint"] and self._completed(
+                                file_data, file_data["fingerprint"], file_data["settings"]):
+                            self.logger.info(f"已转换过，跳过: {file_data['path']}")
+                            file_data["skipped"] = True
+                            self.metrics.increment("files_skipped")
+                            file_done(file_data, True)
+                            continue
+                    future = executor.submit(
+                        run_with_metrics, inspect_pdf, file_data.get("source") or file_data["path"],
+                        use_cache, file_data["backend"]
+                    )
+                    inspecting.append((file_data, future))
+
+            inspect_ahead()
+            while inspecting and self.running:
+                file_data, inspect_future = inspecting.popleft()
+                inspect_ahead()
+                try:
+                    (total_pages, doc_hash), stats = inspect_future.result()
+                    self.metrics.merge(stats)
+                except Exception as e:
+                    self.logger.error(f"转换失败: {file_data['path']}: {str(e)}")
+                    file_data["error"] = str(e)
+                    release(file_data)
+                    self.metrics.increment("files_failed")
+                    file_done(file_data, False)
+                    continue
+
+                state = _FileState(file_data, total_pages, doc_hash, self.metrics,
+                                   None if "source" in file_data else self.journal)
+                state.settings = file_data["settings"]
+                state.fingerprint = file_data.get("fingerprint")
+                states.append(state)
+                file_data["total_pages"] = total_pages
+                file_data["hash"] = doc_hash
+                if total_pages == 0:
+                    finish(state, True)
+                    continue
+
+                if self.journal is not None and state.fingerprint:
+                    entry = self.journal.lookup(file_data["path"], file_data["output_path"],
+                                                state.fingerprint, state.journal_settings)
+                    if entry and entry[0] == STATUS_RUNNING and state.resume(entry[1], entry[2]):
+                        self.logger.info(f"从第 {entry[1] + 1} 页继续转换: {file_data['path']}")
+                        file_data["resumed_from"] = entry[1]
+                        self.metrics.increment("resumed_pages", entry[1])
+                        if on_page:
+                            on_page(file_data, state.next_page, total_pages)
+                cached = self.cache.get_pages(doc_hash, state.settings) if use_cache else {}
+                if cached:
+                    self.logger.info(f"缓存命中 {file_data['path']}: {len(cached)}/{total_pages} 页")
+                    self.metrics.increment("cache_hit_pages", len(cached))
+                ranges = list(plan_ranges(total_pages, cached, self.pages_per_task, state.next_page))
+                for start, end, texts in ranges:
+                    if texts is not None:
+                        state.pending[start] = (texts, None)
+                state.write_ready(on_page)
+                if state.done:
+                    finish(state, True)
+                    continue
+                for start, end, texts in ranges:
+                    if texts is None:
+                        yield state, start, end
+
+        try:
+            tasks = plan_tasks()
+            exhausted = False
+            while self.running:
+                # 限制在途任务数量，乱序完成的页段最多只会缓存这么多
+                while not exhausted and len(futures) < max_inflight:
+                    task = next(tasks, None)
+                    if task is None:
+                        exhausted = True
+                        break
+                    state, start, end = task
+                    if state.finished:
+                        continue
+                    future = executor.submit(
+                        run_with_metrics, convert_page_range,
+                        state.file_data.get("source") or state.file_data["path"], start, end,
+                        ocr_mode, temp_dir, self.memory_limit, state.file_data["backend"],
+                        self._wants_details(state), self.ocr_config
+                    )
+                    futures[future] = (state, start)
+                if not futures:
+                    break
+                done, _ = wait(futures, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in done:
+                    state, start = futures.pop(future)
+                    if state.finished:
+                        continue
+                    try:
+                        result, stats = future.result()
+                        self.metrics.merge(stats)
+                        texts, details = result if self._wants_details(state) else (result, None)
+                        self._store(state, start, texts, details)
+                        state.pending[start] = (texts, details)
+                        state.write_ready(on_page)
+                    except Exception as e:
+                        self.logger.error(f"转换失败: {state.file_data['path']}: {str(e)}")
+                        state.file_data["error"] = str(e)
+                        finish(state, False)
+                        if isinstance(e, BrokenProcessPool):
+                            # 工作进程意外退出（如被系统杀掉）后进程池不再可用
+                            broken = True
+                        continue
+                    if state.done:
+                        finish(state, True)
+        except BrokenProcessPool:
+            broken = True
+            raise
+        finally:
+            for future in futures:
+                future.cancel()
+            # 取消时不等待正在运行的页段，已开始写入的文件标记为失败，写出进度留在任务日志中
+            if executor is not self.executor:
+                executor.shutdown(wait=self.running)
+            elif broken:
+                self.executor = None
+                executor.shutdown(wait=False)
+                self.start()
+            # 取消或出错时没有结束的文件同样回调 on_file_done，包括尚未开始转换的文件
+            error = sys.exc_info()[1]
+            interrupted = "已取消" if not self.running else str(error or "转换中断")
+            for state in states:
+                if not state.finished:
+                    state.file_data.setdefault("error", interrupted)
+                    finish(state, False)
+            for file_data in files:
+                if id(file_data) not in reported:
+                    file_data.setdefault("error", interrupted)
+                    release(file_data)
+                    self.metrics.increment("files_failed")
+                    file_done(file_data, False)
+            for source in shared.values():
+                source.close()
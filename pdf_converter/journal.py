@@ -0,0 +1,99 @@
+"""转换任务日志，用于中断后续传
+
+输出先写入同目录的 .part 临时文件，全部完成后再改名为目标文件，不会留下写了一半的 .txt。
+日志按 (PDF路径, 输出路径) 记录已按序写出的页数和对应的输出字节数；进程崩溃或取消转换后，
+下次转换同一文件时把 .part 截断到记录的位置，从下一页继续。
+PDF内容或提取参数变化后记录作废。已完成的文件同样留有记录，输出未被改动时直接跳过。
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple
+
+from .cache import DEFAULT_CACHE_DIR
+
+DEFAULT_JOURNAL_PATH = os.path.join(DEFAULT_CACHE_DIR, 'jobs.sqlite3')
+
+PART_SUFFIX = '.part'
+
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+
+
+def file_fingerprint(path):
+    """用文件大小和修改时间判断PDF是否变化，不必读取全文"""
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def partial_path(output_path):
+    return output_path + PART_SUFFIX
+
+
+def _key(pdf_path, output_path):
+    return os.path.abspath(pdf_path), os.path.abspath(output_path)
+
+
+class JobJournal:
+    """基于 SQLite 的任务进度日志，可在多个线程间共享"""
+
+    def __init__(self, path: str = DEFAULT_JOURNAL_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                pdf_path TEXT NOT NULL,
+                output_path TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                settings TEXT NOT NULL,
+                total_pages INTEGER NOT NULL,
+                next_page INTEGER NOT NULL,
+                offset INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                updated REAL NOT NULL,
+                PRIMARY KEY (pdf_path, output_path)
+            )
+        """)
+        self.conn.commit()
+
+    def lookup(self, pdf_path: str, output_path: str, fingerprint: str,
+               settings: str) -> Optional[Tuple[str, int, int]]:
+        """返回 (状态, 已写出页数, 输出字节数)；没有记录或PDF、参数已变化时返回 None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT fingerprint, settings, status, next_page, offset FROM jobs "
+                "WHERE pdf_path = ? AND output_path = ?",
+                _key(pdf_path, output_path)
+            ).fetchone()
+        if row is None or row[0] != fingerprint or row[1] != settings:
+            return None
+        return row[2], row[3], row[4]
+
+    def checkpoint(self, pdf_path: str, output_path: str, fingerprint: str, settings: str,
+                   total_pages: int, next_page: int, offset: int, status: str = STATUS_RUNNING):
+        """记录进度，调用前输出数据必须已经落盘"""
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                _key(pdf_path, output_path) + (fingerprint, settings, total_pages,
+                                               next_page, offset, status, time.time())
+            )
+            self.conn.commit()
+
+    def remove(self, pdf_path: str, output_path: str):
+        with self.lock:
+            self.conn.execute(
+                "DELETE FROM jobs WHERE pdf_path = ? AND output_path = ?",
+                _key(pdf_path, output_path)
+            )
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,19 @@
+"""进程内存统计"""
+import os
+import sys
+
+
+def current_rss():
+    """返回当前进程的常驻内存（字节），无法获取时返回0"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    if sys.platform.startswith('linux'):
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError):
+            pass
+    return 0
@@ -0,0 +1,170 @@
+"""各处理阶段的耗时统计
+
+每个进程有一个 process_metrics，工作进程在任务结束时把本任务的统计快照带回主进程，
+由 ConversionEngine 合并。统计结果可以导出为 JSON 或 Prometheus 文本格式。
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+# 直方图分桶上限（秒），与 Prometheus 的 le 标签对应
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# 阶段名称及其中文说明
+STAGES = {
+    "open": "打开文档",
+    "hash": "计算哈希",
+    "extract": "文本提取",
+    "render": "页面渲染",
+    "preprocess": "图片预处理",
+    "detect": "书写系统检测",
+    "tesseract": "文字识别",
+    "page": "单页总计",
+    "write": "写入输出",
+}
+
+
+class Metrics:
+    """计数器和各阶段耗时直方图，线程安全"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: Dict[str, float] = {}
+        self.histograms: Dict[str, Dict] = {}
+
+    def increment(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = {"count": 0, "sum": 0.0, "buckets": [0] * len(BUCKETS)}
+                self.histograms[stage] = histogram
+            histogram["count"] += 1
+            histogram["sum"] += seconds
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    histogram["buckets"][i] += 1
+                    break
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def snapshot(self):
+        """返回可序列化的统计快照"""
+        with self.lock:
+            return {
+                "counters": dict(self.counters),
+                "histograms": {
+                    stage: {"count": h["count"], "sum": h["sum"], "buckets": list(h["buckets"])}
+                    for stage, h in self.histograms.items()
+                },
+            }
+
+    def merge(self, snapshot):
+        """合并其他进程带回的统计快照"""
+        with self.lock:
+            for name, value in snapshot.get("counters", {}).items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            for stage, other in snapshot.get("histograms", {}).items():
+                histogram = self.histograms.setdefault(
+                    stage, {"count": 0, "sum": 0.0, "buckets": [0] * len(BUCKETS)}
+                )
+                histogram["count"] += other["count"]
+                histogram["sum"] += other["sum"]
+                for i, count in enumerate(other["buckets"]):
+                    histogram["buckets"][i] += count
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def to_prometheus(self, prefix='pdf_converter'):
+        """导出为 Prometheus 文本格式"""
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        if snapshot["histograms"]:
+            metric = f"{prefix}_stage_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for stage, histogram in sorted(snapshot["histograms"].items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram["buckets"]):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{stage="{stage}",le="+Inf"}} {histogram["count"]}')
+                lines.append(f'{metric}_sum{{stage="{stage}"}} {histogram["sum"]}')
+                lines.append(f'{metric}_count{{stage="{stage}"}} {histogram["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def write_json(self, path):
+        """写入 JSON 统计文件，先写临时文件再替换，读取方不会看到半个文件"""
+        data = self.snapshot()
+        data["timestamp"] = time.time()
+        data["bucket_bounds"] = list(BUCKETS)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, path)
+
+    def summary(self):
+        """生成各阶段耗时的文字摘要"""
+        snapshot = self.snapshot()
+        lines = []
+        counters = snapshot["counters"]
+        if counters:
+            lines.append('  '.join(f"{name}: {value:g}" for name, value in sorted(counters.items())))
+        for stage, histogram in snapshot["histograms"].items():
+            count = histogram["count"]
+            average = histogram["sum"] / count * 1000 if count else 0
+            label = STAGES.get(stage, stage)
+            lines.append(f"{label}: {count} 次，共 {histogram['sum']:.2f} 秒，平均 {average:.1f} 毫秒")
+        return '\n'.join(lines)
+
+
+# 当前进程的统计
+process_metrics = Metrics()
+
+
+def run_with_metrics(func, *args):
+    """在工作进程中执行任务，返回 (结果, 本任务的统计快照)"""
+    process_metrics.reset()
+    result = func(*args)
+    return result, process_metrics.snapshot()
+
+
+def serve_metrics(metrics, port, host='127.0.0.1'):
+    """在后台线程中提供 Prometheus 抓取接口 /metrics，返回 HTTP 服务对象"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.to_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,463 @@
+"""OCR识别相关函数
+
+安装了 tesserocr 时，每个工作进程持有常驻的 Tesseract 引擎，语言模型只加载一次，
+进程池本身就是按CPU核数划分的引擎池。未安装时调用 tesseract 命令行：
+页面图片以内存数据通过标准输入传入，不写临时文件；只有当 tesseract 版本
+不支持从标准输入读取时，才退回到临时文件，并优先放在内存文件系统中。
+
+识别参数集中在 OcrConfig 中。语言为 auto 时，先用 tesseract 的书写系统检测（osd）
+判断文档的文字，只加载需要的语言模型：纯英文文档不必加载 chi_sim，识别快一倍左右。
+"""
+import atexit
+import io
+import math
+import os
+import sys
+import shutil
+import logging
+import subprocess
+import tempfile
+
+from .metrics import process_metrics
+from .preprocess import preprocess_image
+
+logger = logging.getLogger('PDFConverter')
+
+# OCR模式：关闭 / 仅对无文本页面识别 / 所有页面都识别
+OCR_OFF = 'off'
+OCR_AUTO = 'auto'
+OCR_FORCE = 'force'
+OCR_MODES = (OCR_OFF, OCR_AUTO, OCR_FORCE)
+
+OCR_LANG = 'chi_sim+eng'
+
+# 语言设为 auto（需显式指定）时按文档的书写系统选择语言模型，检测不出时使用 OcrConfig.fallback_lang
+LANG_AUTO = 'auto'
+
+# 检测为该书写系统时只用于当前页面，不作为整个文档的语言：
+# 中文扫描件中夹杂的英文页面不能让后续页面都只用 eng 识别
+UNCACHED_SCRIPTS = ('Latin',)
+
+# 要求OCR但既没有 tesseract 命令行也没有 tesserocr 时的错误信息
+OCR_UNAVAILABLE = "未找到Tesseract-OCR，无法进行OCR识别"
+
+# tesseract 书写系统检测结果 -> 语言模型；中日韩等文档中通常夹杂英文
+SCRIPT_LANGS = {
+    'Latin': 'eng',
+    'Han': 'chi_sim+eng',
+    'Japanese': 'jpn+eng',
+    'Hangul': 'kor+eng',
+    'Korean': 'kor+eng',
+    'Cyrillic': 'rus+eng',
+    'Greek': 'ell+eng',
+    'Arabic': 'ara+eng',
+    'Hebrew': 'heb+eng',
+    'Devanagari': 'hin+eng',
+    'Thai': 'tha+eng',
+}
+
+# 书写系统检测的置信度低于该值时不采用检测结果
+MIN_SCRIPT_CONFIDENCE = 1.0
+
+# 每个进程记住的文档语言数，同一文档的后续页段不再检测
+DOCUMENT_LANG_CACHE_SIZE = 256
+
+# 识别前的预处理方案：standard 只调整对比度和亮度，binarize 再二值化，scan 再纠偏（需要 NumPy）
+PROFILE_STANDARD = 'standard'
+PROFILE_BINARIZE = 'binarize'
+PROFILE_SCAN = 'scan'
+PREPROCESS_PROFILES = {
+    PROFILE_STANDARD: {},
+    PROFILE_BINARIZE: {"binarize": True},
+    PROFILE_SCAN: {"binarize": True, "deskew": True},
+}
+
+# 每个 tesseract 使用的 OpenMP 线程数。进程池已经按CPU核数并行，
+# 再让每个 tesseract 各开多个线程只会互相争抢CPU
+DEFAULT_THREAD_LIMIT = 1
+
+# 渲染分辨率：不知道字号时使用 OCR_RESOLUTION，并限制在 MIN/MAX 之间
+OCR_RESOLUTION = 300
+MIN_RESOLUTION = 150
+MAX_RESOLUTION = 400
+
+# 渲染图片的像素上限，约为A4页面在300dpi下的大小，更大的页面相应降低分辨率
+MAX_RENDER_PIXELS = 9000000
+
+# 字号渲染后的目标像素高度，tesseract 在这个字高附近识别效果最好
+TARGET_TEXT_PIXELS = 40
+
+# 平均置信度低于该值时提高分辨率重试一次
+MIN_CONFIDENCE = 60
+RETRY_SCALE = 1.5
+
+# Windows下Tesseract的默认安装位置
+WINDOWS_TESSERACT_PATHS = [
+    'C:\\Program Files\\Tesseract-OCR\\tesseract.exe',
+    'C:\\Program Files (x86)\\Tesseract-OCR\\tesseract.exe',
+]
+
+# Linux下的内存文件系统，tesseract必须读文件时使用
+TMPFS_DIR = '/dev/shm'
+
+tesseract_cmd = 'tesseract'
+_stdin_supported = True
+
+# 本进程内常驻的 tesserocr 引擎，按 (语言, psm, oem) 缓存；值为 None 表示不可用
+_engines = {}
+
+# 本进程内已安装的语言模型（None 表示未知）和各文档检测出的语言
+_installed_langs = False
+_document_langs = {}
+
+
+class OcrConfig:
+    """OCR参数，可以传给工作进程，也可以用 to_dict / from_dict 序列化
+
+    lang 为 tesseract 语言，默认为 OCR_LANG（chi_sim+eng）；auto 表示按每个文档的书写系统选择，
+    检测不出时使用 fallback_lang；psm、oem 为 None 时使用 tesseract 的默认值；
+    min_dpi、max_dpi 限制渲染分辨率；profile 为预处理方案（见 PREPROCESS_PROFILES）；
+    thread_limit 为每个 tesseract 的 OpenMP 线程数（OMP_THREAD_LIMIT），None 表示不限制。
+    """
+
+    def __init__(self, lang: str = OCR_LANG, psm=None, oem=None,
+                 min_dpi: int = None, max_dpi: int = None, profile: str = PROFILE_STANDARD,
+                 thread_limit=DEFAULT_THREAD_LIMIT, fallback_lang: str = OCR_LANG):
+        if profile not in PREPROCESS_PROFILES:
+            raise ValueError(f"未知的预处理方案: {profile}")
+        self.lang = lang or OCR_LANG
+        self.psm = psm
+        self.oem = oem
+        self.min_dpi = min_dpi or MIN_RESOLUTION
+        self.max_dpi = max(max_dpi or MAX_RESOLUTION, self.min_dpi)
+        self.profile = profile
+        self.thread_limit = thread_limit
+        self.fallback_lang = fallback_lang
+
+    def to_dict(self):
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def settings(self):
+        """影响识别结果的参数，作为缓存键的一部分；线程数不影响结果"""
+        settings = f"lang={self.lang};dpi={self.min_dpi}-{self.max_dpi}"
+        if self.lang == LANG_AUTO:
+            settings += f";fallback={self.fallback_lang}"
+        if self.psm is not None:
+            settings += f";psm={self.psm}"
+        if self.oem is not None:
+            settings += f";oem={self.oem}"
+        if self.profile != PROFILE_STANDARD:
+            settings += f";profile={self.profile}"
+        return settings
+
+    def options(self):
+        """tesseract 命令行参数"""
+        options = []
+        if self.psm is not None:
+            options += ['--psm', str(self.psm)]
+        if self.oem is not None:
+            options += ['--oem', str(self.oem)]
+        return options
+
+    def apply(self):
+        """在工作进程中设置 OpenMP 线程数，须在加载 tesserocr 引擎之前调用"""
+        if self.thread_limit:
+            os.environ['OMP_THREAD_LIMIT'] = str(self.thread_limit)
+
+
+DEFAULT_OCR_CONFIG = OcrConfig()
+
+
+def locate_tesseract():
+    """查找Tesseract可执行文件，找不到时返回None
+
+    子进程不会继承主进程中的查找结果，因此每个进程都需要调用一次。
+    """
+    global tesseract_cmd
+    path = shutil.which('tesseract')
+    if not path and sys.platform == "win32":
+        path = next((p for p in WINDOWS_TESSERACT_PATHS if os.path.exists(p)), None)
+    if path:
+        tesseract_cmd = path
+    return path
+
+
+def require_ocr():
+    """确认当前进程能进行OCR（找到 tesseract 命令行或安装了 tesserocr），否则抛出 RuntimeError"""
+    if locate_tesseract():
+        return
+    import importlib.util
+    if importlib.util.find_spec('tesserocr') is None:
+        raise RuntimeError(OCR_UNAVAILABLE)
+
+
+def default_temp_dir():
+    """tesseract需要临时文件时使用的目录，优先使用内存文件系统"""
+    if os.path.isdir(TMPFS_DIR) and os.access(TMPFS_DIR, os.W_OK):
+        return TMPFS_DIR
+    return tempfile.gettempdir()
+
+
+def choose_resolution(width, height, text_height=None, config=DEFAULT_OCR_CONFIG):
+    """根据页面尺寸（点）和字号（点）选择渲染分辨率"""
+    dpi = TARGET_TEXT_PIXELS * 72 / text_height if text_height else OCR_RESOLUTION
+    dpi = min(max(dpi, config.min_dpi), config.max_dpi)
+    if width and height:
+        dpi = min(dpi, math.sqrt(MAX_RENDER_PIXELS / (width / 72 * height / 72)))
+    return max(int(dpi), 72)
+
+
+def retry_resolution(dpi, config=DEFAULT_OCR_CONFIG):
+    """置信度过低时重试使用的分辨率，不超过 max_dpi"""
+    return min(config.max_dpi, int(dpi * RETRY_SCALE))
+
+
+def encode_image(image):
+    """把图片编码为无压缩的PNM数据，比PNG编码快得多"""
+    buffer = io.BytesIO()
+    image.save(buffer, format='PPM')
+    return buffer.getvalue()
+
+
+def get_engine(lang=OCR_LANG, psm=None, oem=None):
+    """返回本进程常驻的 tesserocr 引擎，不可用时返回 None"""
+    key = (lang, psm, oem)
+    if key in _engines:
+        return _engines[key]
+    engine = None
+    try:
+        import tesserocr
+        options = {}
+        if psm is not None:
+            options["psm"] = psm
+        if oem is not None:
+            options["oem"] = oem
+        engine = tesserocr.PyTessBaseAPI(lang=lang, **options)
+    except ImportError:
+        pass
+    except Exception as e:
+        logger.warning(f"tesserocr初始化失败，改用tesseract命令行: {str(e)}")
+    _engines[key] = engine
+    return engine
+
+
+@atexit.register
+def close_engines():
+    """释放本进程内的 tesserocr 引擎"""
+    for engine in _engines.values():
+        if engine is not None:
+            engine.End()
+    _engines.clear()
+
+
+def _run(args, data=None):
+    kwargs = {}
+    if sys.platform == "win32":
+        # 避免图形界面下每次调用都弹出控制台窗口
+        kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW
+    return subprocess.run(
+        [tesseract_cmd] + args, input=data,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, **kwargs
+    )
+
+
+def parse_tsv(output):
+    """把 tesseract 的 tsv 输出还原为文本，返回 (文本, 单词平均置信度)
+
+    同一行的单词以空格连接，段落之间空一行，与 tesseract 的 txt 输出一致。
+    """
+    lines = []
+    words = []
+    confidences = []
+    line_key = None
+    for row in output.splitlines()[1:]:
+        columns = row.split('\t')
+        # 第5级为单词：level page block par line word left top width height conf text
+        if len(columns) < 12 or columns[0] != '5':
+            continue
+        key = tuple(columns[1:5])
+        if key != line_key:
+            if words:
+                lines.append(' '.join(words))
+            if line_key is not None and key[:3] != line_key[:3]:
+                lines.append('')
+            words = []
+            line_key = key
+        if columns[11].strip():
+            words.append(columns[11])
+            confidence = float(columns[10])
+            if confidence >= 0:
+                confidences.append(confidence)
+    if words:
+        lines.append(' '.join(words))
+    text = '\n'.join(lines) + '\n' if lines else ''
+    confidence = sum(confidences) / len(confidences) if confidences else None
+    return text, confidence
+
+
+def _run_image(image, options, temp_dir=None):
+    """用 tesseract 命令行处理图片，返回标准输出文本"""
+    global _stdin_supported
+    data = encode_image(image)
+    if _stdin_supported:
+        result = _run(['stdin', 'stdout'] + options, data)
+        if result.returncode == 0:
+            return result.stdout.decode('utf-8', errors='replace')
+
+    fd, image_path = tempfile.mkstemp(suffix='.pnm', dir=temp_dir or default_temp_dir())
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        result = _run([image_path, 'stdout'] + options)
+    finally:
+        try:
+            os.remove(image_path)
+        except OSError:
+            pass
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode('utf-8', errors='replace').strip())
+    if _stdin_supported:
+        logger.warning("当前tesseract不支持从标准输入读取图片，改用临时文件")
+        _stdin_supported = False
+    return result.stdout.decode('utf-8', errors='replace')
+
+
+def run_tesseract(image, lang=OCR_LANG, dpi=OCR_RESOLUTION, temp_dir=None, config=DEFAULT_OCR_CONFIG):
+    """调用tesseract识别图片，返回 (文本, 平均置信度 0-100)"""
+    engine = get_engine(lang, config.psm, config.oem)
+    if engine is not None:
+        engine.SetImage(image)
+        engine.SetSourceResolution(dpi)
+        return engine.GetUTF8Text(), engine.MeanTextConf()
+    # tsv 输出带有每个单词的置信度，文本由其还原
+    options = ['--dpi', str(dpi), '-l', lang] + config.options() + ['tsv']
+    return parse_tsv(_run_image(image, options, temp_dir))
+
+
+def installed_langs():
+    """本机已安装的语言模型集合，无法获取时返回 None"""
+    global _installed_langs
+    if _installed_langs is not False:
+        return _installed_langs
+    langs = None
+    try:
+        import tesserocr
+        langs = set(tesserocr.get_languages()[1])
+    except ImportError:
+        try:
+            result = _run(['--list-langs'])
+            if result.returncode == 0:
+                # 第一行为说明，之后每行一个语言
+                lines = result.stdout.decode('utf-8', errors='replace').splitlines()
+                langs = {line.strip() for line in lines[1:] if line.strip()} or None
+        except OSError:
+            pass
+    except Exception:
+        pass
+    _installed_langs = langs
+    return langs
+
+
+def parse_osd(output):
+    """从 tesseract --psm 0 的输出中取出 (书写系统, 置信度)"""
+    script, confidence = None, 0.0
+    for line in output.splitlines():
+        name, _, value = line.partition(':')
+        if name.strip() == 'Script':
+            script = value.strip()
+        elif name.strip() == 'Script confidence':
+            try:
+                confidence = float(value)
+            except ValueError:
+                pass
+    return script, confidence
+
+
+def detect_script(image, dpi=OCR_RESOLUTION, temp_dir=None):
+    """检测图片中文字的书写系统，返回 (书写系统, 置信度)；需要安装 osd 语言模型"""
+    engine = get_engine('osd', psm=0)
+    if engine is not None:
+        engine.SetImage(image)
+        engine.SetSourceResolution(dpi)
+        result = engine.DetectOrientationScript() or {}
+        return result.get("script_name"), result.get("script_conf", 0.0)
+    return parse_osd(_run_image(image, ['--dpi', str(dpi), '--psm', '0', '-l', 'osd'], temp_dir))
+
+
+def lang_for_script(script, config=DEFAULT_OCR_CONFIG):
+    """书写系统对应的语言，只保留本机已安装的模型"""
+    lang = SCRIPT_LANGS.get(script)
+    if lang is None:
+        return config.fallback_lang
+    installed = installed_langs()
+    parts = [part for part in lang.split('+') if installed is None or part in installed]
+    return '+'.join(parts) if parts else config.fallback_lang
+
+
+def resolve_lang(image, dpi=OCR_RESOLUTION, config=DEFAULT_OCR_CONFIG, temp_dir=None, document=None):
+    """确定识别用的语言；语言为 auto 时检测书写系统
+
+    同一 document 检测出非拉丁文字后在本进程内不再检测；检测为拉丁文字或检测不出时
+    只用于当前页面，后续页面重新检测，避免文档开头的英文页面决定整个文档的语言。
+    """
+    if config.lang != LANG_AUTO:
+        return config.lang
+    if document is not None and document in _document_langs:
+        return _document_langs[document]
+    lang = config.fallback_lang
+    script = None
+    try:
+        with process_metrics.timer("detect"):
+            script, confidence = detect_script(image, dpi, temp_dir)
+        if script and confidence >= MIN_SCRIPT_CONFIDENCE:
+            lang = lang_for_script(script, config)
+        else:
+            script = None
+        process_metrics.increment("script_detections")
+    except Exception as e:
+        logger.warning(f"书写系统检测失败，使用 {lang}: {str(e)}")
+    if document is not None and script is not None and script not in UNCACHED_SCRIPTS:
+        if len(_document_langs) >= DOCUMENT_LANG_CACHE_SIZE:
+            _document_langs.clear()
+        _document_langs[document] = lang
+    return lang
+
+
+def prepare_image(image, config=DEFAULT_OCR_CONFIG):
+    """识别前按预处理方案处理图片，耗时记入 preprocess 阶段"""
+    with process_metrics.timer("preprocess"):
+        return preprocess_image(image, **PREPROCESS_PROFILES[config.profile])
+
+
+def recognize(image, dpi=OCR_RESOLUTION, temp_dir=None, config=DEFAULT_OCR_CONFIG, lang=None):
+    """识别预处理后的图片，返回 (文本, 置信度)，失败或结果为空时文本为 None
+
+    lang 为 None 时按 config 确定语言（auto 时检测书写系统）。
+    """
+    try:
+        if lang is None:
+            lang = resolve_lang(image, dpi, config, temp_dir)
+        with process_metrics.timer("tesseract"):
+            text, confidence = run_tesseract(image, lang, dpi, temp_dir, config)
+        process_metrics.increment("ocr_pages")
+        if not text.strip():
+            logger.warning("OCR结果为空")
+            return None, confidence
+        return text, confidence
+    except Exception as e:
+        logger.error(f"OCR识别错误: {str(e)}")
+        return None, None
+
+
+def ocr_image(image, temp_dir=None, dpi=OCR_RESOLUTION, config=DEFAULT_OCR_CONFIG, lang=None):
+    """对图片进行OCR识别，返回 (文本, 置信度)，失败或结果为空时文本为 None"""
+    try:
+        processed_image = prepare_image(image, config)
+    except Exception as e:
+        logger.error(f"OCR识别错误: {str(e)}")
+        return None, None
+    return recognize(processed_image, dpi, temp_dir, config, lang)
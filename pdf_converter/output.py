@@ -0,0 +1,246 @@
+"""输出格式
+
+txt      纯文本，各页直接拼接（默认）
+jsonl    每页一行 JSON：页码、文本、提取方式（text / ocr / cache）、OCR置信度和耗时
+indexed  纯文本，另附 .idx 索引记录每页结束位置的字节偏移，检索命中后可以直接定位到页
+
+写入器按页码顺序流式写出到 .part 临时文件，与任务日志配合续传：
+主文件按日志记录的字节数截断，索引按已写出的页数截断。
+"""
+import json
+import os
+import struct
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .journal import partial_path
+
+FORMAT_TXT = 'txt'
+FORMAT_JSONL = 'jsonl'
+FORMAT_INDEXED = 'indexed'
+OUTPUT_FORMATS = (FORMAT_TXT, FORMAT_JSONL, FORMAT_INDEXED)
+
+# 索引文件：8 字节文件头，之后每页一个小端 uint64，为该页在文本文件中的结束偏移
+INDEX_SUFFIX = '.idx'
+INDEX_MAGIC = b'PDFTIDX1'
+_OFFSET = struct.Struct('<Q')
+
+# 来自缓存的页面没有保存提取方式和耗时
+CACHED_PAGE = {"method": "cache"}
+
+
+def output_suffix(output_format):
+    """输出文件的扩展名"""
+    return '.jsonl' if output_format == FORMAT_JSONL else '.txt'
+
+
+def index_path(output_path):
+    return output_path + INDEX_SUFFIX
+
+
+def output_paths(output_path, output_format) -> List[str]:
+    """一个PDF对应的全部输出文件"""
+    if output_format == FORMAT_INDEXED:
+        return [output_path, index_path(output_path)]
+    return [output_path]
+
+
+def journal_settings(settings, output_format):
+    """任务日志中记录的参数，输出格式不同的结果不能互相续传；页面缓存与输出格式无关"""
+    if output_format == FORMAT_TXT:
+        return settings
+    return f"{settings};format={output_format}"
+
+
+def _encoded_size(text):
+    """文本以 utf-8 写入、按平台转换换行符之后的字节数"""
+    return len(text.encode('utf-8')) + text.count('\n') * (len(os.linesep) - 1)
+
+
+class TextWriter:
+    """纯文本写入器，先写入 .part 临时文件，commit() 时改名为目标文件"""
+    # 是否需要工作进程返回每页的提取方式和耗时
+    needs_details = False
+
+    def __init__(self, output_path: str):
+        self.output_path = output_path
+        self.path = partial_path(output_path)
+        self.handle = None
+
+    @property
+    def opened(self):
+        return self.handle is not None
+
+    def open(self):
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.handle = open(self.path, 'w', encoding='utf-8')
+
+    def resume(self, next_page: int, offset: int) -> bool:
+        """把临时文件截断到 offset，从 next_page 继续写；临时文件不完整时返回 False"""
+        try:
+            if os.path.getsize(self.path) < offset:
+                return False
+            with open(self.path, 'r+b') as f:
+                f.truncate(offset)
+        except OSError:
+            return False
+        self.handle = open(self.path, 'a', encoding='utf-8')
+        return True
+
+    def write(self, index: int, text: str, details: Optional[Dict] = None):
+        if text:
+            self.handle.write(text)
+
+    def sync(self) -> int:
+        """把已写出的内容落盘，返回输出字节数"""
+        self.handle.flush()
+        os.fsync(self.handle.fileno())
+        return os.fstat(self.handle.fileno()).st_size
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+
+    def commit(self):
+        os.replace(self.path, self.output_path)
+
+    def discard(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class JsonlWriter(TextWriter):
+    """每页一行 JSON"""
+    needs_details = True
+
+    def write(self, index, text, details=None):
+        record = {"page": index + 1, "text": text or ''}
+        record.update(details or CACHED_PAGE)
+        self.handle.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+class IndexedTextWriter(TextWriter):
+    """纯文本加每页字节偏移索引"""
+
+    def __init__(self, output_path):
+        super().__init__(output_path)
+        self.index_path = partial_path(index_path(output_path))
+        self.index = None
+        self.offset = 0
+
+    def open(self):
+        super().open()
+        self.index = open(self.index_path, 'wb')
+        self.index.write(INDEX_MAGIC)
+
+    def resume(self, next_page, offset):
+        size = len(INDEX_MAGIC) + next_page * _OFFSET.size
+        try:
+            if os.path.getsize(self.index_path) < size:
+                return False
+        except OSError:
+            return False
+        if not super().resume(next_page, offset):
+            return False
+        self.index = open(self.index_path, 'r+b')
+        self.index.truncate(size)
+        self.index.seek(size)
+        self.offset = offset
+        return True
+
+    def write(self, index, text, details=None):
+        super().write(index, text, details)
+        if text:
+            self.offset += _encoded_size(text)
+        self.index.write(_OFFSET.pack(self.offset))
+
+    def sync(self):
+        self.index.flush()
+        os.fsync(self.index.fileno())
+        return super().sync()
+
+    def close(self):
+        super().close()
+        if self.index is not None:
+            self.index.close()
+            self.index = None
+
+    def commit(self):
+        # 索引先就位，文本文件出现时索引一定完整
+        os.replace(self.index_path, index_path(self.output_path))
+        super().commit()
+
+    def discard(self):
+        super().discard()
+        try:
+            os.remove(self.index_path)
+        except OSError:
+            pass
+
+
+_WRITERS = {
+    FORMAT_TXT: TextWriter,
+    FORMAT_JSONL: JsonlWriter,
+    FORMAT_INDEXED: IndexedTextWriter,
+}
+
+
+def create_writer(output_format: str, output_path: str) -> TextWriter:
+    try:
+        return _WRITERS[output_format](output_path)
+    except KeyError:
+        raise ValueError(f"未知的输出格式: {output_format}") from None
+
+
+def read_page_offsets(output_path: str) -> List[int]:
+    """读取 indexed 格式的索引，返回每页在文本文件中的结束偏移"""
+    with open(index_path(output_path), 'rb') as f:
+        data = f.read()
+    if not data.startswith(INDEX_MAGIC):
+        raise ValueError(f"不是页面索引文件: {index_path(output_path)}")
+    return [value for value, in _OFFSET.iter_unpack(data[len(INDEX_MAGIC):])]
+
+
+def read_page(output_path: str, page: int, offsets: Optional[List[int]] = None) -> str:
+    """按索引直接读取第 page 页（从 1 开始）的文本，不必读取整个文件"""
+    if offsets is None:
+        offsets = read_page_offsets(output_path)
+    start = offsets[page - 2] if page > 1 else 0
+    with open(output_path, 'rb') as f:
+        f.seek(start)
+        return f.read(offsets[page - 1] - start).decode('utf-8')
+
+
+class BatchArchive:
+    """把一批转换结果依次写入同一个 zip 文件
+
+    每个文件转换完成后立即加入压缩包并删除中间文件，全部结束后 .part 改名为目标文件。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.partial_path = partial_path(path)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.zip = zipfile.ZipFile(self.partial_path, 'w', zipfile.ZIP_DEFLATED, allowZip64=True)
+
+    def add(self, output_path: str, output_format: str, arcname: str):
+        """把一个PDF的输出文件加入压缩包，arcname 为主文件在包内的路径"""
+        for path in output_paths(output_path, output_format):
+            self.zip.write(path, arcname + path[len(output_path):])
+            os.remove(path)
+
+    def close(self):
+        self.zip.close()
+        os.replace(self.partial_path, self.path)
+
+    def discard(self):
+        """转换中断时丢弃不完整的压缩包"""
+        self.zip.close()
+        try:
+            os.remove(self.partial_path)
+        except OSError:
+            pass
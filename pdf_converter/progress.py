@@ -0,0 +1,126 @@
+"""转换进度汇总
+
+工作线程在每页写出后调用 page()，只在锁内更新计数；界面或命令行按固定频率调用
+snapshot() 取得合并后的进度，不必为每一页跨线程发送通知。
+速度按最近 RATE_WINDOW 秒内新转换的页数计算，续传和跳过的页面不计入速度。
+"""
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+# 建议的快照频率（秒）
+PROGRESS_INTERVAL = 0.1
+
+# 计算速度的时间窗口（秒）
+RATE_WINDOW = 10.0
+
+
+def format_duration(seconds):
+    """把秒数格式化为 时:分:秒 或 分:秒"""
+    seconds = int(seconds + 0.5)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+class ProgressTracker:
+    """汇总各文件和整体的转换进度，线程安全
+
+    snapshot() 返回上次快照之后有变化的文件，只应由一个使用方定期调用。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.start_time = time.monotonic()
+        # id(file_data) -> [file_data, 已写出页数, 总页数, 结果]，结果在结束前为 None
+        self.entries: Dict[int, list] = {}
+        self.changed: Dict[int, list] = {}
+        self.current = None
+        self.done_pages = 0
+        self.total_pages = 0
+        self.files_done = 0
+        # 本次新转换的页数及其采样，用于计算速度
+        self.converted = 0
+        self.samples = deque()
+
+    def add_file(self, file_data: Dict, total_pages: int = 0):
+        """登记文件，total_pages 为预估页数，转换开始后以实际页数为准"""
+        with self.lock:
+            self.entries[id(file_data)] = [file_data, 0, total_pages, None]
+            self.total_pages += total_pages
+
+    def _entry(self, file_data):
+        entry = self.entries.get(id(file_data))
+        if entry is None:
+            entry = self.entries[id(file_data)] = [file_data, 0, 0, None]
+        return entry
+
+    def page(self, file_data: Dict, done: int, total: int):
+        """文件已按序写出 done 页"""
+        with self.lock:
+            entry = self._entry(file_data)
+            self.total_pages += total - entry[2]
+            delta = done - entry[1]
+            self.done_pages += delta
+            # 续传时第一次回调直接跳到中断位置，这些页面不是本次转换的
+            if not (entry[1] == 0 and done == file_data.get("resumed_from")):
+                self.converted += delta
+            entry[1], entry[2] = done, total
+            self.changed[id(file_data)] = entry
+            self.current = entry
+
+    def file_done(self, file_data: Dict, success: bool):
+        with self.lock:
+            entry = self._entry(file_data)
+            total = file_data.get("total_pages", entry[2])
+            self.total_pages += total - entry[2]
+            entry[2] = total
+            if success:
+                # 跳过的文件整份计为完成
+                self.done_pages += total - entry[1]
+                entry[1] = total
+            else:
+                # 失败的文件剩余页面不再计入总数
+                self.total_pages -= total - entry[1]
+                entry[2] = entry[1]
+            entry[3] = success
+            self.files_done += 1
+            self.changed[id(file_data)] = entry
+
+    def _rate(self, now):
+        """最近的转换速度（页/秒），调用方持有锁"""
+        self.samples.append((now, self.converted))
+        while len(self.samples) > 2 and now - self.samples[1][0] >= RATE_WINDOW:
+            self.samples.popleft()
+        start, converted = self.samples[0] if len(self.samples) > 1 else (self.start_time, 0)
+        if now - start <= 0:
+            return 0.0
+        return (self.converted - converted) / (now - start)
+
+    def snapshot(self) -> Dict:
+        """合并后的进度
+
+        files 为上次快照之后有变化的文件 [(file_data, 已写出页数, 总页数, 结果)]，
+        结果为 True/False 表示已成功/失败，None 表示仍在转换；
+        current 为最近写出页面的文件，eta 为预计剩余秒数，无法估计时为 None。
+        """
+        now = time.monotonic()
+        with self.lock:
+            rate = self._rate(now)
+            remaining = max(0, self.total_pages - self.done_pages)
+            files = [tuple(entry) for entry in self.changed.values()]
+            self.changed = {}
+            return {
+                "files": files,
+                "current": tuple(self.current) if self.current else None,
+                "done_pages": self.done_pages,
+                "total_pages": self.total_pages,
+                "files_done": self.files_done,
+                "files_total": len(self.entries),
+                "rate": rate,
+                "eta": remaining / rate if rate > 0 else None,
+                "elapsed": now - self.start_time,
+            }
@@ -0,0 +1,597 @@
+"""本机 HTTP 转换服务
+
+其他程序通过 HTTP 提交PDF，各页文本转换出来后立即以 NDJSON 流式返回，不必等整个文件完成。
+基于 asyncio，不依赖第三方 Web 框架。所有请求共用一个固定大小的进程池，
+页段任务在服务内按优先级排队，并发的请求轮流占用工作进程；每个文件需要转换的
+第一个页段只含一页，并且排在其他文件的后续页段之前，预览时首页尽快返回。
+
+接口：
+    POST   /jobs?ocr=auto&backend=pdfium   请求体为PDF内容，也可以用 path=本机路径 指定允许目录中的文件；
+                                           加 stream=1 时直接以 NDJSON 流式返回各页，否则返回任务信息
+    GET    /jobs/{id}                      任务状态
+    GET    /jobs/{id}/pages?from=1         NDJSON 流：每页一行 {"page": 页码, "text": 文本}，最后一行为任务状态
+    GET    /jobs/{id}/result               完整文本，任务完成后可用
+    DELETE /jobs/{id}                      取消并删除任务
+    POST   /ocr                            请求体为图片，返回识别文本和置信度
+    GET    /metrics                        Prometheus 格式的耗时统计
+"""
+import asyncio
+import heapq
+import io
+import itertools
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http import HTTPStatus
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from .backends import BACKEND_AUTO, BACKEND_PDFPLUMBER, BACKENDS, resolve_backend
+from .engine import (
+    DEFAULT_MEMORY_LIMIT, DEFAULT_PAGES_PER_TASK, TASKS_PER_WORKER, cacheable_pages, convert_page_range,
+    extraction_settings, ignore_interrupt, inspect_pdf, plan_ranges
+)
+from .metrics import Metrics, run_with_metrics
+from .ocr import DEFAULT_OCR_CONFIG, OCR_MODES, OCR_OFF, OcrConfig, ocr_image, require_ocr
+from .sources import SharedPdf
+
+logger = logging.getLogger('PDFConverter')
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# 上传文件的大小上限
+MAX_UPLOAD_SIZE = 1024 * 1024 * 1024  # 1 GB
+MAX_IMAGE_SIZE = 64 * 1024 * 1024  # 64 MB
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# 读取请求头的超时时间（秒）
+HEADER_TIMEOUT = 30
+
+# 已结束的任务保留多久（秒）供查询结果
+JOB_RETENTION = 3600
+PURGE_INTERVAL = 60
+
+# 首个需要转换的页段的页数
+FIRST_RANGE_PAGES = 1
+
+# 进程池名额的优先级：打开文档、首页和单张图片识别优先于其余页段
+PRIORITY_PREVIEW = 0
+PRIORITY_BULK = 1
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+STATUS_CANCELLED = 'cancelled'
+
+
+def ocr_image_data(data, config=DEFAULT_OCR_CONFIG):
+    """在工作进程中识别图片，返回 (文本, 置信度)"""
+    from PIL import Image
+
+    require_ocr()
+    config.apply()
+    with Image.open(io.BytesIO(data)) as image:
+        return ocr_image(image, config=config)
+
+
+class PrioritySlots:
+    """限制同时交给进程池的任务数；空出的名额先分给优先级高（数值小）的等待者，同级按先后顺序"""
+
+    def __init__(self, limit: int):
+        self.free = limit
+        self.waiters = []
+        self.counter = itertools.count()
+
+    async def acquire(self, priority: int = PRIORITY_BULK):
+        if self.free > 0 and not self.waiters:
+            self.free -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (priority, next(self.counter), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 名额已经分到但等待者被取消，转给下一个
+                self.release()
+            raise
+
+    def release(self):
+        while self.waiters:
+            _, _, future = heapq.heappop(self.waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.free += 1
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Request:
+    def __init__(self, method: str, path: str, query: Dict[str, List[str]], headers: Dict[str, str]):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+
+    def param(self, name, default=None):
+        values = self.query.get(name)
+        return values[0] if values else default
+
+    @property
+    def content_length(self):
+        if 'chunked' in self.headers.get('transfer-encoding', '').lower():
+            raise HttpError(411, '不支持分块上传，请提供 Content-Length')
+        try:
+            return int(self.headers['content-length'])
+        except (KeyError, ValueError):
+            raise HttpError(411, '缺少 Content-Length')
+
+
+async def read_request(reader) -> Optional[Request]:
+    """读取请求行和请求头，连接已关闭时返回 None"""
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), HEADER_TIMEOUT)
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError:
+        raise HttpError(431, '请求头过长')
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, _ = lines[0].split(' ', 2)
+    except ValueError:
+        raise HttpError(400, '请求行格式错误')
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    url = urlsplit(target)
+    return Request(method.upper(), url.path.rstrip('/') or '/', parse_qs(url.query), headers)
+
+
+def response_head(status: int, content_type: str, extra=()) -> bytes:
+    lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+             f"Content-Type: {content_type}", "Connection: close"]
+    lines.extend(extra)
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+
+async def send(writer, status: int, body: bytes, content_type: str):
+    writer.write(response_head(status, content_type, [f"Content-Length: {len(body)}"]) + body)
+    await writer.drain()
+
+
+async def send_json(writer, status: int, data):
+    body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+    await send(writer, status, body, 'application/json; charset=utf-8')
+
+
+def write_chunk(writer, data: bytes):
+    if data:
+        writer.write(f"{len(data):x}\r\n".encode('latin-1') + data + b'\r\n')
+
+
+class Job:
+    """一个转换任务，已转换的页面按顺序保存在 pages 中"""
+
+    def __init__(self, path, name: str, ocr_mode: str, backend: str, upload: bool = False):
+        self.id = uuid.uuid4().hex
+        # 本机文件路径，或上传内容所在的 SharedPdf
+        self.path = path
+        self.name = name
+        self.ocr_mode = ocr_mode
+        self.backend = backend
+        # 上传的PDF保存在共享内存（空间不足时为临时文件）中，任务结束后释放
+        self.upload = upload
+        self.status = STATUS_QUEUED
+        self.total_pages = None
+        self.pages: List[str] = []
+        self.error = None
+        self.finished_at = None
+        self.changed = asyncio.Condition()
+        self.task = None
+
+    @property
+    def finished(self):
+        return self.status in (STATUS_DONE, STATUS_FAILED, STATUS_CANCELLED)
+
+    def to_dict(self):
+        return {
+            "id": self.id, "name": self.name, "status": self.status,
+            "total_pages": self.total_pages, "pages_done": len(self.pages), "error": self.error,
+        }
+
+    async def notify(self):
+        async with self.changed:
+            self.changed.notify_all()
+
+
+class ConversionService:
+    """HTTP 转换服务，所有任务共用一个进程池"""
+
+    def __init__(self, max_workers: Optional[int] = None, cache=None,
+                 memory_limit: Optional[int] = DEFAULT_MEMORY_LIMIT,
+                 pages_per_task: int = DEFAULT_PAGES_PER_TASK,
+                 metrics: Optional[Metrics] = None,
+                 ocr_config: Optional[OcrConfig] = None,
+                 allowed_dirs: Optional[List[str]] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # path 参数只能指定这些目录（含子目录）中的文件；为空时不接受 path，只能上传
+        self.allowed_dirs = [os.path.realpath(directory) for directory in allowed_dirs or ()]
+        self.cache = cache
+        self.memory_limit = memory_limit
+        self.ocr_config = ocr_config or DEFAULT_OCR_CONFIG
+        self.pages_per_task = max(1, pages_per_task)
+        self.metrics = metrics or Metrics()
+        self.jobs: Dict[str, Job] = {}
+        self.executor = None
+        self.slots = None
+        self.server = None
+        self.upload_dir = None
+        self.purge_task = None
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        self.executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=ignore_interrupt)
+        # 只把进程数这么多个任务交给进程池，其余在这里排队，新请求的首页不会排在已提交的页段后面
+        self.slots = PrioritySlots(self.max_workers)
+        self.upload_dir = tempfile.mkdtemp(prefix='pdf_converter_')
+        self.server = await asyncio.start_server(self.handle, host, port)
+        self.purge_task = asyncio.ensure_future(self._purge())
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+        if self.purge_task is not None:
+            self.purge_task.cancel()
+        tasks = [job.task for job in self.jobs.values() if job.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+        if self.upload_dir is not None:
+            shutil.rmtree(self.upload_dir, ignore_errors=True)
+
+    async def _submit(self, priority, func, *args):
+        """在共用进程池中执行，返回结果并合并工作进程的耗时统计"""
+        await self.slots.acquire(priority)
+        try:
+            executor = self.executor
+            try:
+                result, stats = await asyncio.get_running_loop().run_in_executor(
+                    executor, run_with_metrics, func, *args
+                )
+            except BrokenProcessPool:
+                # 工作进程意外退出后进程池不再可用，为后续任务重建
+                if self.executor is executor:
+                    self.executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                        initializer=ignore_interrupt)
+                    executor.shutdown(wait=False)
+                raise
+        finally:
+            self.slots.release()
+        self.metrics.merge(stats)
+        return result
+
+    async def _cache_call(self, func, *args):
+        """缓存读写是同步的 SQLite 操作，放到线程中执行"""
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    def add_job(self, job: Job):
+        self.jobs[job.id] = job
+        job.task = asyncio.ensure_future(self._run(job))
+        return job
+
+    async def _run(self, job: Job):
+        inflight = set()
+        try:
+            job.status = STATUS_RUNNING
+            await job.notify()
+            use_cache = self.cache is not None
+            if job.backend == BACKEND_AUTO:
+                # 按文档版面选择后端，需要打开文档，同样放进进程池
+                job.backend = await self._submit(PRIORITY_PREVIEW, resolve_backend, job.backend, job.path)
+            total_pages, doc_hash = await self._submit(
+                PRIORITY_PREVIEW, inspect_pdf, job.path, use_cache, job.backend
+            )
+            job.total_pages = total_pages
+            settings = extraction_settings(job.ocr_mode, job.backend, self.ocr_config)
+            cached = {}
+            if use_cache and doc_hash:
+                cached = await self._cache_call(self.cache.get_pages, doc_hash, settings)
+                if cached:
+                    self.metrics.increment("cache_hit_pages", len(cached))
+
+            ranges = list(plan_ranges(total_pages, cached, self.pages_per_task))
+            if ranges and ranges[0][2] is None and ranges[0][1] - ranges[0][0] > FIRST_RANGE_PAGES:
+                # 第一个页段拆出单独一页，首页不必等整个页段
+                start, end, _ = ranges[0]
+                ranges[0:1] = [(start, start + FIRST_RANGE_PAGES, None),
+                               (start + FIRST_RANGE_PAGES, end, None)]
+
+            async def convert(start, end):
+                priority = PRIORITY_PREVIEW if start == 0 else PRIORITY_BULK
+                # 有缓存时取回每页详情，OCR失败的页面不写入缓存
+                result = await self._submit(
+                    priority, convert_page_range, job.path, start, end, job.ocr_mode, None,
+                    self.memory_limit, job.backend, use_cache, self.ocr_config
+                )
+                texts, details = result if use_cache else (result, None)
+                return start, texts, details
+
+            pending = {}
+            todo = iter(ranges)
+            exhausted = False
+            while True:
+                while not exhausted and len(inflight) < self.max_workers * TASKS_PER_WORKER:
+                    item = next(todo, None)
+                    if item is None:
+                        exhausted = True
+                    elif item[2] is not None:
+                        pending[item[0]] = item[2]
+                    else:
+                        inflight.add(asyncio.ensure_future(convert(item[0], item[1])))
+                # 按页码顺序交出已经到达的页段
+                emitted = False
+                while len(job.pages) in pending:
+                    job.pages.extend(pending.pop(len(job.pages)))
+                    emitted = True
+                if emitted:
+                    await job.notify()
+                if not inflight:
+                    break
+                done, inflight = await asyncio.wait(inflight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    start, texts, details = task.result()
+                    pending[start] = texts
+                    if use_cache and doc_hash:
+                        try:
+                            await self._cache_call(self.cache.put_pages, doc_hash, settings,
+                                                   list(cacheable_pages(start, texts, details)))
+                        except Exception as e:
+                            logger.warning(f"写入缓存失败: {str(e)}")
+            job.status = STATUS_DONE
+            self.metrics.increment("files_converted")
+        except asyncio.CancelledError:
+            job.status = STATUS_CANCELLED
+            raise
+        except Exception as e:
+            logger.error(f"转换失败: {job.name}: {str(e)}")
+            job.status = STATUS_FAILED
+            job.error = str(e)
+            self.metrics.increment("files_failed")
+        finally:
+            for task in inflight:
+                task.cancel()
+            job.finished_at = time.monotonic()
+            if job.upload and isinstance(job.path, SharedPdf):
+                job.path.close()
+            elif job.upload:
+                try:
+                    os.remove(job.path)
+                except OSError:
+                    # Windows 下工作进程可能还打开着该文件，退出时随临时目录一起删除
+                    pass
+            await job.notify()
+
+    async def _purge(self):
+        """定期删除保留时间已过的任务"""
+        while True:
+            await asyncio.sleep(PURGE_INTERVAL)
+            now = time.monotonic()
+            for job_id, job in list(self.jobs.items()):
+                if job.finished and now - job.finished_at > JOB_RETENTION:
+                    del self.jobs[job_id]
+
+    async def handle(self, reader, writer):
+        """处理一个连接上的一个请求，响应后关闭连接"""
+        try:
+            request = await read_request(reader)
+            if request is not None:
+                await self.dispatch(request, reader, writer)
+        except HttpError as e:
+            try:
+                await send_json(writer, e.status, {"error": e.message})
+            except ConnectionError:
+                pass
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            pass
+        except Exception as e:
+            logger.error(f"处理请求出错: {str(e)}")
+            try:
+                await send_json(writer, 500, {"error": str(e)})
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+
+    def _job(self, job_id) -> Job:
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise HttpError(404, '任务不存在')
+        return job
+
+    async def dispatch(self, request: Request, reader, writer):
+        parts = request.path.strip('/').split('/')
+        method = request.method
+        if parts == ['jobs'] and method == 'POST':
+            job = await self._create_job(request, reader, writer)
+            if request.param('stream') in ('1', 'true'):
+                await self._stream_pages(job, writer, cancel_on_disconnect=True)
+            else:
+                await send_json(writer, 202, job.to_dict())
+        elif len(parts) == 2 and parts[0] == 'jobs' and method == 'GET':
+            await send_json(writer, 200, self._job(parts[1]).to_dict())
+        elif len(parts) == 2 and parts[0] == 'jobs' and method == 'DELETE':
+            job = self._job(parts[1])
+            if job.task is not None:
+                job.task.cancel()
+                await asyncio.gather(job.task, return_exceptions=True)
+            self.jobs.pop(job.id, None)
+            await send_json(writer, 200, job.to_dict())
+        elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'pages' and method == 'GET':
+            try:
+                first = max(1, int(request.param('from', 1)))
+            except ValueError:
+                raise HttpError(400, 'from 必须是页码')
+            await self._stream_pages(self._job(parts[1]), writer, first - 1)
+        elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'result' and method == 'GET':
+            job = self._job(parts[1])
+            if job.status != STATUS_DONE:
+                await send_json(writer, 409, job.to_dict())
+            else:
+                await send(writer, 200, ''.join(job.pages).encode('utf-8'), 'text/plain; charset=utf-8')
+        elif parts == ['ocr'] and method == 'POST':
+            length = request.content_length
+            if length > MAX_IMAGE_SIZE:
+                raise HttpError(413, '图片过大')
+            await self._continue(request, writer)
+            data = await reader.readexactly(length)
+            try:
+                text, confidence = await self._submit(PRIORITY_PREVIEW, ocr_image_data, data, self.ocr_config)
+            except (OSError, ValueError) as e:
+                # PIL 无法识别的图片格式
+                raise HttpError(400, f'无法读取图片: {str(e)}')
+            await send_json(writer, 200, {"text": text or '', "confidence": confidence})
+        elif parts == ['metrics'] and method == 'GET':
+            await send(writer, 200, self.metrics.to_prometheus().encode('utf-8'),
+                       'text/plain; version=0.0.4; charset=utf-8')
+        else:
+            raise HttpError(404, '接口不存在')
+
+    async def _continue(self, request: Request, writer):
+        """客户端等待 100 Continue 时先回复，再读取请求体"""
+        if request.headers.get('expect', '').lower() == '100-continue':
+            writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+            await writer.drain()
+
+    async def _create_job(self, request: Request, reader, writer) -> Job:
+        ocr_mode = request.param('ocr', OCR_OFF)
+        if ocr_mode not in OCR_MODES:
+            raise HttpError(400, f'ocr 必须是 {", ".join(OCR_MODES)} 之一')
+        backend = request.param('backend', BACKEND_PDFPLUMBER)
+        if backend not in BACKENDS:
+            raise HttpError(400, f'backend 必须是 {", ".join(BACKENDS)} 之一')
+
+        path = request.param('path')
+        if path is not None:
+            path = self._allowed_path(path)
+            if not os.path.isfile(path):
+                raise HttpError(404, f'文件不存在: {path}')
+            return self.add_job(Job(path, os.path.basename(path), ocr_mode, backend))
+
+        length = request.content_length
+        if length == 0:
+            raise HttpError(400, '请求体为空，请上传PDF内容或用 path 指定文件')
+        if length > MAX_UPLOAD_SIZE:
+            raise HttpError(413, 'PDF文件过大')
+        await self._continue(request, writer)
+        name = request.param('name')
+        try:
+            # 请求体直接读入共享内存，工作进程映射同一份内容，不经过磁盘
+            shared = SharedPdf(length, name)
+        except OSError as e:
+            logger.warning(f"改用临时文件保存上传内容: {str(e)}")
+        else:
+            try:
+                await self._receive(reader, length, shared.write)
+                shared.seal()
+            except BaseException:
+                shared.close()
+                raise
+            return self.add_job(Job(shared, name or 'upload.pdf', ocr_mode, backend, upload=True))
+
+        fd, upload_path = tempfile.mkstemp(suffix='.pdf', dir=self.upload_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                await self._receive(reader, length, f.write)
+        except BaseException:
+            os.remove(upload_path)
+            raise
+        name = name or os.path.basename(upload_path)
+        return self.add_job(Job(upload_path, name, ocr_mode, backend, upload=True))
+
+    def _allowed_path(self, path):
+        """解析 path 参数，不在允许的目录中时拒绝；符号链接按实际指向的位置判断"""
+        if not self.allowed_dirs:
+            raise HttpError(403, '服务未允许按路径读取文件，请上传PDF内容（启动时用 --allow-dir 指定目录）')
+        path = os.path.realpath(path)
+        for directory in self.allowed_dirs:
+            try:
+                if os.path.commonpath([directory, path]) == directory:
+                    return path
+            except ValueError:
+                # Windows 下位于不同盘符
+                continue
+        raise HttpError(403, f'不允许读取该路径: {path}')
+
+    @staticmethod
+    async def _receive(reader, length, write):
+        """分块读取 length 字节的请求体"""
+        remaining = length
+        while remaining:
+            chunk = await reader.read(min(UPLOAD_CHUNK_SIZE, remaining))
+            if not chunk:
+                raise asyncio.IncompleteReadError(b'', remaining)
+            write(chunk)
+            remaining -= len(chunk)
+
+    async def _stream_pages(self, job: Job, writer, first: int = 0, cancel_on_disconnect=False):
+        """以 NDJSON 分块返回 first 之后的各页，页面转换出来后立即发送，最后一行为任务状态"""
+        writer.write(response_head(200, 'application/x-ndjson; charset=utf-8',
+                                   ['Transfer-Encoding: chunked', 'Cache-Control: no-cache']))
+        index = first
+        try:
+            while True:
+                async with job.changed:
+                    await job.changed.wait_for(lambda: len(job.pages) > index or job.finished)
+                    pages = job.pages[index:]
+                    finished = job.finished
+                lines = []
+                for text in pages:
+                    index += 1
+                    lines.append(json.dumps({"page": index, "text": text}, ensure_ascii=False))
+                if lines:
+                    write_chunk(writer, ('\n'.join(lines) + '\n').encode('utf-8'))
+                    await writer.drain()
+                if finished and index >= len(job.pages):
+                    break
+        except ConnectionError:
+            # 预览窗口关闭后不再继续转换
+            if cancel_on_disconnect and job.task is not None:
+                job.task.cancel()
+            raise
+        write_chunk(writer, (json.dumps(job.to_dict(), ensure_ascii=False) + '\n').encode('utf-8'))
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+
+
+async def run_server(service: ConversionService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                     on_started=None):
+    """启动服务并一直运行，直到被取消"""
+    await service.start(host, port)
+    try:
+        if on_started:
+            on_started()
+        await service.serve_forever()
+    finally:
+        await service.close()
@@ -0,0 +1,233 @@
+"""内存中的PDF输入
+
+bytes、文件对象和 mmap 不必先写成临时文件：内容复制一次到命名共享内存，
+SharedPdf 只携带名字和长度，可以随页段任务 pickle 到各工作进程。工作进程按名字映射
+同一块内存，转换同一文档不同页段的进程共用一份数据，不再各自读取整个文件。
+pdfium 直接在映射上加载文档，不复制；pdfplumber 经由 SharedPdfReader 按需读取。
+
+共享内存由创建方负责释放（close），工作进程只映射、不删除。
+"""
+import io
+import mmap
+import os
+from typing import Optional
+
+# 从文件对象复制到共享内存时每次读取的字节数
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# 共享内存所在的文件系统，创建前检查剩余空间，避免写入时因空间不足收到 SIGBUS
+SHM_DIR = '/dev/shm'
+
+MEMORY_LABEL = '<内存>'
+
+
+def is_path(pdf_input):
+    """输入是否为文件路径"""
+    return isinstance(pdf_input, (str, os.PathLike))
+
+
+def _check_space(size):
+    try:
+        stat = os.statvfs(SHM_DIR)
+    except (AttributeError, OSError):
+        # Windows 没有 /dev/shm，共享内存由系统分页文件承载
+        return
+    if stat.f_bavail * stat.f_frsize < size:
+        raise OSError(f"共享内存空间不足: 需要 {size} 字节，{SHM_DIR} 剩余 "
+                      f"{stat.f_bavail * stat.f_frsize} 字节")
+
+
+def _stream_size(stream) -> Optional[int]:
+    """文件对象从当前位置到末尾的字节数，无法得知时返回 None"""
+    try:
+        position = stream.tell()
+        try:
+            return os.fstat(stream.fileno()).st_size - position
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            end = stream.seek(0, io.SEEK_END)
+            stream.seek(position)
+            return end - position
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+
+class SharedPdf:
+    """放在命名共享内存中的PDF内容
+
+    由创建方 write() 依次写入 size 字节后 seal()，写入时同时计算内容哈希（digest），
+    与 hash_file 的结果一致，页面缓存对文件和内存中的同一份PDF都能命中。
+    """
+
+    def __init__(self, size: int, label: Optional[str] = None):
+        if size <= 0:
+            raise ValueError("PDF内容为空")
+        from multiprocessing import shared_memory
+
+        from .cache import content_hasher
+
+        _check_space(size)
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.name = self.shm.name
+        self.size = size
+        self.label = label or MEMORY_LABEL
+        self.digest = None
+        self.written = 0
+        self.hasher = content_hasher()
+
+    def __getstate__(self):
+        # 传给工作进程的只有名字、长度和哈希
+        return {"name": self.name, "size": self.size, "label": self.label, "digest": self.digest}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.shm = None
+        self.written = self.size
+        self.hasher = None
+
+    def __repr__(self):
+        return f"SharedPdf({self.label!r}, {self.size})"
+
+    def write(self, data):
+        """追加写入一段内容"""
+        view = memoryview(data).cast('B')
+        end = self.written + view.nbytes
+        if end > self.size:
+            raise ValueError(f"写入内容超过声明的长度 {self.size}")
+        self.shm.buf[self.written:end] = view
+        self.hasher.update(view)
+        self.written = end
+
+    def fill(self, stream):
+        """从文件对象读取剩余内容，直接读入共享内存"""
+        readinto = getattr(stream, 'readinto', None)
+        while self.written < self.size:
+            count = min(COPY_CHUNK_SIZE, self.size - self.written)
+            if readinto is not None:
+                target = self.shm.buf[self.written:self.written + count]
+                try:
+                    count = readinto(target)
+                finally:
+                    target.release()
+                if not count:
+                    break
+                self.hasher.update(self.shm.buf[self.written:self.written + count])
+                self.written += count
+            else:
+                chunk = stream.read(count)
+                if not chunk:
+                    break
+                self.write(chunk)
+
+    def seal(self):
+        """写入完成，之后才能交给工作进程"""
+        if self.written != self.size:
+            raise ValueError(f"PDF内容不完整: 已写入 {self.written}/{self.size} 字节")
+        self.digest = self.hasher.hexdigest()
+        self.hasher = None
+
+    def open(self) -> 'SharedPdfReader':
+        """在当前进程中映射共享内存，返回只读的文件对象"""
+        return SharedPdfReader(self)
+
+    def close(self):
+        """释放共享内存，只应由创建方调用；已映射的工作进程在关闭文档后才真正释放"""
+        if self.shm is None:
+            return
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm = None
+
+
+def share_pdf(data, label: Optional[str] = None) -> SharedPdf:
+    """把 bytes、bytearray、memoryview、mmap 或二进制文件对象放入共享内存
+
+    文件对象从当前位置读到末尾。调用方负责在转换结束后 close()。
+    """
+    if isinstance(data, SharedPdf):
+        return data
+    # mmap 同时支持缓冲区协议和文件接口，按缓冲区直接复制
+    if hasattr(data, 'read') and not isinstance(data, mmap.mmap):
+        size = _stream_size(data)
+        if size is None:
+            # 无法得知长度的流（如管道、网络响应）只能先整体读入
+            data = data.read()
+        else:
+            shared = SharedPdf(size, label)
+            try:
+                shared.fill(data)
+                shared.seal()
+            except BaseException:
+                shared.close()
+                raise
+            return shared
+    view = memoryview(data).cast('B')
+    shared = SharedPdf(view.nbytes, label)
+    try:
+        shared.write(view)
+        shared.seal()
+    except BaseException:
+        shared.close()
+        raise
+    return shared
+
+
+class SharedPdfReader(io.RawIOBase):
+    """共享内存上的只读文件对象，读取时只复制请求的部分"""
+
+    def __init__(self, shared: SharedPdf):
+        from multiprocessing import shared_memory
+
+        super().__init__()
+        self.shm = shared_memory.SharedMemory(shared.name)
+        self.view = self.shm.buf[:shared.size]
+        self.size = shared.size
+        self.position = 0
+        self._array = None
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = max(0, min(len(buffer), self.size - self.position))
+        buffer[:count] = self.view[self.position:self.position + count]
+        self.position += count
+        return count
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError(f"无效的位置: {offset}")
+        self.position = offset
+        return offset
+
+    def tell(self):
+        return self.position
+
+    def array(self):
+        """整个映射对应的 ctypes 数组，交给 PDFium 时不复制"""
+        import ctypes
+
+        if self._array is None:
+            self._array = (ctypes.c_char * self.size).from_buffer(self.view)
+        return self._array
+
+    def close(self):
+        if self.shm is not None:
+            self._array = None
+            try:
+                self.view.release()
+                self.shm.close()
+            except BufferError:
+                # 解析器仍引用着映射，随对象回收释放
+                pass
+            self.shm = None
+        super().close()
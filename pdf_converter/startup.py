@@ -0,0 +1,74 @@
+"""启动耗时报告
+
+StartupTimer 记录程序启动后各阶段完成的时间；import_report 在 -X importtime 下重新运行
+程序，汇总各模块的导入耗时，按累计耗时排序，与 python -X importtime 的输出一致。
+"""
+import re
+import subprocess
+import sys
+import time
+from typing import List, Optional, Tuple
+
+# 报告中列出的导入耗时最多的模块数
+TOP_IMPORTS = 15
+
+# 例：import time:       412 |      21767 |   pdf_converter.backends
+_IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)\s*$')
+
+
+class StartupTimer:
+    """按顺序记录启动各阶段完成时距离开始的秒数"""
+
+    def __init__(self, start: Optional[float] = None):
+        self.start = time.perf_counter() if start is None else start
+        self.phases: List[Tuple[str, float]] = []
+
+    def mark(self, name: str):
+        self.phases.append((name, time.perf_counter() - self.start))
+
+    def format(self) -> str:
+        lines = []
+        previous = 0.0
+        for name, elapsed in self.phases:
+            lines.append(f"{elapsed * 1000:9.1f} ms  (+{(elapsed - previous) * 1000:7.1f} ms)  {name}")
+            previous = elapsed
+        return "\n".join(lines)
+
+
+def parse_importtime(output: str) -> List[Tuple[str, int, int, int]]:
+    """解析 -X importtime 的输出，返回 [(模块, 自身耗时, 累计耗时, 层级)]，耗时单位为微秒"""
+    results = []
+    for line in output.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            own, cumulative, indent, module = match.groups()
+            results.append((module, int(own), int(cumulative), (len(indent) - 1) // 2))
+    return results
+
+
+def import_report(argv: List[str], top: int = TOP_IMPORTS) -> Tuple[str, str]:
+    """以 -X importtime 运行 argv（脚本路径及参数），返回 (子进程的标准输出, 导入耗时报告)
+
+    报告列出累计耗时最多的顶层导入，以及自身耗时最多的模块。
+    """
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + list(argv),
+                            capture_output=True, text=True, encoding='utf-8', errors='replace')
+    elapsed = time.perf_counter() - started
+    imports = parse_importtime(result.stderr)
+    lines = [f"进程总耗时（含解释器启动）{elapsed * 1000:.1f} ms，"
+             f"导入 {len(imports)} 个模块共 {sum(own for _, own, _, _ in imports) / 1000:.1f} ms"]
+    lines.append("")
+    lines.append("累计耗时最多的顶层导入:")
+    for module, _, cumulative, _ in sorted((item for item in imports if item[3] == 0),
+                                           key=lambda item: -item[2])[:top]:
+        lines.append(f"  {cumulative / 1000:9.1f} ms  {module}")
+    lines.append("")
+    lines.append("自身耗时最多的模块:")
+    for module, own, _, _ in sorted(imports, key=lambda item: -item[1])[:top]:
+        lines.append(f"  {own / 1000:9.1f} ms  {module}")
+    if result.returncode != 0:
+        lines.append("")
+        lines.append(f"程序退出码 {result.returncode}")
+        lines.extend(line for line in result.stderr.splitlines() if not line.startswith('import time:'))
+    return result.stdout, "\n".join(lines)
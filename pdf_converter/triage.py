@@ -0,0 +1,61 @@
+"""OCR分流：根据页面构成决定提取文本、OCR识别还是跳过
+
+只依据提取文本时顺带得到的信息（字符数、乱码比例、图片覆盖率、字体、文字密度）判断，
+只有确实需要OCR的页面才渲染，纯矢量图形页和空白页不再渲染识别。
+"""
+import re
+
+PAGE_TEXT = 'text'
+PAGE_OCR = 'ocr'
+PAGE_SKIP = 'skip'
+
+# 分流规则版本，规则变化时缓存键随之变化
+TRIAGE_VERSION = 1
+
+# 图片覆盖率达到该比例才值得OCR，更小的多为图标、徽标
+MIN_IMAGE_COVERAGE = 0.05
+
+# 图片覆盖率达到该比例视为扫描页
+SCAN_IMAGE_COVERAGE = 0.5
+
+# 扫描页上每平方英寸少于该字符数时，视为只有页眉、页码等零星文字，仍需OCR
+MIN_TEXT_DENSITY = 2.0
+
+# pdfminer 对没有 Unicode 映射的字形输出 (cid:N)；替换字符和私用区字符同样无法阅读
+_GARBAGE = re.compile(r'\(cid:\d+\)|[\ufffd\ue000-\uf8ff]')
+
+
+def count_chars(text):
+    """统计可读字符数和乱码字形数，不计空白"""
+    if not text:
+        return 0, 0
+    garbage = len(_GARBAGE.findall(text))
+    readable = _GARBAGE.sub('', text)
+    good = sum(1 for c in readable if c.isprintable() and not c.isspace())
+    return good, garbage
+
+
+def image_coverage(stats):
+    """图片面积占页面面积的比例"""
+    if not stats.get("area"):
+        return 0.0
+    return min(1.0, stats.get("image_area", 0) / stats["area"])
+
+
+def classify_page(text, stats):
+    """返回 PAGE_TEXT / PAGE_OCR / PAGE_SKIP
+
+    stats 由后端的 analyze 给出，包含 area、image_area（单位为点的平方）和 fonts（字体数）。
+    """
+    good, garbage = count_chars(text)
+    coverage = image_coverage(stats)
+    if good == 0 and garbage == 0:
+        return PAGE_OCR if coverage >= MIN_IMAGE_COVERAGE else PAGE_SKIP
+    if garbage > good and stats.get("fonts"):
+        # 字体缺少编码映射，文字只能从渲染后的字形识别
+        return PAGE_OCR
+    if coverage >= SCAN_IMAGE_COVERAGE:
+        density = good / (stats["area"] / 72 / 72)
+        if density < MIN_TEXT_DENSITY:
+            return PAGE_OCR
+    return PAGE_TEXT
@@ -0,0 +1,430 @@
+"""监视文件夹，持续转换新出现的PDF
+
+新文件先经过去抖：大小和修改时间在 settle 秒内不再变化、且文件末尾已有 %%EOF 才入队，
+避免转换复制到一半的文件。队列保存在 SQLite 中，按估算的转换代价排序，
+小文件、纯文本文件优先，大型扫描件靠后；程序重启后未完成的任务继续执行。
+安装了 watchdog 时使用系统的文件变化通知（Linux 下为 inotify），否则定时扫描目录。
+
+转换分两条通道，共用固定数量的工作进程：快速通道只处理代价较小的任务，
+常规通道按代价从小到大处理所有任务，小文件不会被排在前面的大型扫描件阻塞。
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .backends import BACKEND_AUTO, BACKEND_PDFPLUMBER, open_with_backend
+from .cache import DEFAULT_CACHE_DIR
+from .engine import DEFAULT_MEMORY_LIMIT, ConversionEngine
+from .journal import file_fingerprint
+from .ocr import OCR_OFF
+from .triage import PAGE_OCR, classify_page
+
+logger = logging.getLogger('PDFConverter')
+
+DEFAULT_QUEUE_PATH = os.path.join(DEFAULT_CACHE_DIR, 'queue.sqlite3')
+
+# 文件大小和修改时间保持不变多少秒后才认为写入完成
+DEFAULT_SETTLE = 2.0
+
+# 没有文件变化通知时扫描目录的间隔（秒）
+DEFAULT_POLL_INTERVAL = 5.0
+
+# 文件稳定了这么多个 settle 周期仍没有 %%EOF，也当作完整文件入队（部分PDF末尾有多余数据）
+EOF_GRACE_PERIODS = 10
+
+# 代价按页数估算，需要OCR的页面按这个倍数计
+OCR_PAGE_COST = 20
+
+# 估算代价时抽样分析的页数
+COST_SAMPLE_PAGES = 3
+
+# 代价不超过该值的任务可以进入快速通道
+SMALL_JOB_COST = 50
+
+# 估算代价的后台线程数，打开和抽样分析PDF不占用监视循环
+ESTIMATE_THREADS = 2
+
+STATUS_PENDING = 'pending'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+
+def estimate_cost(pdf_path, ocr_mode=OCR_OFF):
+    """估算转换代价：页数，需要OCR时按抽样页面中扫描页的比例加权"""
+    document = open_with_backend(pdf_path, BACKEND_AUTO)
+    try:
+        pages = len(document)
+        if ocr_mode == OCR_OFF or pages == 0:
+            return pages
+        samples = sorted({i * pages // COST_SAMPLE_PAGES for i in range(min(pages, COST_SAMPLE_PAGES))})
+        scanned = sum(1 for i in samples if classify_page(*document.analyze(i)) == PAGE_OCR)
+        return int(pages * (1 + (OCR_PAGE_COST - 1) * scanned / len(samples)))
+    finally:
+        document.close()
+
+
+def _has_eof(path):
+    """PDF文件末尾是否已写入 %%EOF"""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - 1024))
+        return b'%%EOF' in f.read()
+
+
+class JobQueue:
+    """基于 SQLite 的持久化任务队列，按代价从小到大出队，可在多个线程间共享"""
+
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                path TEXT PRIMARY KEY,
+                output_path TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                cost INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                enqueued REAL NOT NULL,
+                error TEXT,
+                requeue INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, cost, enqueued)")
+        # 上次退出时正在转换的任务重新排队，借助任务日志从中断处续传
+        self.conn.execute("UPDATE jobs SET status = ?, requeue = 0 WHERE status = ?",
+                          (STATUS_PENDING, STATUS_RUNNING))
+        self.conn.commit()
+
+    def known(self, path: str, fingerprint: str) -> bool:
+        """文件的当前版本是否已经入过队"""
+        with self.lock:
+            row = self.conn.execute("SELECT fingerprint FROM jobs WHERE path = ?", (path,)).fetchone()
+        return row is not None and row[0] == fingerprint
+
+    def add(self, path: str, output_path: str, fingerprint: str, cost: int):
+        """加入或更新任务；正在转换的任务保持处理中，只记下转换结束后需要重新排队"""
+        with self.lock:
+            # SET 中的列名取更新前的值
+            self.conn.execute(
+                "INSERT INTO jobs (path, output_path, fingerprint, cost, status, enqueued) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (path) DO UPDATE SET "
+                "output_path = excluded.output_path, fingerprint = excluded.fingerprint, "
+                "cost = excluded.cost, enqueued = excluded.enqueued, error = NULL, "
+                "status = CASE WHEN status = ? THEN status ELSE excluded.status END, "
+                "requeue = (status = ?)",
+                (path, output_path, fingerprint, cost, STATUS_PENDING, time.time(),
+                 STATUS_RUNNING, STATUS_RUNNING)
+            )
+            self.conn.commit()
+
+    def claim(self, limit: int, max_cost: Optional[int] = None) -> List[Dict]:
+        """取出代价最小的若干个待处理任务并标记为处理中"""
+        query = "SELECT path, output_path, fingerprint, cost FROM jobs WHERE status = ?"
+        params = [STATUS_PENDING]
+        if max_cost is not None:
+            query += " AND cost <= ?"
+            params.append(max_cost)
+        query += " ORDER BY cost, enqueued LIMIT ?"
+        params.append(limit)
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+            self.conn.executemany(
+                "UPDATE jobs SET status = ? WHERE path = ?",
+                [(STATUS_RUNNING, row[0]) for row in rows]
+            )
+            self.conn.commit()
+        return [
+            {"path": path, "name": os.path.basename(path), "output_path": output_path,
+             "fingerprint": fingerprint, "cost": cost}
+            for path, output_path, fingerprint, cost in rows
+        ]
+
+    def complete(self, path: str, success: bool, error: Optional[str] = None):
+        """记录任务结果；转换期间文件又被修改过时重新排队"""
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET status = CASE WHEN requeue THEN ? ELSE ? END, "
+                "error = CASE WHEN requeue THEN NULL ELSE ? END, requeue = 0 "
+                "WHERE path = ? AND status = ?",
+                (STATUS_PENDING, STATUS_DONE if success else STATUS_FAILED, error, path, STATUS_RUNNING)
+            )
+            self.conn.commit()
+
+    def counts(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class DirectoryWatcher:
+    """收集目录中新出现或被修改的PDF，去抖后交给调用方"""
+
+    def __init__(self, directories: List[str], recursive: bool = False,
+                 settle: float = DEFAULT_SETTLE, poll_interval: float = DEFAULT_POLL_INTERVAL):
+        self.directories = [os.path.abspath(d) for d in directories]
+        self.recursive = recursive
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.lock = threading.Lock()
+        # 待确认的文件: 路径 -> (大小, 修改时间, 首次观察到该状态的时间)
+        self.candidates: Dict[str, tuple] = {}
+        # 已交出的文件: 路径 -> (大小, 修改时间)，定时扫描时跳过没有变化的文件
+        self.reported: Dict[str, tuple] = {}
+        self.observer = None
+        self.last_scan = 0.0
+
+    def start(self):
+        """启动文件变化通知，未安装 watchdog 时退回定时扫描"""
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            logger.info("未安装watchdog，定时扫描监视目录")
+            return
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.is_directory:
+                    return
+                for path in (event.src_path, getattr(event, 'dest_path', '')):
+                    if path:
+                        watcher.notice(os.fsdecode(path))
+
+        observer = Observer()
+        for directory in self.directories:
+            observer.schedule(Handler(), directory, recursive=self.recursive)
+        observer.start()
+        self.observer = observer
+
+    def stop(self):
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+            self.observer = None
+
+    def notice(self, path):
+        """登记可能发生变化的文件"""
+        if not path.lower().endswith('.pdf'):
+            return
+        with self.lock:
+            self.candidates.setdefault(path, None)
+
+    def scan(self):
+        """扫描监视目录，登记所有PDF；已经不存在的文件不再记录"""
+        seen = set()
+        for directory in self.directories:
+            pattern = '**/*' if self.recursive else '*'
+            for path in Path(directory).glob(pattern):
+                if path.is_file():
+                    seen.add(str(path))
+                    self.notice(str(path))
+        with self.lock:
+            for path in [path for path in self.reported if path not in seen]:
+                del self.reported[path]
+
+    def forget(self, path):
+        """文件已处理完，不再记录交出时的状态；定时扫描再次交出未变化的文件时由任务队列跳过"""
+        with self.lock:
+            self.reported.pop(path, None)
+
+    def ready_files(self) -> List[str]:
+        """返回已经写入完成的文件"""
+        now = time.monotonic()
+        # 有变化通知时只在启动时扫描一次，之后依赖通知
+        if now - self.last_scan >= self.poll_interval and (self.observer is None or not self.last_scan):
+            self.scan()
+            self.last_scan = now
+        ready = []
+        with self.lock:
+            items = list(self.candidates.items())
+        for path, previous in items:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                with self.lock:
+                    self.candidates.pop(path, None)
+                continue
+            current = (stat.st_size, stat.st_mtime_ns)
+            if previous is None and self.reported.get(path) == current:
+                with self.lock:
+                    self.candidates.pop(path, None)
+                continue
+            if previous is None or previous[:2] != current:
+                with self.lock:
+                    self.candidates[path] = current + (now,)
+                continue
+            stable_for = now - previous[2]
+            if stable_for < self.settle:
+                continue
+            try:
+                complete = _has_eof(path) or stable_for >= self.settle * EOF_GRACE_PERIODS
+            except OSError:
+                # Windows 下正在复制的文件无法打开
+                continue
+            if complete:
+                with self.lock:
+                    self.candidates.pop(path, None)
+                    self.reported[path] = current
+                ready.append(path)
+        return ready
+
+
+class WatchDaemon:
+    """监视目录并持续转换新PDF"""
+
+    def __init__(self, directories: List[str], output_dir: Optional[str] = None,
+                 recursive: bool = False, max_workers: Optional[int] = None,
+                 ocr_mode: str = OCR_OFF, backend: str = BACKEND_PDFPLUMBER,
+                 queue_path: str = DEFAULT_QUEUE_PATH, settle: float = DEFAULT_SETTLE,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL, cache=None, journal=None,
+                 memory_limit: Optional[int] = DEFAULT_MEMORY_LIMIT, on_file_done=None,
+                 ocr_config=None):
+        self.watcher = DirectoryWatcher(directories, recursive, settle, poll_interval)
+        self.output_dir = output_dir
+        self.ocr_mode = ocr_mode
+        self.backend = backend
+        self.queue = JobQueue(queue_path)
+        self.on_file_done = on_file_done
+        self.stopping = threading.Event()
+        self.wakeup = threading.Event()
+        # 代价估算在后台线程中进行；正在估算的 (路径, 指纹)，避免重复提交
+        self.estimator = ThreadPoolExecutor(ESTIMATE_THREADS, thread_name_prefix='estimate')
+        self.estimating = set()
+        self.estimating_lock = threading.Lock()
+
+        workers = max_workers or os.cpu_count() or 1
+        # 两个及以上进程时分出一个给快速通道
+        lanes = [(None, workers)] if workers < 2 else [(SMALL_JOB_COST, 1), (None, workers - 1)]
+        self.lanes = []
+        for max_cost, count in lanes:
+            engine = ConversionEngine(count, cache=cache, journal=journal, memory_limit=memory_limit,
+                                      ocr_config=ocr_config)
+            self.lanes.append((max_cost, engine))
+        self.threads = []
+
+    def output_path(self, path):
+        """输出路径：指定了输出目录时保留相对于监视目录的层级"""
+        if not self.output_dir:
+            return str(Path(path).with_suffix('.txt'))
+        for directory in self.watcher.directories:
+            try:
+                inside = os.path.commonpath([directory, path]) == directory
+            except ValueError:
+                # Windows 下不在同一个盘
+                inside = False
+            if inside:
+                return str(Path(self.output_dir, os.path.relpath(path, directory)).with_suffix('.txt'))
+        return str(Path(self.output_dir, os.path.basename(path)).with_suffix('.txt'))
+
+    def enqueue(self, path):
+        """新文件交给后台线程估算代价后入队，不阻塞监视循环"""
+        try:
+            fingerprint = file_fingerprint(path)
+        except OSError:
+            return
+        if self.queue.known(path, fingerprint):
+            return
+        with self.estimating_lock:
+            if (path, fingerprint) in self.estimating:
+                return
+            self.estimating.add((path, fingerprint))
+        self.estimator.submit(self._estimate, path, fingerprint)
+
+    def _estimate(self, path, fingerprint):
+        try:
+            if self.stopping.is_set():
+                return
+            try:
+                cost = estimate_cost(path, self.ocr_mode)
+            except Exception as e:
+                # 无法预先分析的文件按大小估算，转换时再报告错误
+                logger.warning(f"无法估算转换代价: {path}: {str(e)}")
+                try:
+                    cost = os.path.getsize(path) // 1024
+                except OSError:
+                    return
+            self.queue.add(path, self.output_path(path), fingerprint, cost)
+            logger.info(f"已加入队列: {path}（代价 {cost}）")
+            self.wakeup.set()
+        finally:
+            with self.estimating_lock:
+                self.estimating.discard((path, fingerprint))
+
+    def _drain(self, max_cost, engine):
+        """一个转换通道：不断取出代价最小的任务交给引擎"""
+        engine.start()
+        try:
+            while not self.stopping.is_set():
+                # 每批只取进程数这么多个文件，新到的小文件很快就能排进下一批
+                jobs = self.queue.claim(engine.max_workers, max_cost)
+                if not jobs:
+                    self.wakeup.wait(1.0)
+                    self.wakeup.clear()
+                    continue
+
+                def done(file_data, success):
+                    file_data["finished"] = True
+                    self.watcher.forget(file_data["path"])
+                    if self.stopping.is_set() and not success:
+                        # 因退出而中断的任务保持处理中状态，下次启动时重新排队并续传
+                        return
+                    self.queue.complete(file_data["path"], success, file_data.get("error"))
+                    if self.on_file_done:
+                        self.on_file_done(file_data, success)
+
+                try:
+                    engine.convert(jobs, self.ocr_mode, on_file_done=done, backend=self.backend)
+                except Exception as e:
+                    logger.error(f"转换出错: {str(e)}")
+                    for file_data in jobs:
+                        if not file_data.get("finished"):
+                            file_data["error"] = str(e)
+                            done(file_data, False)
+        finally:
+            engine.shutdown()
+
+    def run(self):
+        """运行直到调用 stop()"""
+        self.watcher.start()
+        for max_cost, engine in self.lanes:
+            thread = threading.Thread(target=self._drain, args=(max_cost, engine), daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        try:
+            while not self.stopping.is_set():
+                for path in self.watcher.ready_files():
+                    self.enqueue(path)
+                self.stopping.wait(min(0.5, self.watcher.settle))
+        finally:
+            while True:
+                # 退出时再次按 Ctrl+C 也要等各通道记录完进度，之后才能关闭任务日志
+                try:
+                    self.stop()
+                    self.watcher.stop()
+                    self.estimator.shutdown(wait=True, cancel_futures=True)
+                    for thread in self.threads:
+                        thread.join()
+                    break
+                except KeyboardInterrupt:
+                    continue
+            self.queue.close()
+
+    def stop(self):
+        self.stopping.set()
+        self.wakeup.set()
+        for _, engine in self.lanes:
+            engine.stop()
@@ -1,133 +1,289 @@
 import sys
 import os
-from pathlib import Path
 import logging
-import uuid
-import shutil
-from typing import List, Dict
-from PIL import Image, ImageEnhance
-import pdfplumber
-import pytesseract
+import multiprocessing
+import time
+from typing import List, Dict, Optional
+
+# 启动耗时从这里开始计，之后是较重的 PyQt6 导入
+STARTED = time.perf_counter()
 
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QPushButton, QLabel, QCheckBox, QTableWidget, QTableWidgetItem,
+    QPushButton, QLabel, QCheckBox, QTableView, QStyledItemDelegate,
     QHeaderView, QProgressBar, QFileDialog, QMessageBox, QStatusBar,
-    QStyle, QStyleFactory
+    QStyle, QStyleFactory, QSpinBox, QComboBox
+)
+from PyQt6.QtCore import (
+    Qt, pyqtSignal, QThread, QTimer, QAbstractTableModel, QModelIndex, QEvent
 )
-from PyQt6.QtCore import Qt, pyqtSignal, QSize, QThread
-from PyQt6.QtGui import QIcon, QFont
+from PyQt6.QtGui import QFont, QColor, QPainter
 import subprocess
 
+# 只导入常量和轻量模块；转换引擎、页数读取和缓存在第一次用到时才导入
+from pdf_converter.backends import BACKEND_AUTO, BACKEND_PDFIUM, BACKEND_PDFPLUMBER
+from pdf_converter.ocr import OCR_AUTO, OCR_OFF
+from pdf_converter.progress import PROGRESS_INTERVAL, format_duration, ProgressTracker
+from pdf_converter.startup import StartupTimer, import_report
+
+# 打印启动各阶段耗时和模块导入耗时后退出
+STARTUP_REPORT_FLAG = '--startup-report'
+
+
+def path_key(path):
+    """用于判断重复文件的路径键"""
+    from pdf_converter.converter import path_key
+
+    return path_key(path)
+
+
+class TesseractCheckWorker(QThread):
+    """在后台查找 Tesseract，不阻塞窗口显示"""
+    checked = pyqtSignal(str)  # 可执行文件路径，找不到时为空字符串
+
+    def run(self):
+        from pdf_converter.ocr import locate_tesseract
+
+        self.checked.emit(locate_tesseract() or '')
+
+
+class RegisterWorker(QThread):
+    """在后台读取新添加文件的大小和页数，分批交给界面"""
+    files_registered = pyqtSignal(list)  # file_data 列表
+    registration_completed = pyqtSignal(list)  # [(路径, 错误信息)]
+
+    # 两次发送之间至少间隔的秒数，避免逐个文件刷新表格
+    BATCH_INTERVAL = 0.1
+
+    def __init__(self, paths):
+        super().__init__()
+        self.paths = paths
+
+    def run(self):
+        # 第一次添加文件时才导入，页数读取所用的 PDF 解析库随之按需加载
+        from pdf_converter.converter import read_page_counts
+
+        failed = []
+        batch = []
+        last_emit = time.monotonic()
+        counts = read_page_counts(self.paths)
+        try:
+            for path, pages, error in counts:
+                if self.isInterruptionRequested():
+                    break
+                if error is not None:
+                    failed.append((path, error))
+                    continue
+                try:
+                    size = os.path.getsize(path)
+                except OSError as e:
+                    failed.append((path, str(e)))
+                    continue
+                batch.append({
+                    "path": path,
+                    "name": os.path.basename(path),
+                    "size": f"{size / 1024 / 1024:.1f} MB",
+                    "pages": str(pages),
+                    "status": "待转换"
+                })
+                if time.monotonic() - last_emit >= self.BATCH_INTERVAL:
+                    self.files_registered.emit(batch)
+                    batch = []
+                    last_emit = time.monotonic()
+        finally:
+            counts.close()
+            if batch:
+                self.files_registered.emit(batch)
+            self.registration_completed.emit(failed)
+
 class ConvertWorker(QThread):
     """PDF转换工作线程"""
-    progress_updated = pyqtSignal(str, int, int)  # 文件名, 当前页, 总页数
-    file_completed = pyqtSignal(dict, bool)  # file_data, success
-    conversion_completed = pyqtSignal()
-    status_updated = pyqtSignal(dict, str)  # file_data, status_text
+    conversion_completed = pyqtSignal(bool)  # 是否被取消
+
+    def __init__(self, files, use_ocr, logger, max_workers=None, cache=None,
+                 backend=BACKEND_PDFPLUMBER, journal=None):
+        from pdf_converter import ConversionEngine
 
-    def __init__(self, files, use_ocr, temp_dir, logger):
         super().__init__()
         self.files = files
         self.use_ocr = use_ocr
-        self.temp_dir = temp_dir
-        self.running = True
+        self.backend = backend
         self.logger = logger
+        self.cancelled = False
+        # 页面转换分发到进程池，本线程只负责调度
+        self.engine = ConversionEngine(max_workers, logger=logger, cache=cache, journal=journal)
+        # 逐页只在锁内记录进度，界面按固定频率取快照，不为每一页发送信号
+        self.progress = ProgressTracker()
+        for file_data in files:
+            pages = file_data.get("pages", "")
+            self.progress.add_file(file_data, int(pages) if pages.isdigit() else 0)
 
-    def preprocess_image(self, image):
-        """预处理图片以提高OCR识别率"""
-        image = image.convert('L')
-        enhancer = ImageEnhance.Contrast(image)
-        image = enhancer.enhance(2.0)
-        enhancer = ImageEnhance.Brightness(image)
-        image = enhancer.enhance(1.5)
-        return image
-
-    def ocr_image(self, image):
-        """对图片进行OCR识别"""
+    def run(self):
         try:
-            processed_image = self.preprocess_image(image)
-            text = pytesseract.image_to_string(processed_image, lang='chi_sim+eng')
-            if not text.strip():
-                self.logger.warning("OCR结果为空")
-                return None
-            return text
+            self.engine.convert(
+                self.files,
+                OCR_AUTO if self.use_ocr else OCR_OFF,
+                on_page=self.progress.page,
+                on_file_done=self.progress.file_done,
+                backend=self.backend
+            )
         except Exception as e:
-            self.logger.error(f"OCR识别错误: {str(e)}")
+            self.logger.error(f"转换失败: {str(e)}")
+        finally:
+            self.conversion_completed.emit(self.cancelled)
+
+    def stop(self):
+        self.cancelled = True
+        self.engine.stop()
+
+class FileTableModel(QAbstractTableModel):
+    """文件列表模型，视图只为可见的行取数据，行数再多也不会创建控件"""
+    HEADERS = ["文件名", "大小", "页数", "状态", "打开位置", "操作"]
+    COLUMN_NAME, COLUMN_SIZE, COLUMN_PAGES, COLUMN_STATUS, COLUMN_LOCATION, COLUMN_DELETE = range(6)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.files: List[Dict] = []
+        # 文件编号 -> 行号；删除行后置为 None，下次查找时重建
+        self._rows: Optional[Dict[int, int]] = {}
+        self._next_id = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.files)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
             return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return str(section + 1)
 
-    def convert_single_file(self, file_data):
-        """转换单个文件"""
-        pdf_path = file_data["path"]
-        output_path = Path(pdf_path).with_suffix('.txt')
-        file_data["output_path"] = str(output_path)  # 保存输出路径
-        
-        with pdfplumber.open(pdf_path) as pdf:
-            total_pages = len(pdf.pages)
-            with open(output_path, 'w', encoding='utf-8') as f:
-                for page_idx, page in enumerate(pdf.pages, 1):
-                    if not self.running:
-                        return False
-                        
-                    text = page.extract_text()
-                    
-                    if not text and self.use_ocr:
-                        # 更新状态
-                        self.progress_updated.emit(file_data["name"], page_idx, total_pages)
-                        self.status_updated.emit(file_data, f"OCR识别中 {page_idx}/{total_pages}")
-                        self.logger.info(f"开始OCR识别 {pdf_path} 第 {page_idx} 页")
-                        
-                        try:
-                            temp_image_path = os.path.join(
-                                self.temp_dir, 
-                                f"temp_{uuid.uuid4().hex}.png"
-                            )
-                            
-                            img = page.to_image(resolution=300)
-                            img.save(temp_image_path)
-                            
-                            with Image.open(temp_image_path) as img:
-                                text = self.ocr_image(img) or ''
-                        finally:
-                            try:
-                                if os.path.exists(temp_image_path):
-                                    os.remove(temp_image_path)
-                            except:
-                                pass
-                    
-                    if text:
-                        f.write(text)
-                    
-                    # 更新状态
-                    self.progress_updated.emit(file_data["name"], page_idx, total_pages)
-                    self.status_updated.emit(file_data, f"转换中 {page_idx}/{total_pages}")
-        
-        return True
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        file_data = self.files[index.row()]
+        column = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == self.COLUMN_NAME:
+                return file_data["name"]
+            if column == self.COLUMN_SIZE:
+                return file_data["size"]
+            if column == self.COLUMN_PAGES:
+                return file_data["pages"]
+            if column == self.COLUMN_STATUS:
+                return file_data["status"]
+            if column == self.COLUMN_LOCATION:
+                return "打开位置"
+            if column == self.COLUMN_DELETE:
+                return "删除文件"
+        elif role == Qt.ItemDataRole.ToolTipRole and column == self.COLUMN_NAME:
+            return file_data["path"]
+        return None
 
-    def run(self):
-        try:
-            for idx, file_data in enumerate(self.files):
-                if not self.running:
-                    break
-                
-                try:
-                    success = self.convert_single_file(file_data)
-                    if success:
-                        self.file_completed.emit(file_data, True)
-                    else:
-                        self.file_completed.emit(file_data, False)
-                except Exception as e:
-                    self.logger.error(f"转换失败: {str(e)}")
-                    self.file_completed.emit(file_data, False)
-        finally:
-            self.conversion_completed.emit()
+    def flags(self, index):
+        flags = super().flags(index)
+        # 转换完成前“打开位置”不可用
+        if index.column() == self.COLUMN_LOCATION and index.isValid() \
+                and self.files[index.row()]["status"] != "已完成":
+            flags &= ~Qt.ItemFlag.ItemIsEnabled
+        return flags
+
+    def add_files(self, batch: List[Dict]):
+        """在末尾追加一批文件"""
+        if not batch:
+            return
+        first = len(self.files)
+        self.beginInsertRows(QModelIndex(), first, first + len(batch) - 1)
+        for offset, file_data in enumerate(batch):
+            file_data["id"] = self._next_id
+            self._next_id += 1
+            if self._rows is not None:
+                self._rows[file_data["id"]] = first + offset
+            self.files.append(file_data)
+        self.endInsertRows()
+
+    def row_of(self, file_data: Dict) -> Optional[int]:
+        """文件所在的行，已删除时返回 None"""
+        if self._rows is None:
+            self._rows = {f["id"]: row for row, f in enumerate(self.files)}
+        return self._rows.get(file_data.get("id"))
+
+    def file_at(self, row: int) -> Dict:
+        return self.files[row]
+
+    def remove_file(self, file_data: Dict):
+        row = self.row_of(file_data)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.files[row]
+        # 后面各行的行号都变了，连续删除时只在下次查找时重建一次
+        self._rows = None
+        self.endRemoveRows()
+
+    def update_files(self, files: List[Dict]):
+        """文件状态变化后通知视图，一批更新合并为一次刷新"""
+        rows = [row for row in (self.row_of(f) for f in files) if row is not None]
+        if rows:
+            self.dataChanged.emit(
+                self.index(min(rows), self.COLUMN_STATUS),
+                self.index(max(rows), self.COLUMN_LOCATION)
+            )
+
+
+class ButtonDelegate(QStyledItemDelegate):
+    """在单元格中绘制按钮，代替每行一个 QPushButton 控件"""
+    clicked = pyqtSignal(int)  # 行号
+
+    def __init__(self, color, hover_color, parent=None):
+        super().__init__(parent)
+        self.color = QColor(color)
+        self.hover_color = QColor(hover_color)
+        self.disabled_color = QColor("#BDBDBD")
+
+    def button_rect(self, rect):
+        return rect.adjusted(6, 5, -6, -5)
+
+    def paint(self, painter, option, index):
+        enabled = bool(index.flags() & Qt.ItemFlag.ItemIsEnabled)
+        if not enabled:
+            color = self.disabled_color
+        elif option.state & QStyle.StateFlag.State_MouseOver:
+            color = self.hover_color
+        else:
+            color = self.color
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(color)
+        rect = self.button_rect(option.rect)
+        painter.drawRoundedRect(rect, 4, 4)
+        font = QFont(option.font)
+        font.setPixelSize(12)
+        font.setBold(True)
+        painter.setFont(font)
+        painter.setPen(QColor("white"))
+        painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, index.data())
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.Type.MouseButtonRelease \
+                and event.button() == Qt.MouseButton.LeftButton \
+                and index.flags() & Qt.ItemFlag.ItemIsEnabled \
+                and self.button_rect(option.rect).contains(event.position().toPoint()):
+            self.clicked.emit(index.row())
+            return True
+        return super().editorEvent(event, model, option, index)
 
-    def stop(self):
-        self.running = False
 
 class PDFConverterGUI(QMainWindow):
-    def __init__(self):
+    def __init__(self, startup: Optional[StartupTimer] = None):
         super().__init__()
+        # 启动耗时报告，不需要时为 None
+        self.startup = startup
         self.setWindowTitle("PDF 转换工具")
         self.setMinimumSize(900, 600)
         
@@ -135,25 +291,28 @@ class PDFConverterGUI(QMainWindow):
         self.setStyle(QStyleFactory.create("Fusion"))
         self.apply_material_style()
         
-        # 文件记录
-        self.files_data: List[Dict] = []
-        
-        # 创建临时目录
-        self.temp_dir = os.path.join(os.path.expanduser('~'), '.pdf_converter_temp')
-        if not os.path.exists(self.temp_dir):
-            os.makedirs(self.temp_dir)
+        # 路径键 -> file_data，用于去重；正在后台读取的文件也先占位
+        self.file_index: Dict[str, Dict] = {}
+        self.register_workers: List[RegisterWorker] = []
             
         # 设置日志
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger('PDFConverter')
         
-        # 检查Tesseract
-        self.check_tesseract()
-        
         # 创建界面
         self.init_ui()
+
+        # 在后台检查Tesseract，结果出来之前窗口照常显示；None 表示尚未检查完
+        self.tesseract_path = None
+        self.tesseract_worker = TesseractCheckWorker()
+        self.tesseract_worker.checked.connect(self.handle_tesseract_checked)
+        self.tesseract_worker.start()
         
         self.worker = None
+        self.page_cache = None
+        self.journal = None
+        # 最近一次转换的各阶段耗时统计
+        self.last_metrics = None
         
     def apply_material_style(self):
         """应用Material Design样式"""
@@ -181,13 +340,13 @@ class PDFConverterGUI(QMainWindow):
             QPushButton:disabled {
                 background: #BDBDBD;
             }
-            QTableWidget {
+            QTableView {
                 background: white;
                 border: 1px solid #E0E0E0;
                 border-radius: 4px;
                 gridline-color: #F5F5F5;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 8px;
             }
             QHeaderView::section {
@@ -268,6 +427,23 @@ class PDFConverterGUI(QMainWindow):
         button_layout.addWidget(self.select_btn)
         button_layout.addWidget(self.convert_btn)
         button_layout.addWidget(self.ocr_checkbox)
+
+        # 文本提取方式
+        self.backend_combo = QComboBox()
+        self.backend_combo.addItem("版面优先", BACKEND_PDFPLUMBER)
+        self.backend_combo.addItem("速度优先", BACKEND_PDFIUM)
+        self.backend_combo.addItem("自动", BACKEND_AUTO)
+        self.backend_combo.setToolTip("版面优先保留分栏排版；速度优先适合只需要全文内容的场景")
+        button_layout.addWidget(self.backend_combo)
+
+        # 并行进程数
+        workers_label = QLabel("并行进程")
+        workers_label.setStyleSheet("color: #424242; font-size: 14px;")
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(1, max(os.cpu_count() or 1, 1) * 2)
+        self.workers_spin.setValue(os.cpu_count() or 1)
+        button_layout.addWidget(workers_label)
+        button_layout.addWidget(self.workers_spin)
         
         # 添加取消按钮（初始禁用）
         self.cancel_btn = QPushButton("取消转换")
@@ -282,31 +458,50 @@ class PDFConverterGUI(QMainWindow):
         """)
         self.cancel_btn.clicked.connect(self.cancel_conversion)
         button_layout.addWidget(self.cancel_btn)
+
+        # 查看最近一次转换的耗时统计
+        self.stats_btn = QPushButton("耗时统计")
+        self.stats_btn.setEnabled(False)
+        self.stats_btn.clicked.connect(self.show_metrics)
+        button_layout.addWidget(self.stats_btn)
         
         toolbar_layout.addWidget(button_widget)
         toolbar_layout.addStretch()
         layout.addWidget(toolbar)
         
         # 文件表格
-        self.table = QTableWidget()
-        self.table.setColumnCount(6)  # 增加一列用于打开文件位置
-        self.table.setHorizontalHeaderLabels(["文件名", "大小", "页数", "状态", "打开位置", "操作"])
+        self.model = FileTableModel(self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
         
         # 设置表格样式
         self.table.setShowGrid(False)  # 隐藏网格线
         self.table.setAlternatingRowColors(True)  # 交替行颜色
+        self.table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.table.setMouseTracking(True)  # 按钮悬停效果
         self.table.setStyleSheet(self.table.styleSheet() + """
-            QTableWidget {
+            QTableView {
                 alternate-background-color: #FAFAFA;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background: #E3F2FD;
                 color: #212121;
             }
         """)
+
+        # 操作列用委托绘制按钮
+        self.location_delegate = ButtonDelegate("#2196F3", "#1976D2", self.table)
+        self.location_delegate.clicked.connect(
+            lambda row: self.open_file_location(self.model.file_at(row))
+        )
+        self.table.setItemDelegateForColumn(FileTableModel.COLUMN_LOCATION, self.location_delegate)
+        self.delete_delegate = ButtonDelegate("#F44336", "#D32F2F", self.table)
+        self.delete_delegate.clicked.connect(lambda row: self.remove_file(self.model.file_at(row)))
+        self.table.setItemDelegateForColumn(FileTableModel.COLUMN_DELETE, self.delete_delegate)
         
-        # 设置列宽
+        # 设置列宽，固定行高，视图无需逐行计算高度
         self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
         self.table.verticalHeader().setDefaultSectionSize(50)  # 增加行高
         column_widths = [0, 100, 80, 100, 120, 120]  # 第一列自适应(Stretch)
         for i, width in enumerate(column_widths[1:], 1):
@@ -325,76 +520,26 @@ class PDFConverterGUI(QMainWindow):
         self.progress.setMaximumHeight(10)
         self.progress.setTextVisible(False)
         self.statusBar.addPermanentWidget(self.progress)
+
+        # 转换期间按固定频率刷新进度
+        self.progress_timer = QTimer(self)
+        self.progress_timer.setInterval(int(PROGRESS_INTERVAL * 1000))
+        self.progress_timer.timeout.connect(self.refresh_progress)
         
         self.statusBar.showMessage("就绪")
 
         # 绑定事件
         self.select_btn.clicked.connect(self.select_files)
         self.convert_btn.clicked.connect(self.start_conversion)
+        self.ocr_checkbox.toggled.connect(self.handle_ocr_toggled)
         
-    def add_file_to_table(self, file_data: Dict):
-        """添加文件到表格"""
-        row = self.table.rowCount()
-        self.table.insertRow(row)
-        
-        # 文件名
-        name_item = QTableWidgetItem(file_data["name"])
-        name_item.setToolTip(file_data["path"])
-        self.table.setItem(row, 0, name_item)
-        
-        # 大小
-        self.table.setItem(row, 1, QTableWidgetItem(file_data["size"]))
-        # 页数
-        self.table.setItem(row, 2, QTableWidgetItem(file_data["pages"]))
-        # 状态
-        status_item = QTableWidgetItem(file_data["status"])
-        self.table.setItem(row, 3, status_item)
-        file_data["status_item"] = status_item
-        
-        # 打开位置按钮(初始禁用)
-        open_location_btn = QPushButton("打开位置")
-        open_location_btn.setEnabled(False)
-        open_location_btn.setMinimumHeight(40)
-        open_location_btn.setStyleSheet("""
-            QPushButton {
-                font-size: 12px;
-                padding: 5px 10px;
-            }
-        """)
-        # 修改这里，使用output_path而不是path
-        open_location_btn.clicked.connect(lambda: self.open_file_location(file_data))
-        self.table.setCellWidget(row, 4, open_location_btn)
-        file_data["location_btn"] = open_location_btn
-        
-        # 删除按钮
-        delete_btn = QPushButton("删除文件")
-        delete_btn.setMinimumHeight(40)
-        delete_btn.setStyleSheet("""
-            QPushButton {
-                background: #F44336;
-                font-size: 12px;
-                padding: 5px 10px;
-            }
-            QPushButton:hover {
-                background: #D32F2F;
-            }
-        """)
-        delete_btn.clicked.connect(lambda: self.remove_file(row, file_data))
-        self.table.setCellWidget(row, 5, delete_btn)
-        
-        file_data["row"] = row
-        
-    def remove_file(self, row: int, file_data: Dict):
-        """从表格中移除文件"""
-        self.table.removeRow(row)
-        self.files_data.remove(file_data)
-        # 更新其他文件的行索引
-        for f in self.files_data:
-            if f["row"] > row:
-                f["row"] -= 1
+    def remove_file(self, file_data: Dict):
+        """从列表中移除文件"""
+        self.model.remove_file(file_data)
+        self.file_index.pop(path_key(file_data["path"]), None)
                 
     def select_files(self):
-        """选择PDF文件"""
+        """选择PDF文件，页数在后台读取，读到后再加入表格"""
         files, _ = QFileDialog.getOpenFileNames(
             self,
             "选择PDF文件",
@@ -402,145 +547,206 @@ class PDFConverterGUI(QMainWindow):
             "PDF文件 (*.pdf)"
         )
         
+        paths = []
         for path in files:
-            if any(f["path"] == path for f in self.files_data):
+            key = path_key(path)
+            if key in self.file_index:
                 continue
-                
-            try:
-                with pdfplumber.open(path) as pdf:
-                    file_data = {
-                        "path": path,
-                        "name": os.path.basename(path),
-                        "size": f"{os.path.getsize(path) / 1024 / 1024:.1f} MB",
-                        "pages": str(len(pdf.pages)),
-                        "status": "待转换"
-                    }
-                    self.files_data.append(file_data)
-                    self.add_file_to_table(file_data)
-            except Exception as e:
-                QMessageBox.critical(self, "错误", f"无法读取文件 {path}:\n{str(e)}")
-                
-    def check_tesseract(self):
-        """检查Tesseract是否可用"""
-        if not shutil.which('tesseract'):
-            # 尝试设置Windows下的默认路径
-            if sys.platform == "win32":
-                if os.path.exists('C:\\Program Files\\Tesseract-OCR\\tesseract.exe'):
-                    pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-                elif os.path.exists('C:\\Program Files (x86)\\Tesseract-OCR\\tesseract.exe'):
-                    pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe'
-                else:
-                    QMessageBox.warning(self, "警告", "未检测到Tesseract-OCR，OCR功能可能无法使用。\n请安装Tesseract-OCR后重试。")
-                    self.logger.warning("Tesseract not found")
-                    return False
-        return True
-
-    def preprocess_image(self, image):
-        """预处理图片以提高OCR识别率"""
-        # 转换为灰度图
-        image = image.convert('L')
-        
-        # 增加对比度
-        enhancer = ImageEnhance.Contrast(image)
-        image = enhancer.enhance(2.0)
-        
-        # 调整亮度
-        enhancer = ImageEnhance.Brightness(image)
-        image = enhancer.enhance(1.5)
-        
-        return image
+            self.file_index[key] = None
+            paths.append(path)
+        if not paths:
+            return
 
-    def ocr_image(self, image):
-        """对图片进行OCR识别"""
-        try:
-            # 预处理图片
-            processed_image = self.preprocess_image(image)
-            
-            # 进行OCR识别
-            text = pytesseract.image_to_string(processed_image, lang='chi_sim+eng')
-            
-            if not text.strip():
-                self.logger.warning("OCR结果为空")
-                return None
-                
-            return text
-            
-        except Exception as e:
-            self.logger.error(f"OCR识别错误: {str(e)}")
-            QMessageBox.warning(self, "OCR警告", f"OCR识别出现错误：{str(e)}\n如果是tesseract错误，请确认已正确安装Tesseract-OCR")
-            return None
+        worker = RegisterWorker(paths)
+        worker.files_registered.connect(self.handle_files_registered)
+        worker.registration_completed.connect(
+            lambda failed: self.handle_registration_completed(paths, failed)
+        )
+        # registration_completed 在 run() 返回前发出，线程真正结束后才能释放
+        worker.finished.connect(lambda: self.handle_register_worker_finished(worker))
+        self.register_workers.append(worker)
+        self.statusBar.showMessage(f"正在读取 {len(paths)} 个文件…")
+        worker.start()
 
-    def cleanup_temp_files(self):
-        """清理临时文件"""
-        try:
-            for file in os.listdir(self.temp_dir):
-                try:
-                    os.remove(os.path.join(self.temp_dir, file))
-                except:
-                    pass
-        except:
-            pass
+    def handle_files_registered(self, batch):
+        """把后台读取完的一批文件加入表格"""
+        added = []
+        for file_data in batch:
+            key = path_key(file_data["path"])
+            # 读取期间被移出列表的文件不再加入
+            if key not in self.file_index or self.file_index[key] is not None:
+                continue
+            self.file_index[key] = file_data
+            added.append(file_data)
+        self.model.add_files(added)
+        self.statusBar.showMessage(f"已添加 {self.model.rowCount()} 个文件")
+
+    def handle_registration_completed(self, paths, failed):
+        """后台读取结束，汇总无法读取的文件"""
+        # 读取失败或被中断的文件释放占位，之后可以重新添加
+        for path in paths:
+            key = path_key(path)
+            if self.file_index.get(key, False) is None:
+                del self.file_index[key]
+        if failed:
+            details = "\n".join(f"{path}: {error}" for path, error in failed[:10])
+            if len(failed) > 10:
+                details += f"\n……共 {len(failed)} 个文件"
+            QMessageBox.critical(self, "错误", f"无法读取以下文件:\n{details}")
+
+    def handle_register_worker_finished(self, worker):
+        """读取线程已经结束，移出列表并释放"""
+        if worker in self.register_workers:
+            self.register_workers.remove(worker)
+        worker.deleteLater()
+
+    def closeEvent(self, event):
+        """关闭窗口前停止后台读取"""
+        for worker in self.register_workers:
+            worker.requestInterruption()
+        for worker in self.register_workers:
+            worker.wait()
+        self.tesseract_worker.wait()
+        super().closeEvent(event)
+
+    def handle_tesseract_checked(self, path):
+        """后台检查Tesseract完成；找不到时提示，启用了OCR才弹出警告"""
+        self.tesseract_path = path
+        if self.startup is not None:
+            self.startup.mark("检查Tesseract")
+        if not path:
+            self.logger.warning("Tesseract not found")
+            self.statusBar.showMessage("未检测到Tesseract-OCR，OCR功能不可用")
+            if self.ocr_checkbox.isChecked():
+                self.warn_tesseract_missing()
+
+    def handle_ocr_toggled(self, checked):
+        if checked and self.tesseract_path == '':
+            self.warn_tesseract_missing()
+
+    def warn_tesseract_missing(self):
+        QMessageBox.warning(self, "警告", "未检测到Tesseract-OCR，OCR功能可能无法使用。\n请安装Tesseract-OCR后重试。")
 
     def start_conversion(self):
         """开始转换所有文件"""
-        if not self.files_data:
+        if not self.model.files:
             QMessageBox.information(self, "提示", "请先添加需要转换的文件")
             return
             
-        unconverted_files = [f for f in self.files_data if f["status"] == "待转换"]
+        # 失败或取消的文件重新转换时从中断处续传
+        unconverted_files = [f for f in self.model.files if f["status"] != "已完成"]
         if not unconverted_files:
             QMessageBox.information(self, "提示", "没有需要转换的文件")
             return
+        # 上一次的错误信息不带到这一次，取消与失败按本次的结果区分
+        for file_data in unconverted_files:
+            file_data.pop("error", None)
         
         # 禁用相关按钮
         self.select_btn.setEnabled(False)
         self.convert_btn.setEnabled(False)
         self.cancel_btn.setEnabled(True)
         
+        # 页面缓存和任务日志在第一次转换时再准备
+        from pdf_converter import JobJournal, PageCache
+
+        if self.page_cache is None:
+            try:
+                self.page_cache = PageCache()
+            except Exception as e:
+                self.logger.warning(f"无法打开页面缓存: {str(e)}")
+        if self.journal is None:
+            try:
+                self.journal = JobJournal()
+            except Exception as e:
+                self.logger.warning(f"无法打开任务日志: {str(e)}")
+        
         # 创建并启动工作线程
         self.worker = ConvertWorker(
             unconverted_files,
             self.ocr_checkbox.isChecked(),
-            self.temp_dir,
-            self.logger
+            self.logger,
+            self.workers_spin.value(),
+            self.page_cache,
+            self.backend_combo.currentData(),
+            self.journal
         )
-        self.worker.progress_updated.connect(self.update_conversion_progress)
-        self.worker.status_updated.connect(self.update_file_status)
-        self.worker.file_completed.connect(self.handle_file_completed)
         self.worker.conversion_completed.connect(self.handle_conversion_completed)
         self.worker.start()
+        self.progress_timer.start()
 
     def cancel_conversion(self):
-        """取消转换"""
+        """取消转换；工作线程退出后由 conversion_completed 信号收尾"""
         if self.worker and self.worker.isRunning():
             self.worker.stop()
-            self.worker.wait()
-            self.statusBar.showMessage("转换已取消")
-            self.handle_conversion_completed()
+            self.cancel_btn.setEnabled(False)
+            self.statusBar.showMessage("正在取消转换...")
 
-    def update_conversion_progress(self, filename, current_page, total_pages):
-        """更新转换进度"""
-        self.statusBar.showMessage(f"正在转换: {filename} ({current_page}/{total_pages})")
+    def refresh_progress(self):
+        """取转换进度的快照，刷新有变化的行、进度条和状态栏"""
+        if self.worker is None:
+            return
+        snapshot = self.worker.progress.snapshot()
+        files = []
+        for file_data, done, total, result in snapshot["files"]:
+            if result is None:
+                file_data["status"] = f"转换中 {done}/{total}"
+            elif result:
+                file_data["status"] = "已完成"
+            elif file_data.get("error") == "已取消":
+                # 取消时还没开始转换的文件保持待转换，转换了一部分的下次从中断处续传
+                file_data["status"] = "已取消" if done else "待转换"
+            else:
+                file_data["status"] = "失败"
+            files.append(file_data)
+        if files:
+            self.model.update_files(files)
 
-    def handle_file_completed(self, file_data, success):
-        """处理单个文件转换完成"""
-        file_data["status_item"].setText("已完成" if success else "失败")
-        if success:
-            file_data["location_btn"].setEnabled(True)
+        done_pages, total_pages = snapshot["done_pages"], snapshot["total_pages"]
+        self.progress.setMaximum(max(total_pages, 1))
+        self.progress.setValue(min(done_pages, total_pages))
+        summary = f"总进度 {done_pages}/{total_pages} 页"
+        if snapshot["rate"] > 0:
+            summary += f"，{snapshot['rate']:.1f} 页/秒"
+        if snapshot["eta"] is not None:
+            summary += f"，剩余约 {format_duration(snapshot['eta'])}"
+        self.progress.setToolTip(
+            f"{summary}\n已完成 {snapshot['files_done']}/{snapshot['files_total']} 个文件，"
+            f"已用时 {format_duration(snapshot['elapsed'])}"
+        )
+        current = snapshot["current"]
+        if current is not None and current[3] is None:
+            self.statusBar.showMessage(
+                f"正在转换: {current[0]['name']} ({current[1]}/{current[2]}) | {summary}"
+            )
 
-    def handle_conversion_completed(self):
-        """处理所有文件转换完成"""
+    def handle_conversion_completed(self, cancelled=False):
+        """处理所有文件转换完成或取消"""
         # 恢复按钮状态
         self.select_btn.setEnabled(True)
         self.convert_btn.setEnabled(True)
         self.cancel_btn.setEnabled(False)
+        # 送出最后一次快照中的状态再停止刷新
+        self.refresh_progress()
+        self.progress_timer.stop()
         self.progress.setValue(0)
-        self.statusBar.showMessage("转换完成")
+        self.progress.setToolTip("")
+        title = "转换已取消" if cancelled else "转换完成"
+        self.statusBar.showMessage(title)
+        if self.worker is not None:
+            self.worker.wait()
+            self.last_metrics = self.worker.engine.metrics
+            counters = self.last_metrics.snapshot()["counters"]
+            pages = counters.get("pages_extracted", 0) + counters.get("cache_hit_pages", 0)
+            self.statusBar.showMessage(f"{title}，共处理 {pages:g} 页")
+            self.stats_btn.setEnabled(True)
         self.worker = None
 
-    def update_file_status(self, file_data, status_text):
-        """更新文件状态"""
-        file_data["status_item"].setText(status_text)
+    def show_metrics(self):
+        """显示最近一次转换各阶段的耗时"""
+        if self.last_metrics is None:
+            return
+        QMessageBox.information(self, "耗时统计", self.last_metrics.summary() or "没有统计数据")
 
     def open_file_location(self, file_data):
         """打开文件所在位置"""
@@ -556,7 +762,31 @@ class PDFConverterGUI(QMainWindow):
         else:  # Linux
             subprocess.run(['xdg-open', os.path.dirname(output_path)], check=False)
 
+def print_startup_report(window, startup):
+    """窗口显示并进入事件循环后，等待Tesseract检查结束，打印各阶段耗时并退出"""
+    startup.mark("进入事件循环")
+    window.tesseract_worker.wait()
+    QApplication.processEvents()
+    print(startup.format(), flush=True)
+    QApplication.quit()
+
+
 if __name__ == "__main__":
+    # 打包为可执行文件时子进程需要此调用
+    multiprocessing.freeze_support()
+
+    startup = None
+    if STARTUP_REPORT_FLAG in sys.argv:
+        if 'importtime' not in sys._xoptions:
+            # 在 -X importtime 下重新运行本程序，同时得到各阶段耗时和模块导入耗时
+            phases, report = import_report([os.path.abspath(__file__)] + sys.argv[1:])
+            print(phases)
+            print(report)
+            sys.exit(0)
+        sys.argv.remove(STARTUP_REPORT_FLAG)
+        startup = StartupTimer(STARTED)
+        startup.mark("导入模块")
+
     # 设置环境变量
     os.environ["QT_ENABLE_HIGHDPI_SCALING"] = "1"
     os.environ["QT_AUTO_SCREEN_SCALE_FACTOR"] = "1"
@@ -576,7 +806,14 @@ if __name__ == "__main__":
     
     # 设置样式
     app.setStyle('Fusion')
+    if startup is not None:
+        startup.mark("创建QApplication")
     
-    window = PDFConverterGUI()
+    window = PDFConverterGUI(startup)
+    if startup is not None:
+        startup.mark("创建主窗口")
     window.show()
+    if startup is not None:
+        startup.mark("显示窗口")
+        QTimer.singleShot(0, lambda: print_startup_report(window, startup))
     sys.exit(app.exec())
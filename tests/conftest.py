@@ -0,0 +1,66 @@
+import os
+import sys
+import zlib
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SAMPLE_PAGES = 12
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4，单位为点
+
+
+def _escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def build_pdf(path, pages, columns=1):
+    """写出每页为若干行拉丁文字的PDF，pages 为每页的行列表，空列表为空白页
+
+    columns 为 2 时每页的行前一半排在左栏，后一半排在右栏。
+    """
+    objects = [b'<< /Type /Catalog /Pages 2 0 R >>', None,
+               b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>']
+    kids = []
+    for lines in pages:
+        per_column = -(-len(lines) // columns) if lines else 0
+        text = b''
+        for column in range(columns):
+            body = b''.join(b'(%s) Tj T* ' % _escape(line).encode('latin-1')
+                            for line in lines[column * per_column:(column + 1) * per_column])
+            x = 50 + column * PAGE_WIDTH // columns
+            text += b'BT /F1 11 Tf 14 TL %d 800 Td ' % x + body + b'ET '
+        content = zlib.compress(text)
+        objects.append(b'<< /Filter /FlateDecode /Length %d >>\nstream\n' % len(content)
+                       + content + b'\nendstream')
+        objects.append(b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] '
+                       b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>'
+                       % (PAGE_WIDTH, PAGE_HEIGHT, len(objects)))
+        kids.append(len(objects))
+    objects[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+        b' '.join(b'%d 0 R' % kid for kid in kids), len(kids))
+    with open(path, 'wb') as f:
+        f.write(b'%PDF-1.4\n')
+        offsets = []
+        for number, body in enumerate(objects, 1):
+            offsets.append(f.tell())
+            f.write(b'%d 0 obj\n' % number + body + b'\nendobj\n')
+        xref = f.tell()
+        f.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b'%010d 00000 n \n' % offset)
+        f.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref))
+    return str(path)
+
+
+def sample_lines(page, count=10):
+    """第 page 页的文字，每页内容不同"""
+    return [f'page {page + 1} line {line + 1} lorem ipsum dolor sit amet' for line in range(count)]
+
+
+@pytest.fixture(scope='session')
+def sample_pdf(tmp_path_factory):
+    """SAMPLE_PAGES 页的纯文本PDF"""
+    path = tmp_path_factory.mktemp('pdf') / 'sample.pdf'
+    return build_pdf(path, [sample_lines(page) for page in range(SAMPLE_PAGES)])
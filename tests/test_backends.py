@@ -0,0 +1,44 @@
+import pytest
+
+from pdf_converter.backends import (
+    BACKEND_AUTO, BACKEND_PDFIUM, BACKEND_PDFPLUMBER, open_with_backend, resolve_backend,
+)
+
+from conftest import SAMPLE_PAGES, build_pdf
+
+pytest.importorskip('pypdfium2')
+
+
+@pytest.mark.parametrize('backend', [BACKEND_PDFPLUMBER, BACKEND_PDFIUM])
+def test_backends_agree_on_pages_and_text(sample_pdf, backend):
+    document = open_with_backend(sample_pdf, backend)
+    try:
+        assert len(document) == SAMPLE_PAGES
+        for index in range(SAMPLE_PAGES):
+            text = document.extract_text(index)
+            assert f'page {index + 1} line 1 lorem ipsum' in text
+            assert f'page {index + 1} line 10' in text
+    finally:
+        document.close()
+
+
+def test_auto_chooses_by_layout(sample_pdf, tmp_path):
+    columns = build_pdf(tmp_path / 'columns.pdf',
+                        [[f'{page + 1}-{line + 1} lorem ipsum' for line in range(20)] for page in range(4)],
+                        columns=2)
+    assert resolve_backend(BACKEND_AUTO, sample_pdf) == BACKEND_PDFIUM
+    assert resolve_backend(BACKEND_AUTO, columns) == BACKEND_PDFPLUMBER
+    # 没有文档可看时只按是否安装了 pypdfium2
+    assert resolve_backend(BACKEND_AUTO) == BACKEND_PDFIUM
+    assert resolve_backend(BACKEND_PDFPLUMBER, columns) == BACKEND_PDFPLUMBER
+
+
+def test_auto_leaves_unreadable_file_to_conversion(tmp_path):
+    path = tmp_path / 'bad.pdf'
+    path.write_bytes(b'not a pdf')
+    assert resolve_backend(BACKEND_AUTO, str(path)) == BACKEND_PDFIUM
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        resolve_backend('nope')
@@ -0,0 +1,50 @@
+from pdf_converter.cache import PageCache
+from pdf_converter.engine import cacheable_pages
+
+
+def _cache(tmp_path, max_size=1024 * 1024):
+    return PageCache(str(tmp_path / 'cache'), max_size)
+
+
+def test_hit_and_miss(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put_pages('doc', 'backend=pdfium;ocr=off', [(0, 'a'), (2, 'c')])
+    assert cache.get_pages('doc', 'backend=pdfium;ocr=off') == {0: 'a', 2: 'c'}
+    # 参数或文档不同都不命中
+    assert cache.get_pages('doc', 'backend=pdfplumber;ocr=off') == {}
+    assert cache.get_pages('other', 'backend=pdfium;ocr=off') == {}
+    cache.close()
+
+
+def test_replace_does_not_double_count(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put_pages('doc', 's', [(0, 'x' * 100), (1, 'y' * 50)])
+    cache.put_pages('doc', 's', [(0, 'z' * 10)])
+    assert cache.total_size == cache._query_total_size() == 60
+    assert cache.get_pages('doc', 's') == {0: 'z' * 10, 1: 'y' * 50}
+    cache.close()
+
+
+def test_evicts_least_recently_used(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr('pdf_converter.cache.time.time', lambda: clock[0])
+    cache = _cache(tmp_path, max_size=250)
+    for doc in ('old', 'used', 'new'):
+        cache.put_pages(doc, 's', [(0, doc[0] * 100)])
+        clock[0] += 1
+    # 读取过的文档变为最近使用，下次先淘汰没有读取过的
+    cache.get_pages('used', 's')
+    clock[0] += 1
+    assert cache.get_pages('old', 's') == {}
+    cache.put_pages('newest', 's', [(0, 'n' * 100)])
+    assert cache.get_pages('new', 's') == {}
+    assert set(cache.get_pages('used', 's')) == {0}
+    assert set(cache.get_pages('newest', 's')) == {0}
+    assert cache.total_size == cache._query_total_size() == 200
+    cache.close()
+
+
+def test_cacheable_pages_skips_failed_ocr():
+    details = [{"method": "text"}, {"method": "ocr", "ocr_failed": True}, {"method": "ocr"}]
+    assert list(cacheable_pages(5, ['a', '', 'c'], details)) == [(5, 'a'), (7, 'c')]
+    assert list(cacheable_pages(0, ['a', 'b'])) == [(0, 'a'), (1, 'b')]
@@ -0,0 +1,163 @@
+import threading
+import time
+
+import pytest
+
+from pdf_converter.distributed import TASK_DONE, TASK_FAILED, Coordinator, RedisTaskQueue, SqliteTaskQueue
+
+
+def _queue(tmp_path):
+    return SqliteTaskQueue(str(tmp_path / 'tasks.sqlite3'))
+
+
+def test_lease_in_order_and_complete(tmp_path):
+    queue = _queue(tmp_path)
+    first = queue.put('batch', {"n": 1})
+    second = queue.put('batch', {"n": 2})
+    assert queue.lease('w1') == (first, {"n": 1})
+    assert queue.lease('w2') == (second, {"n": 2})
+    assert queue.lease('w3') is None
+
+    assert queue.complete(first, 'w1', {"texts": ['a']})
+    # 不是租用者不能提交
+    assert not queue.complete(second, 'w1', {"texts": ['b']})
+    assert queue.finished('batch') == [(first, TASK_DONE, {"texts": ['a']}, None)]
+    assert queue.finished('batch') == []
+    queue.close()
+
+
+def test_heartbeat_extends_only_own_lease(tmp_path):
+    queue = _queue(tmp_path)
+    task_id = queue.put('batch', {})
+    queue.lease('w1', lease_seconds=0.2)
+    assert queue.heartbeat(task_id, 'w1', lease_seconds=60)
+    assert not queue.heartbeat(task_id, 'w2')
+    time.sleep(0.3)
+    # 续租后没有过期，不会被其他工作进程租到
+    assert queue.lease('w2') is None
+    queue.close()
+
+
+def test_expired_lease_is_requeued_then_fails(tmp_path):
+    queue = _queue(tmp_path)
+    task_id = queue.put('batch', {"n": 1}, max_attempts=2)
+    queue.lease('w1', lease_seconds=0.05)
+    time.sleep(0.1)
+    assert queue.lease('w2', lease_seconds=0.05) == (task_id, {"n": 1})
+    # 过期的租用者不能再续租或提交
+    assert not queue.heartbeat(task_id, 'w1')
+    assert not queue.complete(task_id, 'w1', {})
+    time.sleep(0.1)
+    # 第二次过期时已达到最大尝试次数
+    assert queue.lease('w3') is None
+    assert queue.finished('batch') == [(task_id, TASK_FAILED, None, '租约过期')]
+    queue.close()
+
+
+def test_fail_and_release(tmp_path):
+    queue = _queue(tmp_path)
+    task_id = queue.put('batch', {}, max_attempts=1)
+    queue.lease('w1')
+    queue.release(task_id, 'w1')
+    # 归还不计入尝试次数
+    assert queue.lease('w2') == (task_id, {})
+    assert queue.fail(task_id, 'w2', 'boom')
+    assert queue.lease('w3') is None
+    assert queue.finished('batch') == [(task_id, TASK_FAILED, None, 'boom')]
+    queue.close()
+
+
+def test_cancel_removes_batch(tmp_path):
+    queue = _queue(tmp_path)
+    queue.put('a', {})
+    kept = queue.put('b', {})
+    queue.cancel('a')
+    assert queue.lease('w1') == (kept, {})
+    queue.close()
+
+
+def test_discard_removes_tasks(tmp_path):
+    queue = _queue(tmp_path)
+    leased = queue.put('batch', {"n": 1})
+    dropped = queue.put('batch', {"n": 2})
+    kept = queue.put('batch', {"n": 3})
+    queue.lease('w1')
+    queue.discard([leased, dropped])
+    # 租用中的任务被删除后无法提交
+    assert not queue.complete(leased, 'w1', {})
+    assert queue.lease('w2') == (kept, {"n": 3})
+    queue.close()
+
+
+def test_coordinator_discards_remaining_tasks_of_failed_file(tmp_path, sample_pdf):
+    queue = _queue(tmp_path)
+    coordinator = Coordinator(queue, pages_per_task=1, max_attempts=1, poll_interval=0.01)
+    failed = []
+
+    def worker():
+        while True:
+            task = queue.lease('w1')
+            if task is not None:
+                queue.fail(task[0], 'w1', 'boom')
+                return
+            time.sleep(0.01)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    files = [{"path": sample_pdf, "output_path": str(tmp_path / 'out.txt')}]
+    coordinator.convert(files, on_file_done=lambda file_data, success: failed.append(not success))
+    thread.join()
+    assert failed == [True]
+    assert files[0]["error"] == 'boom'
+    # 同一文件余下的页段已从队列中删除
+    assert queue.lease('w2') is None
+    queue.close()
+
+
+@pytest.fixture
+def redis_queue():
+    fakeredis = pytest.importorskip('fakeredis')
+    pytest.importorskip('lupa')
+    queue = RedisTaskQueue('redis://', client=fakeredis.FakeRedis())
+    yield queue
+    queue.close()
+
+
+def test_redis_lease_in_order_and_complete(redis_queue):
+    first = redis_queue.put('batch', {"n": 1})
+    second = redis_queue.put('batch', {"n": 2})
+    assert redis_queue.lease('w1') == (first, {"n": 1})
+    assert redis_queue.lease('w2') == (second, {"n": 2})
+    assert redis_queue.lease('w3') is None
+
+    assert redis_queue.complete(first, 'w1', {"texts": ['a']})
+    assert not redis_queue.complete(second, 'w1', {"texts": ['b']})
+    assert redis_queue.finished('batch') == [(first, TASK_DONE, {"texts": ['a']}, None)]
+    assert redis_queue.finished('batch') == []
+
+
+def test_redis_expired_lease_is_requeued_then_fails(redis_queue):
+    task_id = redis_queue.put('batch', {"n": 1}, max_attempts=2)
+    redis_queue.lease('w1', lease_seconds=0.05)
+    time.sleep(0.1)
+    assert redis_queue.lease('w2', lease_seconds=0.05) == (task_id, {"n": 1})
+    assert not redis_queue.heartbeat(task_id, 'w1')
+    assert not redis_queue.complete(task_id, 'w1', {})
+    time.sleep(0.1)
+    assert redis_queue.lease('w3') is None
+    assert redis_queue.finished('batch') == [(task_id, TASK_FAILED, None, '租约过期')]
+
+
+def test_redis_lease_skips_cancelled_and_discarded_tasks(redis_queue):
+    leased = redis_queue.put('a', {})
+    redis_queue.put('a', {})
+    dropped = redis_queue.put('b', {})
+    kept = redis_queue.put('b', {})
+    assert redis_queue.lease('w1') == (leased, {})
+    redis_queue.cancel('a')
+    redis_queue.discard([dropped])
+    # 租用中的任务随批次取消，无法续租或提交
+    assert not redis_queue.heartbeat(leased, 'w1')
+    assert not redis_queue.complete(leased, 'w1', {})
+    assert redis_queue.lease('w2') == (kept, {})
+    assert redis_queue.lease('w3') is None
@@ -0,0 +1,99 @@
+from pdf_converter import engine
+from pdf_converter.backends import BACKEND_AUTO
+from pdf_converter.engine import (
+    ConversionEngine, _FileState, convert_page_range, plan_ranges,
+)
+from pdf_converter.ocr import OCR_OFF
+
+from conftest import SAMPLE_PAGES
+
+
+def test_plan_ranges_splits_cached_and_uncached_pages():
+    cached = {2: 'c2', 3: 'c3', 7: 'c7'}
+    assert list(plan_ranges(10, cached, 3)) == [
+        (0, 2, None),
+        (2, 4, ['c2', 'c3']),
+        (4, 7, None),
+        (7, 8, ['c7']),
+        (8, 10, None),
+    ]
+
+
+def test_plan_ranges_limits_task_size_and_honours_start():
+    assert list(plan_ranges(7, {}, 3, start=1)) == [(1, 4, None), (4, 7, None)]
+    assert list(plan_ranges(3, {0: 'a', 1: 'b', 2: 'c'}, 1)) == [(0, 3, ['a', 'b', 'c'])]
+    assert list(plan_ranges(5, {}, 2, start=5)) == []
+
+
+def test_file_state_writes_out_of_order_ranges_in_page_order(tmp_path):
+    output = tmp_path / 'out.txt'
+    state = _FileState({"path": 'x.pdf', "output_path": str(output)}, 6)
+    progress = []
+
+    def on_page(file_data, done, total):
+        progress.append(done)
+
+    state.pending[4] = (['e', 'f'], None)
+    state.write_ready(on_page)
+    assert state.next_page == 0 and not state.writer.opened
+    state.pending[2] = (['c', 'd'], None)
+    state.write_ready(on_page)
+    assert state.next_page == 0
+    state.pending[0] = (['a', 'b'], None)
+    state.write_ready(on_page)
+    assert state.done and progress == [1, 2, 3, 4, 5, 6]
+    state.close(True)
+    assert output.read_text(encoding='utf-8') == 'abcdef'
+    assert not (tmp_path / 'out.txt.part').exists()
+
+
+def test_engine_reassembles_pages_in_order(sample_pdf, tmp_path):
+    expected = ''.join(convert_page_range(sample_pdf, 0, SAMPLE_PAGES, OCR_OFF, None, backend=BACKEND_AUTO))
+    file_data = {"path": sample_pdf, "output_path": str(tmp_path / 'sample.txt')}
+    done = []
+    engine = ConversionEngine(2, pages_per_task=1)
+    engine.convert([file_data], OCR_OFF, backend=BACKEND_AUTO,
+                   on_file_done=lambda data, success: done.append(success))
+    assert done == [True]
+    assert (tmp_path / 'sample.txt').read_text(encoding='utf-8') == expected
+
+
+def _memory_model(monkeypatch, growth, after_release=None):
+    """每处理一页常驻内存增加 growth，关闭文档后降到 after_release（None 时不变）；返回每次关闭时的内存"""
+    engine.release_document()
+    rss = [0]
+    releases = []
+    open_document = engine.open_document
+    release_document = engine.release_document
+
+    def fake_open(*args):
+        rss[0] += growth
+        return open_document(*args)
+
+    def fake_release():
+        if engine._document is None:
+            return
+        releases.append(rss[0])
+        if after_release is not None:
+            rss[0] = after_release
+        release_document()
+
+    monkeypatch.setattr(engine, 'open_document', fake_open)
+    monkeypatch.setattr(engine, 'release_document', fake_release)
+    monkeypatch.setattr(engine, 'current_rss', lambda: rss[0])
+    return releases
+
+
+def test_memory_limit_releases_document(monkeypatch, sample_pdf):
+    releases = _memory_model(monkeypatch, 400, after_release=100)
+    texts = convert_page_range(sample_pdf, 0, SAMPLE_PAGES, OCR_OFF, None, memory_limit=1000)
+    assert len(texts) == SAMPLE_PAGES and all(texts)
+    # 关闭后降到上限以下，每次超过上限都关闭
+    assert releases == [1200, 1300, 1300, 1300]
+
+
+def test_memory_limit_backs_off_when_release_does_not_help(monkeypatch, sample_pdf):
+    releases = _memory_model(monkeypatch, 200)
+    convert_page_range(sample_pdf, 0, SAMPLE_PAGES, OCR_OFF, None, memory_limit=1000)
+    # 关闭后仍超过上限，之后只在再增长上限的四分之一时才再次关闭，而不是每页都关闭
+    assert releases == [1200, 1600, 2000, 2400]
@@ -0,0 +1,92 @@
+import os
+import shutil
+import time
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+pytest.importorskip('PyQt6.QtWidgets')
+
+from PyQt6.QtCore import QEvent  # noqa: E402
+from PyQt6.QtWidgets import QApplication, QFileDialog, QMessageBox  # noqa: E402
+
+import pdf_to_txt  # noqa: E402
+
+
+@pytest.fixture
+def window(monkeypatch):
+    app = QApplication.instance() or QApplication([])
+    monkeypatch.setattr(QMessageBox, 'critical', lambda *args: None)
+    window = pdf_to_txt.PDFConverterGUI()
+    yield window
+    window.close()
+    window.tesseract_worker.wait()
+    app.processEvents()
+
+
+def _wait_registered(window, timeout=30):
+    deadline = time.monotonic() + timeout
+    while window.register_workers and time.monotonic() < deadline:
+        QApplication.processEvents()
+        # 立即执行 deleteLater，线程未结束就释放时在这里崩溃
+        QApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete)
+        time.sleep(0.01)
+    QApplication.processEvents()
+    assert not window.register_workers
+
+
+def test_register_files_repeatedly(window, monkeypatch, tmp_path, sample_pdf):
+    selected = []
+    monkeypatch.setattr(QFileDialog, 'getOpenFileNames', lambda *args: (selected, ''))
+    run = pdf_to_txt.RegisterWorker.run
+
+    def slow_exit(worker):
+        # 发出 registration_completed 之后线程还要运行一段时间
+        run(worker)
+        time.sleep(0.2)
+
+    monkeypatch.setattr(pdf_to_txt.RegisterWorker, 'run', slow_exit)
+    for round in range(5):
+        selected[:] = []
+        for index in range(3):
+            path = tmp_path / f'{round}-{index}.pdf'
+            shutil.copy(sample_pdf, path)
+            selected.append(str(path))
+        # 读取失败的文件释放占位
+        selected.append(str(tmp_path / f'{round}-missing.pdf'))
+        window.select_files()
+        # 上一轮的线程结束前再次添加
+        if round % 2:
+            continue
+        _wait_registered(window)
+    _wait_registered(window)
+    assert window.model.rowCount() == 15
+    assert all(file_data["pages"] == '12' for file_data in window.model.files)
+    assert sum(value is None for value in window.file_index.values()) == 0
+
+
+def test_cancelled_files_are_not_shown_as_failed(window):
+    from types import SimpleNamespace
+
+    from pdf_converter.progress import ProgressTracker
+
+    files = [{"path": f'/{name}.pdf', "name": f'{name}.pdf', "size": '', "pages": '10', "status": "待转换"}
+             for name in ('done', 'failed', 'partial', 'untouched')]
+    done, failed, partial, untouched = files
+    window.model.add_files(files)
+    tracker = ProgressTracker()
+    for file_data in files:
+        tracker.add_file(file_data, 10)
+    tracker.page(done, 10, 10)
+    tracker.file_done(done, True)
+    failed["error"] = 'boom'
+    tracker.file_done(failed, False)
+    tracker.page(partial, 4, 10)
+    # 取消时引擎把未完成文件的错误记为“已取消”
+    for file_data in (partial, untouched):
+        file_data["error"] = "已取消"
+        tracker.file_done(file_data, False)
+    window.worker = SimpleNamespace(progress=tracker)
+    window.refresh_progress()
+    window.worker = None
+    assert [file_data["status"] for file_data in files] == ["已完成", "失败", "已取消", "待转换"]
@@ -0,0 +1,76 @@
+import os
+
+from pdf_converter.backends import BACKEND_AUTO, resolve_backend
+from pdf_converter.engine import ConversionEngine, extraction_settings
+from pdf_converter.journal import STATUS_DONE, STATUS_RUNNING, JobJournal, file_fingerprint, partial_path
+from pdf_converter.ocr import OCR_OFF
+from pdf_converter.output import FORMAT_INDEXED, INDEX_MAGIC, _OFFSET, index_path, journal_settings, read_page_offsets
+
+from conftest import SAMPLE_PAGES
+
+
+def _convert(journal, pdf, output, output_format=FORMAT_INDEXED):
+    file_data = {"path": pdf, "output_path": str(output)}
+    results = []
+    engine = ConversionEngine(1, pages_per_task=2, journal=journal)
+    engine.convert([file_data], OCR_OFF, backend=BACKEND_AUTO, output_format=output_format,
+                   on_file_done=lambda data, success: results.append(success))
+    return file_data, results
+
+
+def test_lookup_requires_matching_fingerprint_and_settings(tmp_path):
+    journal = JobJournal(str(tmp_path / 'jobs.sqlite3'))
+    journal.checkpoint('a.pdf', 'a.txt', 'fp', 'settings', 10, 4, 123)
+    assert journal.lookup('a.pdf', 'a.txt', 'fp', 'settings') == (STATUS_RUNNING, 4, 123)
+    assert journal.lookup('a.pdf', 'a.txt', 'other', 'settings') is None
+    assert journal.lookup('a.pdf', 'a.txt', 'fp', 'other') is None
+    journal.remove('a.pdf', 'a.txt')
+    assert journal.lookup('a.pdf', 'a.txt', 'fp', 'settings') is None
+    journal.close()
+
+
+def test_completed_file_is_renamed_and_skipped(sample_pdf, tmp_path):
+    journal = JobJournal(str(tmp_path / 'jobs.sqlite3'))
+    output = tmp_path / 'out.txt'
+    file_data, results = _convert(journal, sample_pdf, output)
+    assert results == [True] and "skipped" not in file_data
+    assert output.exists() and not os.path.exists(partial_path(str(output)))
+    assert os.path.exists(index_path(str(output)))
+
+    file_data, results = _convert(journal, sample_pdf, output)
+    assert results == [True] and file_data.get("skipped")
+
+    # 输出被删除后重新转换
+    output.unlink()
+    file_data, results = _convert(journal, sample_pdf, output)
+    assert results == [True] and not file_data.get("skipped") and output.exists()
+    journal.close()
+
+
+def test_interrupted_file_resumes_from_checkpoint(sample_pdf, tmp_path):
+    journal = JobJournal(str(tmp_path / 'jobs.sqlite3'))
+    complete = tmp_path / 'complete.txt'
+    _convert(None, sample_pdf, complete)
+    expected = complete.read_bytes()
+    offsets = read_page_offsets(str(complete))
+
+    # 模拟写出 5 页后中断：.part 中还有第 6 页的一部分
+    written = 5
+    output = tmp_path / 'out.txt'
+    with open(partial_path(str(output)), 'wb') as f:
+        f.write(expected[:offsets[written - 1]] + b'partial')
+    with open(partial_path(index_path(str(output))), 'wb') as f:
+        f.write(INDEX_MAGIC + b''.join(_OFFSET.pack(value) for value in offsets[:written]))
+    settings = extraction_settings(OCR_OFF, resolve_backend(BACKEND_AUTO))
+    journal.checkpoint(sample_pdf, str(output), file_fingerprint(sample_pdf),
+                       journal_settings(settings, FORMAT_INDEXED), SAMPLE_PAGES, written,
+                       offsets[written - 1])
+
+    file_data, results = _convert(journal, sample_pdf, output)
+    assert results == [True] and file_data["resumed_from"] == written
+    assert output.read_bytes() == expected
+    assert read_page_offsets(str(output)) == offsets
+    assert not os.path.exists(partial_path(str(output)))
+    assert journal.lookup(sample_pdf, str(output), file_fingerprint(sample_pdf),
+                          journal_settings(settings, FORMAT_INDEXED))[0] == STATUS_DONE
+    journal.close()
@@ -0,0 +1,90 @@
+import pytest
+
+from pdf_converter import ocr
+from pdf_converter.ocr import LANG_AUTO, OCR_LANG, PROFILE_STANDARD, OcrConfig, parse_tsv, resolve_lang
+
+HEADER = 'level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext'
+
+
+def _word(block, par, line, word, conf, text):
+    return f'5\t1\t{block}\t{par}\t{line}\t{word}\t0\t0\t10\t10\t{conf}\t{text}'
+
+
+def test_parse_tsv_joins_lines_and_paragraphs():
+    output = '\n'.join([
+        HEADER,
+        '1\t1\t0\t0\t0\t0\t0\t0\t100\t100\t-1\t',
+        _word(1, 1, 1, 1, 90, 'Hello'),
+        _word(1, 1, 1, 2, 80, 'world'),
+        _word(1, 1, 2, 1, 70, 'again'),
+        _word(2, 1, 1, 1, 60, 'next'),
+    ])
+    text, confidence = parse_tsv(output)
+    assert text == 'Hello world\nagain\n\nnext\n'
+    assert confidence == 75.0
+
+
+def test_parse_tsv_ignores_negative_confidence_and_blank_words():
+    output = '\n'.join([
+        HEADER,
+        _word(1, 1, 1, 1, -1, 'x'),
+        _word(1, 1, 1, 2, 50, ' '),
+        _word(1, 1, 1, 3, 40, 'y'),
+    ])
+    text, confidence = parse_tsv(output)
+    assert text == 'x y\n'
+    assert confidence == 40.0
+
+
+def test_parse_tsv_without_words():
+    assert parse_tsv(HEADER + '\n') == ('', None)
+
+
+def test_ocr_config_round_trip_and_settings():
+    config = OcrConfig(lang='eng', psm=6, min_dpi=200, max_dpi=100, profile=PROFILE_STANDARD)
+    assert config.max_dpi == 200
+    copy = OcrConfig.from_dict(config.to_dict())
+    assert copy.settings() == config.settings() == 'lang=eng;dpi=200-200;psm=6'
+    assert copy.options() == ['--psm', '6']
+    assert OcrConfig().lang == OCR_LANG
+
+
+@pytest.fixture
+def detected(monkeypatch):
+    """替换书写系统检测，记录调用次数"""
+    result = {"script": None, "confidence": 0.0, "calls": 0}
+
+    def detect_script(image, dpi, temp_dir):
+        result["calls"] += 1
+        return result["script"], result["confidence"]
+
+    monkeypatch.setattr(ocr, 'detect_script', detect_script)
+    monkeypatch.setattr(ocr, 'installed_langs', lambda: None)
+    monkeypatch.setattr(ocr, '_document_langs', {})
+    return result
+
+
+def test_resolve_lang_uses_configured_language_without_detection(detected):
+    assert resolve_lang(None, config=OcrConfig(lang='deu')) == 'deu'
+    assert detected["calls"] == 0
+
+
+def test_resolve_lang_auto_remembers_non_latin_scripts_only(detected):
+    config = OcrConfig(lang=LANG_AUTO)
+    detected.update(script='Latin', confidence=5.0)
+    assert resolve_lang(None, config=config, document='doc') == 'eng'
+    assert resolve_lang(None, config=config, document='doc') == 'eng'
+    assert detected["calls"] == 2
+
+    detected.update(script='Han')
+    assert resolve_lang(None, config=config, document='doc') == 'chi_sim+eng'
+    detected.update(script='Latin')
+    assert resolve_lang(None, config=config, document='doc') == 'chi_sim+eng'
+    assert detected["calls"] == 3
+
+
+def test_resolve_lang_auto_falls_back_when_unsure(detected):
+    config = OcrConfig(lang=LANG_AUTO, fallback_lang='chi_sim+eng')
+    detected.update(script='Cyrillic', confidence=0.2)
+    assert resolve_lang(None, config=config, document='doc') == 'chi_sim+eng'
+    assert 'doc' not in ocr._document_langs
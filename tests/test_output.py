@@ -0,0 +1,64 @@
+import pytest
+
+from pdf_converter.output import (
+    INDEX_MAGIC, IndexedTextWriter, index_path, read_page, read_page_offsets,
+)
+
+PAGES = ['first page\n', '', '第三页 中文\n', 'last\n']
+
+
+def _write(path, pages):
+    writer = IndexedTextWriter(str(path))
+    writer.open()
+    for index, text in enumerate(pages):
+        writer.write(index, text)
+    writer.sync()
+    return writer
+
+
+def test_index_offsets_and_read_page(tmp_path):
+    output = tmp_path / 'doc.txt'
+    writer = _write(output, PAGES)
+    writer.close()
+    writer.commit()
+
+    offsets = read_page_offsets(str(output))
+    assert offsets[-1] == output.stat().st_size
+    assert len(offsets) == len(PAGES)
+    for page, text in enumerate(PAGES, 1):
+        assert read_page(str(output), page, offsets) == text
+    assert read_page(str(output), 3) == PAGES[2]
+
+
+def test_resume_truncates_text_and_index(tmp_path):
+    output = tmp_path / 'doc.txt'
+    writer = _write(output, PAGES[:2])
+    offset = writer.sync()
+    writer.write(2, 'written after the checkpoint\n')
+    writer.close()
+
+    writer = IndexedTextWriter(str(output))
+    assert writer.resume(2, offset)
+    for index, text in enumerate(PAGES[2:], 2):
+        writer.write(index, text)
+    writer.close()
+    writer.commit()
+    assert output.read_text(encoding='utf-8') == ''.join(PAGES)
+    assert [read_page(str(output), page) for page in range(1, len(PAGES) + 1)] == PAGES
+
+
+def test_resume_fails_when_index_is_short(tmp_path):
+    output = tmp_path / 'doc.txt'
+    writer = _write(output, PAGES[:1])
+    offset = writer.sync()
+    writer.close()
+    assert not IndexedTextWriter(str(output)).resume(3, offset)
+
+
+def test_read_page_offsets_rejects_other_files(tmp_path):
+    output = tmp_path / 'doc.txt'
+    output.write_text('x')
+    with open(index_path(str(output)), 'wb') as f:
+        f.write(b'NOTINDEX' + INDEX_MAGIC)
+    with pytest.raises(ValueError):
+        read_page_offsets(str(output))
@@ -0,0 +1,91 @@
+import random
+import sys
+
+import pytest
+from PIL import Image, ImageDraw, ImageEnhance
+
+from pdf_converter.preprocess import (
+    CONTRAST, BRIGHTNESS, SKEW_STEP, estimate_skew, otsu_threshold, preprocess_image,
+)
+
+
+def _noise(size=(64, 64), seed=1):
+    rng = random.Random(seed)
+    image = Image.new('L', size)
+    image.putdata([rng.randrange(256) for _ in range(size[0] * size[1])])
+    return image
+
+
+def _pixels(image):
+    return list(image.tobytes())
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_lut_matches_image_enhance(seed):
+    image = _noise(seed=seed)
+    # 原先逐步生成中间图片的做法
+    expected = ImageEnhance.Brightness(ImageEnhance.Contrast(image).enhance(CONTRAST)).enhance(BRIGHTNESS)
+    assert _pixels(preprocess_image(image)) == _pixels(expected)
+
+
+def test_lut_matches_image_enhance_for_rgb_input():
+    image = Image.merge('RGB', [_noise(seed=seed) for seed in (4, 5, 6)])
+    gray = image.convert('L')
+    expected = ImageEnhance.Brightness(ImageEnhance.Contrast(gray).enhance(CONTRAST)).enhance(BRIGHTNESS)
+    assert _pixels(preprocess_image(image)) == _pixels(expected)
+
+
+def test_otsu_threshold_separates_bimodal_histogram():
+    rng = random.Random(7)
+    histogram = [0] * 256
+    for center in (60, 190):
+        for _ in range(5000):
+            histogram[min(255, max(0, int(rng.gauss(center, 12))))] += 1
+    threshold = otsu_threshold(histogram)
+    # 阈值落在两个峰之间，正好分开两类像素
+    assert 60 < threshold < 190
+    assert sum(histogram[:threshold + 1]) == 5000
+    # 逐个阈值计算类间方差，大津法的结果应当是最大值
+    total = sum(histogram)
+
+    def between(t):
+        weight = sum(histogram[:t + 1])
+        if weight in (0, total):
+            return 0.0
+        mean_low = sum(i * histogram[i] for i in range(t + 1)) / weight
+        mean_high = sum(i * histogram[i] for i in range(t + 1, 256)) / (total - weight)
+        return weight * (total - weight) * (mean_low - mean_high) ** 2
+
+    assert between(threshold) == pytest.approx(max(between(t) for t in range(256)))
+
+
+def test_binarize_outputs_two_levels():
+    image = Image.new('L', (40, 20), 200)
+    ImageDraw.Draw(image).rectangle((0, 0, 19, 19), fill=60)
+    result = preprocess_image(image, binarize=True)
+    assert set(_pixels(result)) == {0, 255}
+    assert result.getpixel((5, 5)) == 0 and result.getpixel((30, 5)) == 255
+
+
+def _text_lines(angle):
+    image = Image.new('L', (800, 600), 255)
+    draw = ImageDraw.Draw(image)
+    for top in range(60, 560, 40):
+        for left in range(60, 740, 30):
+            draw.rectangle((left, top, left + 20, top + 12), fill=0)
+    return image.rotate(angle, resample=Image.Resampling.BILINEAR, expand=True, fillcolor=255)
+
+
+@pytest.mark.parametrize('angle', [2.0, -3.0])
+def test_deskew_recovers_rotation(angle):
+    pytest.importorskip('numpy')
+    assert estimate_skew(_text_lines(angle)) == pytest.approx(-angle, abs=SKEW_STEP)
+    straight = preprocess_image(_text_lines(angle), deskew=True)
+    assert abs(estimate_skew(straight)) <= SKEW_STEP
+
+
+def test_deskew_skipped_without_numpy(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'numpy', None)
+    image = _text_lines(2.0)
+    result = preprocess_image(image, deskew=True)
+    assert result.size == image.size
@@ -0,0 +1,67 @@
+import pytest
+
+from pdf_converter import progress
+from pdf_converter.progress import RATE_WINDOW, ProgressTracker, format_duration
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(progress.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_rate_uses_recent_window_and_eta(clock):
+    tracker = ProgressTracker()
+    file_data = {"name": 'a.pdf'}
+    tracker.add_file(file_data, 100)
+    # 开始时很快，之后变慢：速度只反映最近 RATE_WINDOW 秒
+    clock[0] += 1
+    tracker.page(file_data, 40, 100)
+    tracker.snapshot()
+    seconds = int(RATE_WINDOW) * 2
+    for second in range(1, seconds + 1):
+        clock[0] += 1
+        tracker.page(file_data, 40 + second, 100)
+        snapshot = tracker.snapshot()
+    assert snapshot["rate"] == pytest.approx(1.0, rel=0.15)
+    assert snapshot["done_pages"] == 40 + seconds
+    assert snapshot["eta"] == pytest.approx((60 - seconds) / snapshot["rate"])
+    assert snapshot["elapsed"] == pytest.approx(1 + seconds)
+
+
+def test_resumed_pages_do_not_count_towards_rate(clock):
+    tracker = ProgressTracker()
+    file_data = {"name": 'a.pdf', "resumed_from": 50}
+    tracker.add_file(file_data, 60)
+    clock[0] += 1
+    tracker.page(file_data, 50, 60)
+    snapshot = tracker.snapshot()
+    assert snapshot["done_pages"] == 50
+    assert snapshot["rate"] == 0
+    assert snapshot["eta"] is None
+
+
+def test_file_results_and_changed_files(clock):
+    tracker = ProgressTracker()
+    done, failed, skipped = {"name": 'done'}, {"name": 'failed'}, {"name": 'skipped', "total_pages": 8}
+    for file_data in (done, failed, skipped):
+        tracker.add_file(file_data, 10)
+    tracker.page(done, 10, 10)
+    tracker.file_done(done, True)
+    tracker.page(failed, 3, 10)
+    tracker.file_done(failed, False)
+    tracker.file_done(skipped, True)
+    snapshot = tracker.snapshot()
+    assert [(entry[0]["name"], entry[1], entry[2], entry[3]) for entry in snapshot["files"]] == [
+        ('done', 10, 10, True), ('failed', 3, 3, False), ('skipped', 8, 8, True)]
+    # 失败的文件剩余页面不计入总数，跳过的文件按实际页数整份计为完成
+    assert (snapshot["done_pages"], snapshot["total_pages"]) == (21, 21)
+    assert (snapshot["files_done"], snapshot["files_total"]) == (3, 3)
+    assert tracker.snapshot()["files"] == []
+
+
+def test_format_duration():
+    assert format_duration(5.4) == '0:05'
+    assert format_duration(125) == '2:05'
+    assert format_duration(3725) == '1:02:05'
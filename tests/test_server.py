@@ -0,0 +1,205 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from pdf_converter import server
+from pdf_converter.backends import BACKEND_AUTO, resolve_backend
+from pdf_converter.ocr import locate_tesseract
+from pdf_converter.server import PRIORITY_BULK, PRIORITY_PREVIEW, ConversionService, PrioritySlots
+
+from conftest import SAMPLE_PAGES
+
+
+async def _request(port, method, target, body=b'', headers=()):
+    """发送一个请求，返回 (状态码, 响应头, 读取器, 写入器)；响应头之后的内容由调用者读取
+
+    写入器被回收时连接随之关闭，调用者读完之前需要持有它。
+    """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    lines = [f"{method} {target} HTTP/1.1", "Host: localhost", *headers]
+    if body is not None:
+        lines.append(f"Content-Length: {len(body)}")
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + (body or b''))
+    await writer.drain()
+    head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+    status = int(head[0].split(' ')[1])
+    response_headers = {}
+    for line in head[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            response_headers[name.strip().lower()] = value.strip()
+    return status, response_headers, reader, writer
+
+
+async def _fetch(port, method, target, body=b'', headers=()):
+    status, response_headers, reader, writer = await _request(port, method, target, body, headers)
+    # 进程池的工作进程可能继承了连接，不能等对方关闭连接
+    data = await reader.readexactly(int(response_headers["content-length"]))
+    writer.close()
+    if 'json' in response_headers.get('content-type', ''):
+        return status, json.loads(data)
+    return status, data.decode('utf-8')
+
+
+async def _read_chunk(reader):
+    """读取分块编码的一块，结束块返回 None"""
+    size = int((await reader.readuntil(b'\r\n')).strip(), 16)
+    if size == 0:
+        return None
+    data = await reader.readexactly(size + 2)
+    return data[:-2]
+
+
+async def _serve(test, tmp_path, **kwargs):
+    service = ConversionService(max_workers=1, **kwargs)
+    await service.start('127.0.0.1', 0)
+    try:
+        await test(service, service.server.sockets[0].getsockname()[1])
+    finally:
+        await service.close()
+
+
+def test_path_outside_allowed_dirs_is_rejected(tmp_path, sample_pdf):
+    allowed = tmp_path / 'allowed'
+    allowed.mkdir()
+    inside = allowed / 'doc.pdf'
+    inside.write_bytes(open(sample_pdf, 'rb').read())
+    outside = tmp_path / 'outside.pdf'
+    outside.write_bytes(inside.read_bytes())
+    link = allowed / 'link.pdf'
+    os.symlink(outside, link)
+
+    async def test(service, port):
+        for path in (outside, allowed / '..' / 'outside.pdf', link):
+            status, data = await _fetch(port, 'POST', f'/jobs?path={path}', body=None)
+            assert status == 403, path
+        status, data = await _fetch(port, 'POST', f'/jobs?path={inside}', body=None)
+        assert status == 202
+        assert data["name"] == 'doc.pdf'
+
+    asyncio.run(_serve(test, tmp_path, allowed_dirs=[str(allowed)]))
+
+
+def test_path_rejected_without_allowed_dirs(tmp_path, sample_pdf):
+    async def test(service, port):
+        status, data = await _fetch(port, 'POST', f'/jobs?path={sample_pdf}', body=None)
+        assert status == 403
+
+    asyncio.run(_serve(test, tmp_path))
+
+
+def test_bad_pdf_fails_job(tmp_path):
+    async def test(service, port):
+        status, data = await _fetch(port, 'POST', '/jobs?name=bad.pdf', b'not a pdf')
+        assert status == 202
+        await service.jobs[data["id"]].task
+        status, data = await _fetch(port, 'GET', f'/jobs/{data["id"]}')
+        assert status == 200
+        assert data["status"] == server.STATUS_FAILED
+        assert data["error"]
+        status, _ = await _fetch(port, 'GET', f'/jobs/{data["id"]}/result')
+        assert status == 409
+
+    asyncio.run(_serve(test, tmp_path))
+
+
+def test_first_page_streams_before_job_finishes(tmp_path, sample_pdf):
+    with open(sample_pdf, 'rb') as f:
+        body = f.read()
+
+    async def test(service, port):
+        # 首页之外的页段等首页送到客户端后才开始转换
+        gate = asyncio.Event()
+        submit = service._submit
+
+        async def gated_submit(priority, func, *args):
+            if priority == PRIORITY_BULK:
+                await gate.wait()
+            return await submit(priority, func, *args)
+
+        service._submit = gated_submit
+        status, headers, reader, writer = await _request(
+            port, 'POST', '/jobs?stream=1&backend=auto&name=sample.pdf', body)
+        assert status == 200
+        assert headers["transfer-encoding"] == 'chunked'
+        first = json.loads(await _read_chunk(reader))
+        assert first["page"] == 1
+        assert 'page 1 line 1' in first["text"]
+        job, = service.jobs.values()
+        assert not job.finished
+        # auto 按文档版面选定后端
+        assert job.backend == resolve_backend(BACKEND_AUTO, sample_pdf)
+
+        gate.set()
+        lines = []
+        while True:
+            chunk = await _read_chunk(reader)
+            if chunk is None:
+                break
+            lines.extend(json.loads(line) for line in chunk.decode('utf-8').splitlines())
+        status_line = lines.pop()
+        assert [line["page"] for line in lines] == list(range(2, SAMPLE_PAGES + 1))
+        assert status_line["status"] == server.STATUS_DONE
+        assert status_line["pages_done"] == SAMPLE_PAGES
+        writer.close()
+
+        status, text = await _fetch(port, 'GET', f'/jobs/{job.id}/result')
+        assert status == 200
+        assert f'page {SAMPLE_PAGES} line 10' in text
+        status, metrics = await _fetch(port, 'GET', '/metrics')
+        assert status == 200
+        assert 'pdf_converter_files_converted_total 1' in metrics
+
+    asyncio.run(_serve(test, tmp_path))
+
+
+def test_upload_requires_content_length(tmp_path):
+    async def test(service, port):
+        status, data = await _fetch(port, 'POST', '/jobs', body=None)
+        assert status == 411
+        status, data = await _fetch(port, 'POST', '/ocr', body=None,
+                                    headers=['Transfer-Encoding: chunked'])
+        assert status == 411
+        status, data = await _fetch(port, 'GET', '/jobs/missing')
+        assert status == 404
+
+    asyncio.run(_serve(test, tmp_path))
+
+
+@pytest.mark.skipif(not locate_tesseract(), reason='需要 tesseract')
+def test_ocr_rejects_unreadable_image(tmp_path):
+    async def test(service, port):
+        status, data = await _fetch(port, 'POST', '/ocr', b'not an image')
+        assert status == 400
+
+    asyncio.run(_serve(test, tmp_path))
+
+
+def test_priority_slots_prefer_preview():
+    async def test():
+        slots = PrioritySlots(1)
+        await slots.acquire()
+        order = []
+
+        async def waiter(name, priority):
+            await slots.acquire(priority)
+            order.append(name)
+
+        bulk = asyncio.ensure_future(waiter('bulk', PRIORITY_BULK))
+        cancelled = asyncio.ensure_future(waiter('cancelled', PRIORITY_PREVIEW))
+        preview = asyncio.ensure_future(waiter('preview', PRIORITY_PREVIEW))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        slots.release()
+        await asyncio.sleep(0)
+        # 被取消的等待者不占用名额，同级按先后顺序
+        assert order == ['preview']
+        slots.release()
+        await asyncio.gather(bulk, preview, return_exceptions=True)
+        assert order == ['preview', 'bulk']
+        slots.release()
+        assert slots.free == 1
+
+    asyncio.run(test())
@@ -0,0 +1,77 @@
+import io
+import mmap
+import pickle
+
+import pytest
+
+from pdf_converter.backends import BACKEND_AUTO
+from pdf_converter.cache import hash_file
+from pdf_converter.engine import count_pages, release_document
+from pdf_converter.sources import SharedPdf, share_pdf
+
+from conftest import SAMPLE_PAGES
+
+
+def _attach(shared):
+    """按工作进程的方式重建：只经 pickle 传递名字和长度"""
+    return pickle.loads(pickle.dumps(shared))
+
+
+def test_shared_bytes_attach_and_read(sample_pdf):
+    with open(sample_pdf, 'rb') as f:
+        data = f.read()
+    shared = share_pdf(data, 'sample.pdf')
+    try:
+        assert shared.digest == hash_file(sample_pdf)
+        attached = _attach(shared)
+        assert attached.shm is None and attached.size == len(data)
+        reader = attached.open()
+        assert reader.read(8) == data[:8]
+        reader.seek(-5, io.SEEK_END)
+        assert reader.read() == data[-5:]
+        reader.close()
+        assert count_pages(attached, BACKEND_AUTO) == SAMPLE_PAGES
+    finally:
+        # 本进程保留着打开的文档，关闭后映射才能释放
+        release_document()
+        shared.close()
+
+
+@pytest.mark.parametrize('kind', ['file', 'mmap'])
+def test_share_file_and_mmap(sample_pdf, kind):
+    with open(sample_pdf, 'rb') as f:
+        if kind == 'mmap':
+            source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            source = f
+        shared = share_pdf(source)
+        try:
+            assert shared.digest == hash_file(sample_pdf)
+        finally:
+            shared.close()
+            if kind == 'mmap':
+                source.close()
+
+
+def test_close_releases_shared_memory(sample_pdf):
+    with open(sample_pdf, 'rb') as f:
+        shared = share_pdf(f.read())
+    attached = _attach(shared)
+    shared.close()
+    shared.close()
+    with pytest.raises(FileNotFoundError):
+        attached.open()
+
+
+def test_incomplete_or_empty_content_is_rejected():
+    with pytest.raises(ValueError):
+        share_pdf(b'')
+    shared = SharedPdf(10)
+    try:
+        shared.write(b'12345')
+        with pytest.raises(ValueError):
+            shared.seal()
+        with pytest.raises(ValueError):
+            shared.write(b'123456')
+    finally:
+        shared.close()
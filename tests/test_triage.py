@@ -0,0 +1,27 @@
+from pdf_converter.triage import PAGE_OCR, PAGE_SKIP, PAGE_TEXT, classify_page
+
+A4_AREA = 595 * 842
+
+
+def test_blank_and_vector_pages_are_skipped():
+    assert classify_page('', {"area": A4_AREA, "image_area": 0, "fonts": 0}) == PAGE_SKIP
+    assert classify_page('  \n', {"area": A4_AREA, "image_area": A4_AREA * 0.01}) == PAGE_SKIP
+
+
+def test_image_only_page_needs_ocr():
+    assert classify_page('', {"area": A4_AREA, "image_area": A4_AREA}) == PAGE_OCR
+
+
+def test_undecodable_glyphs_need_ocr():
+    text = '(cid:12)(cid:34)(cid:56) ab'
+    assert classify_page(text, {"area": A4_AREA, "image_area": 0, "fonts": 1}) == PAGE_OCR
+
+
+def test_scan_with_sparse_text_needs_ocr():
+    stats = {"area": A4_AREA, "image_area": A4_AREA, "fonts": 1}
+    assert classify_page('Page 3', stats) == PAGE_OCR
+    assert classify_page('word ' * 2000, stats) == PAGE_TEXT
+
+
+def test_ordinary_text_page():
+    assert classify_page('正文内容 body text', {"area": A4_AREA, "image_area": 0, "fonts": 2}) == PAGE_TEXT
@@ -0,0 +1,90 @@
+import time
+
+from pdf_converter.watch import (
+    SMALL_JOB_COST, STATUS_DONE, STATUS_PENDING, STATUS_RUNNING, DirectoryWatcher, JobQueue, WatchDaemon,
+)
+
+
+def _queue(tmp_path):
+    return JobQueue(str(tmp_path / 'queue.sqlite3'))
+
+
+def test_claim_by_cost_then_arrival(tmp_path):
+    queue = _queue(tmp_path)
+    queue.add('/big.pdf', '/big.txt', 'f1', 500)
+    queue.add('/first.pdf', '/first.txt', 'f2', 10)
+    queue.add('/second.pdf', '/second.txt', 'f3', 10)
+    queue.add('/tiny.pdf', '/tiny.txt', 'f4', 1)
+    assert [job["path"] for job in queue.claim(3)] == ['/tiny.pdf', '/first.pdf', '/second.pdf']
+    assert [job["path"] for job in queue.claim(3)] == ['/big.pdf']
+    assert queue.claim(3) == []
+    queue.close()
+
+
+def test_fast_lane_only_claims_small_jobs(tmp_path):
+    queue = _queue(tmp_path)
+    queue.add('/big.pdf', '/big.txt', 'f1', SMALL_JOB_COST + 1)
+    queue.add('/small.pdf', '/small.txt', 'f2', SMALL_JOB_COST)
+    assert [job["path"] for job in queue.claim(2, SMALL_JOB_COST)] == ['/small.pdf']
+    assert queue.claim(2, SMALL_JOB_COST) == []
+    assert [job["path"] for job in queue.claim(2)] == ['/big.pdf']
+    queue.close()
+
+
+def test_daemon_lanes(tmp_path):
+    queue_path = str(tmp_path / 'queue.sqlite3')
+    single = WatchDaemon([str(tmp_path)], max_workers=1, queue_path=queue_path)
+    assert [(max_cost, engine.max_workers) for max_cost, engine in single.lanes] == [(None, 1)]
+    single.queue.close()
+    daemon = WatchDaemon([str(tmp_path)], max_workers=3, queue_path=queue_path)
+    # 快速通道占一个进程，常规通道处理其余所有任务
+    assert [(max_cost, engine.max_workers) for max_cost, engine in daemon.lanes] == [
+        (SMALL_JOB_COST, 1), (None, 2)]
+    daemon.queue.close()
+
+
+def test_running_job_is_not_reset(tmp_path):
+    queue = _queue(tmp_path)
+    queue.add('/a.pdf', '/a.txt', 'old', 5)
+    assert [job["fingerprint"] for job in queue.claim(1)] == ['old']
+    # 转换期间文件又被修改：仍在处理中，其他通道不能再取到
+    queue.add('/a.pdf', '/a.txt', 'new', 5)
+    assert queue.counts() == {STATUS_RUNNING: 1}
+    assert queue.claim(1) == []
+    assert queue.known('/a.pdf', 'new')
+    # 转换结束后按新版本重新排队
+    queue.complete('/a.pdf', True)
+    assert queue.counts() == {STATUS_PENDING: 1}
+    assert [job["fingerprint"] for job in queue.claim(1)] == ['new']
+    queue.complete('/a.pdf', True)
+    assert queue.counts() == {STATUS_DONE: 1}
+    queue.close()
+
+
+def test_running_jobs_requeued_on_restart(tmp_path):
+    queue = _queue(tmp_path)
+    queue.add('/a.pdf', '/a.txt', 'f1', 5)
+    queue.claim(1)
+    queue.close()
+    queue = _queue(tmp_path)
+    assert [job["path"] for job in queue.claim(1)] == ['/a.pdf']
+    queue.close()
+
+
+def test_settle_waits_for_eof(tmp_path):
+    path = tmp_path / 'copying.pdf'
+    path.write_bytes(b'%PDF-1.4\n' + b'0' * 2048)
+    watcher = DirectoryWatcher([str(tmp_path)], settle=0.05, poll_interval=0)
+    assert watcher.ready_files() == []
+    time.sleep(0.1)
+    # 大小不再变化但还没有 %%EOF，视为仍在复制
+    assert watcher.ready_files() == []
+    with open(path, 'ab') as f:
+        f.write(b'\n%%EOF\n')
+    # 文件变化后重新计时
+    assert watcher.ready_files() == []
+    time.sleep(0.1)
+    assert watcher.ready_files() == [str(path)]
+    # 没有变化的文件不再交出
+    time.sleep(0.1)
+    assert watcher.ready_files() == []